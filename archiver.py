@@ -0,0 +1,346 @@
+"""Retention of processed files for test-assistant.
+
+Renamed files would otherwise accumulate in the watch directory, making
+every directory scan (startup backlog, -latest reconciliation, polling)
+slower over time. The archiver moves older renamed files into dated
+subdirectories of an archive directory, or into one zip bundle per day,
+keeping the -latest file and the most recent history in place. Every
+archived file is recorded in index.jsonl inside the archive directory.
+"""
+import errno
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import zipfile
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from file_handler import FileHandler, rename_no_replace
+from metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "index.jsonl"
+
+
+class Archiver:
+    """Moves older renamed files out of one watch root.
+
+    A run archives the renamed files beyond the keep_recent newest that
+    are older than min_age, or all files beyond keep_recent once more than
+    max_hot_files renamed files have accumulated. Runs happen every
+    interval seconds, and early when renames push the directory over
+    max_hot_files. Files still queued or in progress are never archived.
+    """
+
+    def __init__(
+        self,
+        file_handler: FileHandler,
+        archive_dir: Path,
+        mode: str = "directory",
+        keep_recent: int = 100,
+        min_age: float = 86400.0,
+        max_hot_files: int = 1000,
+        interval: float = 3600.0,
+        recursive: bool = False,
+        is_busy: Optional[Callable[[Path], bool]] = None,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        """Initialize the archiver.
+
+        Args:
+            file_handler: File handler of the watch root (its renames are counted)
+            archive_dir: Directory receiving archived files
+            mode: "directory" (dated subdirectories) or "zip" (one bundle per day)
+            keep_recent: Newest renamed files always kept in the watch directory
+            min_age: Seconds since the last modification before a file is archived
+            max_hot_files: Renamed files that trigger archiving regardless of age (0 = never)
+            interval: Seconds between scheduled runs
+            recursive: If True, archive files from subdirectories too
+            is_busy: Returns True for files still queued or in progress
+            metrics: Registry receiving the number of archived files
+        """
+        self.file_handler = file_handler
+        self.watch_dir = file_handler.watch_dir
+        self.archive_dir = Path(archive_dir)
+        self.mode = mode
+        self.keep_recent = keep_recent
+        self.min_age = min_age
+        self.max_hot_files = max_hot_files
+        self.interval = interval
+        self.recursive = recursive
+        self.is_busy = is_busy or (lambda file_path: False)
+
+        # Renamed files in the watch root at the last run, plus new files since
+        self.hot_files = 0
+        self.archived = 0
+
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.metrics = metrics or MetricsRegistry()
+        self._archived_counter = self.metrics.counter(
+            "archived_files_total",
+            "Renamed files moved out of the watch directory",
+            labels={"mode": mode}
+        )
+
+        file_handler.add_rename_listener(self._note_renamed)
+
+    def _note_renamed(self, old_path: Path, new_path: Path):
+        """Count files newly renamed to -latest; wake the thread over the threshold."""
+        if FileHandler.LATEST_SUFFIX in old_path.stem or FileHandler.LATEST_SUFFIX not in new_path.stem:
+            return
+        self.hot_files += 1
+        if self.max_hot_files and self.hot_files > self.max_hot_files:
+            self._wake.set()
+
+    def start(self):
+        """Archive in a background thread (a first run starts right away)."""
+        self._thread = threading.Thread(target=self._run, name="archiver", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake.clear()
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Archiving failed for {self.watch_dir}: {e}")
+            self._wake.wait(self.interval)
+
+    def stop(self):
+        """Stop archiving (after the file being moved) and wait for the thread."""
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def run_once(self) -> int:
+        """Archive the files due now.
+
+        Returns:
+            Number of files archived
+        """
+        candidates = self._collect()
+        self.hot_files = len(candidates)
+
+        # Newest first; the keep_recent newest always stay
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        over_threshold = bool(self.max_hot_files) and len(candidates) > self.max_hot_files
+        cutoff = time.time() - self.min_age
+        due = [
+            (mtime, file_path) for mtime, file_path in candidates[self.keep_recent:]
+            if over_threshold or mtime <= cutoff
+        ]
+        if not due:
+            return 0
+
+        start = time.time()
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        if self.mode == "zip":
+            archived = self._archive_to_zip(due)
+        else:
+            archived = self._archive_to_directory(due)
+
+        self.hot_files -= archived
+        self.archived += archived
+        self._archived_counter.inc(archived)
+        logger.info(
+            f"Archived {archived} file(s) from {self.watch_dir} to {self.archive_dir} "
+            f"in {time.time() - start:.2f}s ({self.hot_files} renamed file(s) kept)"
+        )
+        return archived
+
+    def _collect(self) -> List[Tuple[float, Path]]:
+        """Find renamed files (except -latest ones and busy files) with their mtimes."""
+        candidates = []
+        archive_dir = str(self.archive_dir)
+        pending_dirs = [str(self.watch_dir)]
+        while pending_dirs:
+            directory = pending_dirs.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if self.recursive and entry.is_dir(follow_symlinks=False):
+                                if entry.path != archive_dir:
+                                    pending_dirs.append(entry.path)
+                                continue
+                            if not entry.is_file(follow_symlinks=False):
+                                continue
+                            file_path = Path(entry.path)
+                            if (FileHandler.LATEST_SUFFIX in file_path.stem
+                                    or not self.file_handler.is_renamed_output(file_path)
+                                    or self.is_busy(file_path)):
+                                continue
+                            candidates.append((entry.stat().st_mtime, file_path))
+                        except OSError as e:
+                            logger.debug(f"Skipping unreadable entry {entry.path}: {e}")
+            except OSError as e:
+                logger.warning(f"Cannot scan {directory} for archiving: {e}")
+        return candidates
+
+    def _record(self, index, file_path: Path, mtime: float, size: int, archive: Path, member: Optional[str] = None):
+        """Append one archived file to the index."""
+        record = {
+            "path": str(file_path),
+            "archive": str(archive.relative_to(self.archive_dir)),
+            "size": size,
+            "mtime": mtime,
+            "archived_at": time.time()
+        }
+        if member is not None:
+            record["member"] = member
+        index.write(json.dumps(record) + "\n")
+
+    def _archive_to_directory(self, due: List[Tuple[float, Path]]) -> int:
+        """Move files into archive_dir/YYYY/MM/DD/, keeping their relative paths."""
+        archived = 0
+        with open(self.archive_dir / INDEX_NAME, "a") as index:
+            for mtime, file_path in due:
+                if self._stop_event.is_set():
+                    break
+                relative = file_path.relative_to(self.watch_dir)
+                target_dir = self.archive_dir / datetime.fromtimestamp(mtime).strftime("%Y/%m/%d") / relative.parent
+                try:
+                    size = file_path.stat().st_size
+                    target_dir.mkdir(parents=True, exist_ok=True)
+                    target = self._move(file_path, target_dir)
+                except FileNotFoundError:
+                    continue  # Renamed or deleted since the scan
+                except OSError as e:
+                    logger.error(f"Failed to archive {file_path.name}: {e}")
+                    continue
+                self._record(index, file_path, mtime, size, target)
+                archived += 1
+            index.flush()
+        return archived
+
+    @staticmethod
+    def _move(file_path: Path, target_dir: Path) -> Path:
+        """Move a file into a directory without replacing anything there.
+
+        Returns:
+            New path of the file
+        """
+        for attempt in range(FileHandler.MAX_NAME_ATTEMPTS):
+            name = f"{file_path.stem}-{attempt}{file_path.suffix}" if attempt else file_path.name
+            target = target_dir / name
+            try:
+                rename_no_replace(file_path, target)
+                return target
+            except FileExistsError:
+                continue
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # Archive on another file system: copy, then remove the original
+                if target.exists():
+                    continue
+                shutil.copy2(file_path, target)
+                file_path.unlink()
+                return target
+        raise FileExistsError(errno.EEXIST, "No free name in archive", str(file_path))
+
+    def _archive_to_zip(self, due: List[Tuple[float, Path]]) -> int:
+        """Add files to archive_dir/YYYY-MM-DD.zip and remove them once the bundle is closed."""
+        by_day: Dict[str, List[Tuple[float, Path]]] = {}
+        for mtime, file_path in due:
+            by_day.setdefault(datetime.fromtimestamp(mtime).strftime("%Y-%m-%d"), []).append((mtime, file_path))
+
+        archived = 0
+        with open(self.archive_dir / INDEX_NAME, "a") as index:
+            for day, files in sorted(by_day.items()):
+                if self._stop_event.is_set():
+                    break
+                bundle = self.archive_dir / f"{day}.zip"
+                bundled = []
+                with zipfile.ZipFile(bundle, "a", compression=zipfile.ZIP_DEFLATED) as zf:
+                    members = {info.filename: info for info in zf.infolist()}
+                    for mtime, file_path in files:
+                        if self._stop_event.is_set():
+                            break
+                        try:
+                            size = file_path.stat().st_size
+                            member = file_path.relative_to(self.watch_dir).as_posix()
+                            bundled_as = self._bundled_member(file_path, size, member, members)
+                            if bundled_as is not None:  # Bundled before an interruption
+                                member = bundled_as
+                            else:
+                                member = self._free_member(member, members)
+                                zf.write(file_path, member)
+                                members[member] = zf.getinfo(member)
+                        except FileNotFoundError:
+                            continue
+                        except OSError as e:
+                            logger.error(f"Failed to archive {file_path.name}: {e}")
+                            continue
+                        bundled.append((mtime, file_path, size, member))
+
+                # Originals are removed only once the bundle's directory is written
+                for mtime, file_path, size, member in bundled:
+                    self._record(index, file_path, mtime, size, bundle, member)
+                    index.flush()
+                    try:
+                        file_path.unlink()
+                        archived += 1
+                    except FileNotFoundError:
+                        pass
+        return archived
+
+    @staticmethod
+    def _member_names(member: str) -> Iterator[str]:
+        """Yield member, then member with sequence numbers 1, 2, ..."""
+        yield member
+        stem, dot, suffix = member.rpartition(".")
+        if not stem or "/" in suffix:
+            stem, dot, suffix = member, "", ""
+        attempt = 1
+        while True:
+            yield f"{stem}-{attempt}{dot}{suffix}"
+            attempt += 1
+
+    @classmethod
+    def _free_member(cls, member: str, members: Dict[str, zipfile.ZipInfo]) -> str:
+        """Return member, or member with a sequence number if the bundle has it already."""
+        return next(name for name in cls._member_names(member) if name not in members)
+
+    @classmethod
+    def _bundled_member(
+        cls, file_path: Path, size: int, member: str, members: Dict[str, zipfile.ZipInfo]
+    ) -> Optional[str]:
+        """Find the member holding this file's content, if the bundle has one already.
+
+        A member matches if its size and CRC-32 equal the file's; the CRC is
+        only computed once a member of the same size is found.
+
+        Returns:
+            Name of the matching member, or None
+        """
+        crc = None
+        for name in cls._member_names(member):
+            info = members.get(name)
+            if info is None:
+                return None
+            if info.file_size != size:
+                continue
+            if crc is None:
+                crc = cls._crc32(file_path)
+            if info.CRC == crc:
+                return name
+
+    @staticmethod
+    def _crc32(file_path: Path) -> int:
+        """Return the CRC-32 of a file, read in chunks."""
+        crc = 0
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                crc = zlib.crc32(chunk, crc)
+        return crc
@@ -0,0 +1,324 @@
+"""Asyncio-based claude runner for test-assistant.
+
+Kept apart from claude_runner so asyncio is only imported when
+async_runner is enabled.
+"""
+import asyncio
+import codecs
+import contextlib
+import logging
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from claude_cache import ClaudeResultCache
+from claude_runner import ClaudeCodeRunner
+from console import console
+from failure_policy import LatencyBudget
+from metrics import MetricsRegistry
+from result_store import ResultStore
+from scheduler import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncClaudeCodeRunner(ClaudeCodeRunner):
+    """Claude CLI runner built on asyncio subprocesses.
+
+    Output is streamed line by line to sinks while claude runs, and any
+    number of invocations can share one event loop. The synchronous
+    run_claude_code API is kept for worker threads: calls are submitted to
+    a background event loop owned by the runner.
+    """
+
+    READ_CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        prompt_template: str,
+        dry_run: bool = False,
+        cache: Optional[ClaudeResultCache] = None,
+        timeout: float = 300,
+        metrics: Optional[MetricsRegistry] = None,
+        claude_command: str = "claude",
+        result_store: Optional[ResultStore] = None,
+        console_output: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        latency_budget: Optional[LatencyBudget] = None,
+        stdout_sink: Optional[Callable[[str], None]] = None,
+        stderr_sink: Optional[Callable[[str], None]] = None
+    ):
+        """Initialize async Claude runner.
+
+        Args:
+            prompt_template: Template prompt to use with claude
+            dry_run: If True, skip Claude CLI execution
+            cache: Optional result cache consulted before invoking claude
+            timeout: Maximum seconds a single claude invocation may run
+            metrics: Registry receiving invocation counters and durations
+            claude_command: Name or path of the claude executable
+            result_store: Optional store recording every result
+            console_output: If False, claude output is not printed to the terminal
+            rate_limiter: Optional limiter every claude process start waits for
+            latency_budget: Optional adaptive limit below timeout; slower calls are killed
+            stdout_sink: Called with each stdout line (default: console, or nothing without console output)
+            stderr_sink: Called with each stderr line (default: console with prefix, or nothing)
+        """
+        super().__init__(
+            prompt_template,
+            dry_run=dry_run,
+            cache=cache,
+            timeout=timeout,
+            metrics=metrics,
+            claude_command=claude_command,
+            result_store=result_store,
+            console_output=console_output,
+            rate_limiter=rate_limiter,
+            latency_budget=latency_budget
+        )
+        if console_output:
+            self.stdout_sink = stdout_sink or console.output
+            self.stderr_sink = stderr_sink or (lambda line: console.output(f"[claude stderr] {line}"))
+        else:
+            self.stdout_sink = stdout_sink or (lambda line: None)
+            self.stderr_sink = stderr_sink or (lambda line: None)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+    async def run_claude_code_async(
+        self,
+        file_path: Path,
+        stdout_sink: Optional[Callable[[str], None]] = None,
+        stderr_sink: Optional[Callable[[str], None]] = None
+    ) -> Optional[str]:
+        """Run claude CLI with the specified file on the current event loop.
+
+        Args:
+            file_path: Path to the file to analyze
+            stdout_sink: Called with each stdout line (overrides the runner default)
+            stderr_sink: Called with each stderr line (overrides the runner default)
+
+        Returns:
+            Output from claude CLI, or None if error
+        """
+        started_at = time.time()
+        full_prompt, cache_key, content_hash, early_output = self._prepare(file_path)
+        if early_output is not None:
+            self._store_result(
+                file_path, full_prompt, self._early_status(), early_output, None, started_at, content_hash
+            )
+            return early_output
+
+        try:
+            async with self._limit_async():
+                returncode, stdout = await self._execute_async(full_prompt, stdout_sink, stderr_sink)
+        except subprocess.TimeoutExpired:
+            self._record_outcome("timeout")
+            logger.error("claude execution timed out")
+            console.print("\n❌ ERROR: claude execution timed out\n")
+            self._store_result(file_path, full_prompt, "timeout", None, None, started_at, content_hash)
+            return None
+        except Exception as e:
+            self._record_outcome("error")
+            logger.error(f"Error running claude: {e}")
+            console.print(f"\n❌ ERROR: {e}\n")
+            self._store_result(file_path, full_prompt, "error", str(e), None, started_at, content_hash)
+            return None
+
+        output = self._finish(returncode, stdout, cache_key)
+        status = "success" if output is not None else "failure"
+        self._store_result(file_path, full_prompt, status, stdout, returncode, started_at, content_hash)
+        return output
+
+    @contextlib.asynccontextmanager
+    async def _limit_async(self):
+        """Hold a rate limiter slot without blocking the event loop (no-op without a limiter).
+
+        The limiter blocks, so it is acquired in the loop's default executor.
+        """
+        if self.rate_limiter is None:
+            yield
+            return
+
+        limit = self.rate_limiter.acquire()
+        acquired = asyncio.get_running_loop().run_in_executor(None, limit.__enter__)
+        try:
+            await asyncio.shield(acquired)
+        except asyncio.CancelledError:
+            # Give the slot back once the executor has taken it
+            acquired.add_done_callback(
+                lambda future: future.cancelled() or future.exception() or limit.__exit__(None, None, None)
+            )
+            raise
+        try:
+            yield
+        finally:
+            limit.__exit__(None, None, None)
+
+    async def run_many(self, file_paths: List[Path], concurrency: int = 4) -> List[Optional[str]]:
+        """Run claude for several files concurrently on the current event loop.
+
+        Each invocation also waits for the runner's rate limiter, if any.
+
+        Args:
+            file_paths: Paths of the files to analyze
+            concurrency: Maximum number of claude processes at once
+
+        Returns:
+            Outputs in the same order as file_paths (None for failures)
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_one(file_path: Path) -> Optional[str]:
+            async with semaphore:
+                return await self.run_claude_code_async(file_path)
+
+        return await asyncio.gather(*(run_one(file_path) for file_path in file_paths))
+
+    def _execute(self, full_prompt: str) -> Tuple[int, str]:
+        """Run the claude process on the runner's event loop and wait for it.
+
+        Args:
+            full_prompt: Prompt passed to claude -p
+
+        Returns:
+            Tuple of (exit code, stdout)
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._execute_async(full_prompt),
+            self._ensure_loop()
+        )
+        return future.result()
+
+    async def _execute_async(
+        self,
+        full_prompt: str,
+        stdout_sink: Optional[Callable[[str], None]] = None,
+        stderr_sink: Optional[Callable[[str], None]] = None
+    ) -> Tuple[int, str]:
+        """Run the claude process, streaming its output to the sinks.
+
+        The process (with any children it started) is killed and reaped on
+        timeout or cancellation.
+
+        Args:
+            full_prompt: Prompt passed to claude -p
+            stdout_sink: Called with each stdout line
+            stderr_sink: Called with each stderr line
+
+        Returns:
+            Tuple of (exit code, stdout)
+
+        Raises:
+            subprocess.TimeoutExpired: If claude exceeds the timeout or latency budget
+        """
+        timeout = self._call_timeout()
+        process = await asyncio.create_subprocess_exec(
+            self.claude_command, "-p", full_prompt,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True
+        )
+        self._track_process(process)
+
+        stdout_lines: List[str] = []
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    self._pump(process.stdout, stdout_sink or self.stdout_sink, stdout_lines),
+                    self._pump(process.stderr, stderr_sink or self.stderr_sink),
+                    process.wait()
+                ),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError as e:
+            raise subprocess.TimeoutExpired([self.claude_command, "-p", full_prompt], timeout) from e
+        finally:
+            if process.returncode is None:
+                logger.warning(f"Killing claude process {process.pid} after {time.perf_counter() - start:.0f}s")
+                self._kill_process_group(process)
+                await process.wait()
+            self._track_process(process, running=False)
+            self._observe_duration(time.perf_counter() - start)
+
+        return process.returncode, "".join(stdout_lines)
+
+    async def _pump(
+        self,
+        stream: asyncio.StreamReader,
+        sink: Callable[[str], None],
+        collected: Optional[List[str]] = None
+    ):
+        """Forward a process stream to a sink one line at a time.
+
+        Args:
+            stream: Process stdout or stderr
+            sink: Called with each line (without trailing newline)
+            collected: Optional list receiving every line (with newline)
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        while True:
+            chunk = await stream.read(self.READ_CHUNK_SIZE)
+            text = decoder.decode(chunk, final=not chunk)
+            pending += text
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                if collected is not None:
+                    collected.append(line + "\n")
+                sink(line)
+            if not chunk:
+                break
+
+        if pending:
+            if collected is not None:
+                collected.append(pending)
+            sink(pending)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop on first use.
+
+        Returns:
+            The runner's event loop
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever,
+                    name="claude-runner-loop",
+                    daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    def close(self):
+        """Cancel running invocations (killing their processes) and stop the background event loop."""
+        with self._loop_lock:
+            if self._loop is None:
+                return
+            future = asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self._loop)
+            try:
+                future.result(timeout=10)
+            except Exception as e:
+                logger.warning(f"Cancelling claude invocations failed: {e}")
+            self.terminate_processes()  # Anything the cancellation did not reach
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join(timeout=5)
+            self._loop.close()
+            self._loop = None
+            self._loop_thread = None
+
+    @staticmethod
+    async def _cancel_tasks():
+        """Cancel every other task on the loop and wait until they have cleaned up."""
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,150 @@
+"""Streaming startup backlog for test-assistant."""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BacklogFeeder:
+    """Feeds files that already exist in the watch directory into the queue.
+
+    The directory is walked with os.scandir and each accepted entry is
+    enqueued as soon as it is seen, so processing starts before the scan
+    finishes. Entries are judged from their cached dirent data, without an
+    extra stat per file. Files are fed in directory order rather than by
+    modification time.
+
+    Feeding pauses while max_pending files are in the pipeline (and is optionally
+    rate limited), so newly arriving files never wait behind the whole
+    backlog.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        enqueue: Callable[[Path], bool],
+        accept: Callable[[os.DirEntry], bool],
+        queue_depth: Callable[[], int],
+        recursive: bool = False,
+        max_pending: int = 10,
+        rate: float = 0.0,
+        accept_dir: Optional[Callable[[os.DirEntry], bool]] = None,
+        on_complete: Optional[Callable[[], None]] = None
+    ):
+        """Initialize the backlog feeder.
+
+        Args:
+            root: Directory to scan
+            enqueue: Adds a file to the processing queue, returns True if queued
+            accept: Decides from a directory entry whether the file needs processing
+            queue_depth: Returns the number of files queued or in progress
+            recursive: If True, scan subdirectories too
+            max_pending: Pause feeding while the queue holds this many files (0 = never pause)
+            rate: Maximum files fed per second (0 = unlimited)
+            accept_dir: Decides whether a subdirectory is scanned (default: all are)
+            on_complete: Called once the whole directory was scanned (not when stopped
+                early or when a directory could not be read)
+        """
+        self.root = Path(root)
+        self.enqueue = enqueue
+        self.accept = accept
+        self.queue_depth = queue_depth
+        self.recursive = recursive
+        self.max_pending = max_pending
+        self.rate = rate
+        self.accept_dir = accept_dir
+        self.on_complete = on_complete
+
+        self.scanned = 0
+        self.queued = 0
+        self.completed = False
+        self.unreadable_dirs = 0
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Feed the backlog in a background thread."""
+        self._thread = threading.Thread(target=self.run, name="backlog-feeder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop feeding and wait for the thread to finish."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def is_running(self) -> bool:
+        """Return True while the backlog is still being fed."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def run(self) -> int:
+        """Scan the directory and feed accepted files into the queue.
+
+        Returns:
+            Number of files queued
+        """
+        start = time.time()
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        next_allowed = 0.0
+
+        for entry in self._iter_files():
+            if self._stop_event.is_set():
+                break
+            self.scanned += 1
+            if not self.accept(entry):
+                continue
+
+            self._wait_for_capacity()
+            if interval:
+                delay = next_allowed - time.time()
+                if delay > 0 and self._stop_event.wait(delay):
+                    break
+                next_allowed = time.time() + interval
+            if self._stop_event.is_set():
+                break
+
+            if self.enqueue(Path(entry.path)):
+                self.queued += 1
+
+        logger.info(
+            f"Backlog scan finished: {self.queued} file(s) queued out of "
+            f"{self.scanned} scanned in {time.time() - start:.2f}s"
+        )
+        if not self._stop_event.is_set() and not self.unreadable_dirs:
+            self.completed = True
+            if self.on_complete is not None:
+                self.on_complete()
+        return self.queued
+
+    def _wait_for_capacity(self):
+        """Block while max_pending files are already queued or in progress."""
+        if not self.max_pending:
+            return
+        while self.queue_depth() >= self.max_pending:
+            if self._stop_event.wait(0.05):
+                return
+
+    def _iter_files(self) -> Iterator[os.DirEntry]:
+        """Yield regular-file entries, walking subdirectories if recursive."""
+        pending_dirs = [str(self.root)]
+        while pending_dirs:
+            directory = pending_dirs.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_file():
+                                yield entry
+                            elif self.recursive and entry.is_dir(follow_symlinks=False):
+                                if self.accept_dir is None or self.accept_dir(entry):
+                                    pending_dirs.append(entry.path)
+                        except OSError as e:
+                            logger.debug(f"Skipping unreadable entry {entry.path}: {e}")
+            except OSError as e:
+                self.unreadable_dirs += 1
+                logger.warning(f"Cannot scan {directory}: {e}")
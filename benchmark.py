@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark for test-assistant.
+
+Starts TestAssistantService against a temporary directory with a stand-in
+claude executable, drops synthetic files in a configurable pattern and
+reports detect-to-done latency percentiles and throughput.
+
+Usage:
+    python benchmark.py --pattern burst --files 40 --claude-latency 0.5 --max-workers 4
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+FAKE_CLAUDE_TEMPLATE = '''#!{python}
+"""Stand-in claude executable generated by benchmark.py."""
+import os
+import random
+import sys
+import time
+
+LATENCY = {latency!r}
+JITTER = {jitter!r}
+OUTPUT_SIZE = {output_size!r}
+DONE_LOG = {done_log!r}
+
+if sys.argv[1:2] == ["--version"]:
+    print("fake-claude 1.0")
+    sys.exit(0)
+
+prompt = sys.argv[2] if len(sys.argv) > 2 else ""
+paths = []
+for word in prompt.split():
+    if os.path.isfile(word):
+        paths.append(word)
+
+# Read tokens first, like claude reading the file at the start of its run
+tokens = []
+for path in paths:
+    with open(path, "rb") as f:
+        tokens.append(f.readline().decode("utf-8", "replace").strip())
+
+time.sleep(max(0.0, LATENCY + random.uniform(-JITTER, JITTER)))
+
+done = time.time()
+with open(DONE_LOG, "a") as f:
+    f.write("".join(f"{{token}} {{done}}\\n" for token in tokens))
+
+for path in paths:
+    print(f"=== FILE: {{path}} ===")
+    print("x" * OUTPUT_SIZE)
+'''
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the pct-th percentile of values using linear interpolation.
+
+    Args:
+        values: Sample values
+        pct: Percentile between 0 and 100
+
+    Returns:
+        Percentile value (0.0 for an empty sample)
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def write_fake_claude(directory: Path, latency: float, jitter: float, output_size: int, done_log: Path) -> Path:
+    """Write the stand-in claude executable.
+
+    Args:
+        directory: Directory to create the executable in
+        latency: Mean seconds each invocation takes
+        jitter: Maximum random deviation from latency in seconds
+        output_size: Bytes of output printed per file
+        done_log: File receiving "<token> <completion time>" lines
+
+    Returns:
+        Path to the executable
+    """
+    fake_path = directory / "fake-claude"
+    fake_path.write_text(FAKE_CLAUDE_TEMPLATE.format(
+        python=sys.executable,
+        latency=latency,
+        jitter=jitter,
+        output_size=output_size,
+        done_log=str(done_log)
+    ))
+    fake_path.chmod(fake_path.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return fake_path
+
+
+def drop_file(watch_dir: Path, index: int, size: int, chunk_delay: float = 0.0) -> tuple:
+    """Write one synthetic file whose first line is a unique token.
+
+    Args:
+        watch_dir: Directory to drop the file into
+        index: Sequence number of the file
+        size: Approximate file size in bytes
+        chunk_delay: Seconds to wait between 64 KiB chunks (simulates slow writers)
+
+    Returns:
+        Tuple of (token, time the writer closed the file)
+    """
+    token = f"BENCH-{index}-{uuid.uuid4().hex}"
+    header = f"{token}\n".encode("utf-8")
+    remaining = max(0, size - len(header))
+    with open(watch_dir / f"drop-{index}.txt", "wb") as f:
+        f.write(header)
+        while remaining > 0:
+            chunk = min(remaining, 64 * 1024)
+            f.write(b"x" * chunk)
+            remaining -= chunk
+            if chunk_delay:
+                f.flush()
+                time.sleep(chunk_delay)
+    return token, time.time()
+
+
+def generate_drops(watch_dir: Path, args: argparse.Namespace) -> Dict[str, float]:
+    """Drop files according to the selected pattern.
+
+    Args:
+        watch_dir: Directory to drop files into
+        args: Parsed command line arguments
+
+    Returns:
+        Mapping of token to drop time
+    """
+    drops: Dict[str, float] = {}
+    for index in range(args.files):
+        if args.pattern == "steady" and index:
+            time.sleep(1.0 / args.rate)
+        elif args.pattern == "burst" and index and index % args.burst_size == 0:
+            time.sleep(args.burst_interval)
+        elif args.pattern == "large" and index:
+            time.sleep(1.0 / args.rate)
+
+        size = args.large_size if args.pattern == "large" else args.file_size
+        chunk_delay = args.chunk_delay if args.pattern == "large" else 0.0
+        token, dropped_at = drop_file(watch_dir, index, size, chunk_delay)
+        drops[token] = dropped_at
+    return drops
+
+
+def read_done_log(done_log: Path) -> Dict[str, float]:
+    """Read completion times written by the fake claude.
+
+    Args:
+        done_log: Completion log path
+
+    Returns:
+        Mapping of token to completion time
+    """
+    if not done_log.exists():
+        return {}
+    done = {}
+    for line in done_log.read_text().splitlines():
+        token, _, finished = line.partition(" ")
+        if token and finished:
+            done[token] = float(finished)
+    return done
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, object]:
+    """Run one benchmark and return its report.
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Report dictionary with latency percentiles and throughput
+    """
+    from main import TestAssistantService  # pylint: disable=import-outside-toplevel
+
+    with tempfile.TemporaryDirectory(prefix="test-assistant-bench-") as work:
+        work_dir = Path(work)
+        watch_dir = work_dir / "watch"
+        watch_dir.mkdir()
+        done_log = work_dir / "done.log"
+        fake_claude = write_fake_claude(
+            work_dir, args.claude_latency, args.claude_jitter, args.output_size, done_log
+        )
+
+        config = {
+            "watch_path": str(watch_dir),
+            "claude_prompt": "Analyze this file:",
+            "claude_command": str(fake_claude),
+            "file_extensions": [],
+            "log_level": "WARNING",
+            "max_workers": args.max_workers,
+        }
+        for override in args.set or []:
+            key, _, value = override.partition("=")
+            config[key] = yaml.safe_load(value)
+        config_path = work_dir / "config.yaml"
+        config_path.write_text(yaml.safe_dump(config))
+
+        previous_cwd = os.getcwd()
+        root_logger = logging.getLogger()
+        previous_handlers, previous_level = root_logger.handlers[:], root_logger.level
+        os.chdir(work_dir)  # Keep test-assistant.log and relative paths inside the temp dir
+        try:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                service = TestAssistantService(str(config_path))
+                service_thread = threading.Thread(target=service.start, daemon=True)
+                service_thread.start()
+                while service.observer is None or not service.observer.is_alive():
+                    time.sleep(0.01)
+
+                drops = generate_drops(watch_dir, args)
+
+                deadline = time.time() + args.timeout
+                done: Dict[str, float] = {}
+                while time.time() < deadline:
+                    done = read_done_log(done_log)
+                    if all(token in done for token in drops):
+                        break
+                    time.sleep(0.05)
+
+                service.stop()
+                service_thread.join(timeout=10)
+                stage_metrics = service.metrics.snapshot().get("stage_duration_seconds", [])
+        finally:
+            os.chdir(previous_cwd)
+            # The service reconfigures logging; restore the caller's handlers
+            for handler in root_logger.handlers:
+                if handler not in previous_handlers:
+                    handler.close()
+            root_logger.handlers = previous_handlers
+            root_logger.setLevel(previous_level)
+
+    latencies = [done[token] - dropped for token, dropped in drops.items() if token in done]
+    first_drop = min(drops.values()) if drops else 0.0
+    last_done = max((done[token] for token in drops if token in done), default=first_drop)
+    elapsed = last_done - first_drop
+
+    stages = {
+        entry["labels"]["stage"]: entry["sum"] / entry["count"]
+        for entry in stage_metrics if entry["count"]
+    }
+
+    return {
+        "pattern": args.pattern,
+        "files": len(drops),
+        "completed": len(latencies),
+        "elapsed_seconds": elapsed,
+        "files_per_second": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": max(latencies, default=0.0),
+        "mean_stage_seconds": stages,
+    }
+
+
+def print_report(report: Dict[str, object]):
+    """Print a human-readable benchmark report.
+
+    Args:
+        report: Report from run_benchmark
+    """
+    print("=" * 80)
+    print(f"📊 BENCHMARK: {report['pattern']}")
+    print("=" * 80)
+    print(f"Files dropped:      {report['files']}")
+    print(f"Files completed:    {report['completed']}")
+    print(f"Elapsed:            {report['elapsed_seconds']:.3f}s")
+    print(f"Throughput:         {report['files_per_second']:.2f} files/sec")
+    print(f"Latency p50:        {report['latency_p50']:.3f}s")
+    print(f"Latency p95:        {report['latency_p95']:.3f}s")
+    print(f"Latency p99:        {report['latency_p99']:.3f}s")
+    print(f"Latency max:        {report['latency_max']:.3f}s")
+    for stage, seconds in sorted(report["mean_stage_seconds"].items()):
+        print(f"Mean {stage + ':':14}{seconds:.3f}s")
+    if report["completed"] < report["files"]:
+        print(f"⚠️  {report['files'] - report['completed']} file(s) did not complete")
+    print("=" * 80)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments.
+
+    Args:
+        argv: Arguments (default: sys.argv)
+
+    Returns:
+        Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="End-to-end benchmark for test-assistant")
+    parser.add_argument("--pattern", choices=["steady", "burst", "large"], default="steady",
+                        help="File drop pattern")
+    parser.add_argument("--files", type=int, default=20, help="Number of files to drop")
+    parser.add_argument("--rate", type=float, default=10.0, help="Files per second (steady/large)")
+    parser.add_argument("--burst-size", type=int, default=10, help="Files per burst")
+    parser.add_argument("--burst-interval", type=float, default=2.0, help="Seconds between bursts")
+    parser.add_argument("--file-size", type=int, default=1024, help="Bytes per file (steady/burst)")
+    parser.add_argument("--large-size", type=int, default=8 * 1024 * 1024, help="Bytes per file (large)")
+    parser.add_argument("--chunk-delay", type=float, default=0.0,
+                        help="Seconds between 64 KiB chunks when writing large files")
+    parser.add_argument("--claude-latency", type=float, default=0.2, help="Seconds per fake claude call")
+    parser.add_argument("--claude-jitter", type=float, default=0.0, help="Random +/- seconds per call")
+    parser.add_argument("--output-size", type=int, default=256, help="Bytes of fake claude output per file")
+    parser.add_argument("--max-workers", type=int, default=1, help="Service max_workers")
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE",
+                        help="Override any config setting (value parsed as YAML)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for completion")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Main entry point."""
+    args = parse_args()
+    report = run_benchmark(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    sys.exit(0 if report["completed"] == report["files"] else 1)
+
+
+if __name__ == "__main__":
+    main()
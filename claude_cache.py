@@ -0,0 +1,180 @@
+"""Content-addressed cache of claude outputs for test-assistant."""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: Path, prefix: str = "", chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Compute a SHA-256 digest of a file, streaming it in chunks.
+
+    Args:
+        file_path: Path to the file to hash
+        prefix: Text mixed into the digest before the file content
+        chunk_size: Number of bytes read per chunk
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    if prefix:
+        digest.update(prefix.encode("utf-8"))
+        digest.update(b"\0")
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ClaudeResultCache:
+    """Persistent cache of claude outputs keyed by file content and prompt."""
+
+    def __init__(
+        self,
+        db_path: str,
+        max_bytes: int = 100 * 1024 * 1024,
+        max_age: float = 7 * 24 * 3600
+    ):
+        """Initialize the cache.
+
+        Args:
+            db_path: Path to the SQLite database file
+            max_bytes: Maximum total size of cached outputs (0 = unlimited)
+            max_age: Maximum age of an entry in seconds (0 = unlimited)
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " output TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(file_path: Path, prompt_template: str, content_hash: Optional[str] = None) -> str:
+        """Build the cache key for a file and prompt template.
+
+        Args:
+            file_path: Path to the file to analyze
+            prompt_template: Prompt template sent to claude
+            content_hash: hash_file digest of the file, if already computed
+
+        Returns:
+            Cache key string
+        """
+        if content_hash is None:
+            content_hash = hash_file(file_path)
+        return hashlib.sha256(f"{prompt_template}\0{content_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached output.
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Cached output, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and self.max_age and now - row[1] > self.max_age:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, output: str):
+        """Store an output and evict entries beyond the size/age limits.
+
+        Args:
+            key: Cache key from make_key
+            output: Output from claude
+        """
+        now = time.time()
+        size = len(output.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, output, size, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, output, size, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        """Remove expired entries, then least recently used ones over max_bytes.
+
+        Args:
+            now: Current time
+        """
+        if self.max_age:
+            cursor = self._conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.max_age,))
+            self.evictions += cursor.rowcount
+
+        if not self.max_bytes:
+            return
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute("SELECT key, size FROM results ORDER BY last_used, rowid").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and current entry count.
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+        }
+
+    def close(self):
+        """Close the underlying database."""
+        with self._lock:
+            self._conn.close()
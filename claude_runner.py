@@ -1,41 +1,261 @@
 """Claude CLI integration for test-assistant."""
+import contextlib
+import json
+import os
+import re
+import shutil
+import signal
 import subprocess
 import logging
+import sqlite3
+import threading
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Set, Tuple
+
+from claude_cache import ClaudeResultCache, hash_file
+from console import console
+from failure_policy import LatencyBudget
+from metrics import MetricsRegistry
+from result_store import ResultStore
+from scheduler import RateLimiter
 
 logger = logging.getLogger(__name__)
 
+# Marker claude is asked to print before the analysis of each file in a batch
+BATCH_SECTION_PATTERN = re.compile(r"^=== FILE: (.+?) ===[ \t]*$", re.MULTILINE)
+
+
+def split_batch_output(output: str, file_paths: List[Path]) -> Dict[Path, Optional[str]]:
+    """Split the output of a batched claude call into per-file sections.
+
+    Args:
+        output: Output from claude for the whole batch
+        file_paths: Paths included in the batch
+
+    Returns:
+        Mapping of path to its section (None if claude skipped the file)
+    """
+    by_name = {str(file_path): file_path for file_path in file_paths}
+    sections: Dict[Path, Optional[str]] = {file_path: None for file_path in file_paths}
+
+    matches = list(BATCH_SECTION_PATTERN.finditer(output))
+    for index, match in enumerate(matches):
+        file_path = by_name.get(match.group(1).strip())
+        if file_path is None:
+            continue
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(output)
+        sections[file_path] = output[match.end():end].strip("\n") + "\n"
+
+    return sections
+
 
 class ClaudeCodeRunner:
     """Handles interaction with claude CLI."""
 
-    def __init__(self, prompt_template: str, dry_run: bool = False):
+    def __init__(
+        self,
+        prompt_template: str,
+        dry_run: bool = False,
+        cache: Optional[ClaudeResultCache] = None,
+        timeout: float = 300,
+        metrics: Optional[MetricsRegistry] = None,
+        claude_command: str = "claude",
+        result_store: Optional[ResultStore] = None,
+        console_output: bool = True,
+        rate_limiter: Optional[RateLimiter] = None,
+        latency_budget: Optional[LatencyBudget] = None
+    ):
         """Initialize Claude runner.
 
         Args:
             prompt_template: Template prompt to use with claude
             dry_run: If True, skip Claude CLI execution
+            cache: Optional result cache consulted before invoking claude
+            timeout: Maximum seconds a single claude invocation may run
+            metrics: Registry receiving invocation counters and durations
+            claude_command: Name or path of the claude executable
+            result_store: Optional store recording every result
+            console_output: If False, claude output is not printed to the terminal
+            rate_limiter: Optional limiter every claude process start waits for
+            latency_budget: Optional adaptive limit below timeout; slower calls are killed
         """
         self.prompt_template = prompt_template
         self.dry_run = dry_run
+        self.cache = cache
+        self.timeout = timeout
+        self.claude_command = claude_command
+        self.result_store = result_store
+        self.console_output = console_output
+        self.rate_limiter = rate_limiter
+        self.latency_budget = latency_budget
+        self.metrics = metrics or MetricsRegistry()
+        self._process_duration = self.metrics.histogram(
+            "claude_process_duration_seconds",
+            "Wall time of claude processes"
+        )
+
+        # Running claude processes, killed on shutdown (they run in their own sessions)
+        self._processes: Set = set()
+        self._processes_lock = threading.Lock()
+
+    def _record_outcome(self, outcome: str):
+        """Count a claude invocation by outcome.
+
+        Args:
+            outcome: success, failure, timeout, error, cached or dry_run
+        """
+        self.metrics.counter(
+            "claude_invocations_total",
+            "Claude invocations by outcome",
+            labels={"outcome": outcome}
+        ).inc()
+
+    def _limit(self):
+        """Return a context holding a rate limiter slot (no-op without a limiter)."""
+        if self.rate_limiter is None:
+            return contextlib.nullcontext()
+        return self.rate_limiter.acquire()
+
+    def _call_timeout(self) -> float:
+        """Return the time limit of the next claude process."""
+        if self.latency_budget is None:
+            return self.timeout
+        return self.latency_budget.limit(self.timeout)
 
-    def check_claude_code_available(self) -> bool:
+    def _observe_duration(self, seconds: float):
+        """Record the wall time of a finished or killed claude process."""
+        self._process_duration.observe(seconds)
+        if self.latency_budget is not None:
+            self.latency_budget.observe(seconds)
+
+    @staticmethod
+    def _kill_process_group(process):
+        """Kill a claude process together with any children it started.
+
+        Args:
+            process: Process started in its own session
+        """
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            # Group already gone (or not ours); make sure the direct child dies
+            with contextlib.suppress(ProcessLookupError):
+                process.kill()
+
+    def _track_process(self, process, running: bool = True):
+        """Add a started claude process to, or remove a finished one from, the running set."""
+        with self._processes_lock:
+            if running:
+                self._processes.add(process)
+            else:
+                self._processes.discard(process)
+
+    def terminate_processes(self) -> int:
+        """Kill every running claude process, e.g. when the service stops.
+
+        Returns:
+            Number of processes killed
+        """
+        with self._processes_lock:
+            processes = [process for process in self._processes if process.returncode is None]
+        for process in processes:
+            logger.warning(f"Killing claude process {process.pid} on shutdown")
+            self._kill_process_group(process)
+        return len(processes)
+
+    def close(self):
+        """Release the runner: running claude processes are killed."""
+        self.terminate_processes()
+
+    def _store_result(
+        self,
+        file_path: Path,
+        prompt: str,
+        status: str,
+        output: Optional[str],
+        exit_code: Optional[int],
+        started_at: float,
+        content_hash: Optional[str] = None
+    ):
+        """Record a result in the result store, if one is configured.
+
+        Args:
+            file_path: Path of the analyzed file
+            prompt: Full prompt sent to claude
+            status: Outcome (same values as _record_outcome)
+            output: Output from claude
+            exit_code: Exit code of the claude process
+            started_at: Time the analysis started
+            content_hash: hash_file digest computed for the cache lookup (hashed here if None)
+        """
+        if self.result_store is None:
+            return
+        if content_hash is None:
+            try:
+                content_hash = hash_file(file_path)
+            except OSError:
+                # A newer file may already have renamed it; keep the result anyway
+                content_hash = None
+        try:
+            self.result_store.record(
+                file_path, prompt, status, output, exit_code, started_at, content_hash=content_hash
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to store result for {file_path.name}: {e}")
+
+    def check_claude_code_available(self, cache_path: Optional[str] = None) -> bool:
         """Check if claude CLI is available.
 
+        Successful probes are cached by the executable's resolved path, mtime
+        and size, so restarts skip the claude --version subprocess until the
+        binary changes.
+
+        Args:
+            cache_path: Optional JSON file remembering successful probes
+
         Returns:
             True if claude is available, False otherwise
         """
+        executable = shutil.which(self.claude_command)
+        if executable is None:
+            return False
+
+        cache_key = None
+        if cache_path:
+            try:
+                stat = os.stat(executable)
+                cache_key = f"{os.path.realpath(executable)}:{stat.st_mtime_ns}:{stat.st_size}"
+                with open(cache_path, "r") as f:
+                    if cache_key in json.load(f):
+                        logger.debug(f"claude probe cached for {executable}")
+                        return True
+            except (OSError, ValueError):
+                pass
+
         try:
             result = subprocess.run(
-                ["claude", "--version"],
+                [executable, "--version"],
                 capture_output=True,
                 text=True,
                 timeout=5
             )
-            return result.returncode == 0
-        except (subprocess.SubprocessError, FileNotFoundError):
+        except (subprocess.SubprocessError, OSError):
             return False
+
+        if result.returncode != 0:
+            return False
+
+        if cache_key is not None:
+            try:
+                with open(cache_path, "w") as f:
+                    json.dump({cache_key: result.stdout.strip()}, f)
+            except OSError as e:
+                logger.debug(f"Could not write claude probe cache: {e}")
+        return True
     
     def run_claude_code(self, file_path: Path) -> Optional[str]:
         """Run claude CLI with the specified file.
@@ -46,63 +266,293 @@ class ClaudeCodeRunner:
         Returns:
             Output from claude CLI, or None if error
         """
+        started_at = time.time()
+        full_prompt, cache_key, content_hash, early_output = self._prepare(file_path)
+        if early_output is not None:
+            self._store_result(
+                file_path, full_prompt, self._early_status(), early_output, None, started_at, content_hash
+            )
+            return early_output
+
+        try:
+            with self._limit():
+                returncode, stdout = self._execute(full_prompt)
+        except subprocess.TimeoutExpired:
+            self._record_outcome("timeout")
+            logger.error("claude execution timed out")
+            console.print("\n❌ ERROR: claude execution timed out\n")
+            self._store_result(file_path, full_prompt, "timeout", None, None, started_at, content_hash)
+            return None
+        except Exception as e:
+            self._record_outcome("error")
+            logger.error(f"Error running claude: {e}")
+            console.print(f"\n❌ ERROR: {e}\n")
+            self._store_result(file_path, full_prompt, "error", str(e), None, started_at, content_hash)
+            return None
+
+        output = self._finish(returncode, stdout, cache_key)
+        status = "success" if output is not None else "failure"
+        self._store_result(file_path, full_prompt, status, stdout, returncode, started_at, content_hash)
+        return output
+
+    def run_claude_code_batch(self, file_paths: List[Path]) -> Dict[Path, Optional[str]]:
+        """Run one claude invocation over several files.
+
+        Cached files are answered from the cache; the remaining files share a
+        single prompt asking claude to mark each file's section, and the
+        output is split back into per-file results.
+
+        Args:
+            file_paths: Paths to the files to analyze
+
+        Returns:
+            Mapping of path to its output (None if error)
+        """
+        if len(file_paths) == 1:
+            return {file_paths[0]: self.run_claude_code(file_paths[0])}
+
+        started_at = time.time()
+
+        logger.info(f"Running claude on a batch of {len(file_paths)} files")
+        console.print("\n" + "="*80)
+        console.print(f"🤖 TRIGGERING CLAUDE CLI (BATCH OF {len(file_paths)} FILES)")
+        console.print("="*80)
+        for file_path in file_paths:
+            console.print(f"File: {file_path}")
+
+        if self.dry_run:
+            console.print("🔸 DRY RUN MODE: Claude CLI execution skipped")
+            console.print("="*80 + "\n")
+            logger.info("Dry run mode: skipping claude execution")
+            self._record_outcome("dry_run")
+            for file_path in file_paths:
+                self._store_result(
+                    file_path, self.prompt_template, "dry_run",
+                    "DRY RUN MODE - No actual execution", None, started_at
+                )
+            return {file_path: "DRY RUN MODE - No actual execution" for file_path in file_paths}
+
+        console.print("="*80 + "\n")
+
+        results: Dict[Path, Optional[str]] = {}
+        cache_keys: Dict[Path, str] = {}
+        content_hashes: Dict[Path, str] = {}
+        if self.cache is not None:
+            for file_path in file_paths:
+                try:
+                    content_hashes[file_path] = hash_file(file_path)
+                    cache_key = self.cache.make_key(file_path, self.prompt_template, content_hashes[file_path])
+                    cached_output = self.cache.get(cache_key)
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"Result cache unavailable: {e}")
+                    continue
+                if cached_output is not None:
+                    logger.info(f"Cache hit for {file_path.name}, skipping claude")
+                    self._record_outcome("cached")
+                    self._store_result(
+                        file_path, self.prompt_template, "cached", cached_output, None, started_at,
+                        content_hashes[file_path]
+                    )
+                    results[file_path] = cached_output
+                else:
+                    cache_keys[file_path] = cache_key
+
+        remaining = [file_path for file_path in file_paths if file_path not in results]
+        if not remaining:
+            return results
+        if len(remaining) == 1:
+            results[remaining[0]] = self.run_claude_code(remaining[0])
+            return results
+
+        file_list = "\n".join(str(file_path) for file_path in remaining)
+        full_prompt = (
+            f"{self.prompt_template}\n"
+            f"Analyze each of the following {len(remaining)} files separately. "
+            f"Begin the analysis of each file with a line of the form "
+            f"'=== FILE: <path> ===' using the exact path listed.\n"
+            f"{file_list}"
+        )
+
+        try:
+            with self._limit():
+                returncode, stdout = self._execute(full_prompt)
+            status = None
+        except subprocess.TimeoutExpired:
+            self._record_outcome("timeout")
+            logger.error("claude execution timed out")
+            console.print("\n❌ ERROR: claude execution timed out\n")
+            returncode, stdout, status = None, "", "timeout"
+        except Exception as e:
+            self._record_outcome("error")
+            logger.error(f"Error running claude: {e}")
+            console.print(f"\n❌ ERROR: {e}\n")
+            returncode, stdout, status = None, "", "error"
+
+        if returncode is not None and self._finish(returncode, stdout, None) is None:
+            status = "failure"
+        if status is not None:
+            for file_path in remaining:
+                self._store_result(
+                    file_path, full_prompt, status, stdout or None, returncode, started_at,
+                    content_hashes.get(file_path)
+                )
+            results.update({file_path: None for file_path in remaining})
+            return results
+
+        for file_path, section in split_batch_output(stdout, remaining).items():
+            if section is None:
+                logger.warning(f"No section for {file_path.name} in batch output")
+                continue
+            results[file_path] = section
+            if file_path in cache_keys:
+                try:
+                    self.cache.put(cache_keys[file_path], section)
+                except sqlite3.Error as e:
+                    logger.warning(f"Failed to store result in cache: {e}")
+
+        # Files claude did not label still get the full batch output recorded
+        for file_path in remaining:
+            results.setdefault(file_path, stdout)
+            self._store_result(
+                file_path, full_prompt, "success", results[file_path], returncode, started_at,
+                content_hashes.get(file_path)
+            )
+
+        return results
+
+    def _early_status(self) -> str:
+        """Return the status of a result answered without running claude."""
+        return "dry_run" if self.dry_run else "cached"
+
+    def _prepare(self, file_path: Path) -> Tuple[str, Optional[str], Optional[str], Optional[str]]:
+        """Build the prompt and handle dry-run mode and cache lookups.
+
+        Args:
+            file_path: Path to the file to analyze
+
+        Returns:
+            Tuple of (full prompt, cache key, content hash, output to return
+            without running claude); the content hash is only computed for
+            the cache lookup
+        """
         # Construct the full prompt
         full_prompt = f"{self.prompt_template} {file_path}"
 
         logger.info(f"Running claude with file: {file_path}")
         logger.info(f"Prompt: {full_prompt}")
 
-        print("\n" + "="*80)
-        print(f"🤖 TRIGGERING CLAUDE CLI")
-        print("="*80)
-        print(f"File: {file_path}")
-        print(f"Prompt: {full_prompt}")
+        console.print("\n" + "="*80)
+        console.print(f"🤖 TRIGGERING CLAUDE CLI")
+        console.print("="*80)
+        console.print(f"File: {file_path}")
+        console.print(f"Prompt: {full_prompt}")
 
         if self.dry_run:
-            print("🔸 DRY RUN MODE: Claude CLI execution skipped")
-            print("="*80 + "\n")
+            console.print("🔸 DRY RUN MODE: Claude CLI execution skipped")
+            console.print("="*80 + "\n")
             logger.info("Dry run mode: skipping claude execution")
-            return "DRY RUN MODE - No actual execution"
+            self._record_outcome("dry_run")
+            return full_prompt, None, None, "DRY RUN MODE - No actual execution"
 
-        print("="*80 + "\n")
+        console.print("="*80 + "\n")
 
-        try:
-            # Run claude with the -p flag for non-interactive output
-            result = subprocess.run(
-                ["claude", "-p", full_prompt],
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
-            )
+        # Identical content with the same prompt reuses the stored output
+        cache_key = content_hash = None
+        if self.cache is not None:
+            try:
+                content_hash = hash_file(file_path)
+                cache_key = self.cache.make_key(file_path, self.prompt_template, content_hash)
+                cached_output = self.cache.get(cache_key)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Result cache unavailable: {e}")
+                cache_key = None
+                cached_output = None
 
-            # Display output
-            if result.stdout:
-                print("CLAUDE OUTPUT:")
-                print("-" * 80)
-                print(result.stdout)
-                print("-" * 80)
+            if cached_output is not None:
+                logger.info(f"Cache hit for {file_path.name}, skipping claude")
+                self._record_outcome("cached")
+                console.print("♻️  CACHE HIT: identical file already analyzed")
+                if self.console_output:
+                    console.output("CLAUDE OUTPUT (cached):", "-" * 80, cached_output, "-" * 80, sep="\n")
+                return full_prompt, None, content_hash, cached_output
 
-            if result.stderr:
-                print("CLAUDE ERRORS:")
-                print("-" * 80)
-                print(result.stderr)
-                print("-" * 80)
+        return full_prompt, cache_key, content_hash, None
 
-            if result.returncode != 0:
-                logger.error(f"claude exited with code {result.returncode}")
-                return None
+    def _execute(self, full_prompt: str) -> Tuple[int, str]:
+        """Run the claude process and display its output.
 
-            print("\n" + "="*80)
-            print("✅ CLAUDE EXECUTION COMPLETED")
-            print("="*80 + "\n")
+        Args:
+            full_prompt: Prompt passed to claude -p
 
-            return result.stdout
+        Returns:
+            Tuple of (exit code, stdout)
 
+        Raises:
+            subprocess.TimeoutExpired: If claude exceeds the timeout or latency budget
+        """
+        # Run claude with the -p flag for non-interactive output, in its own
+        # session so a stuck call can be killed with everything it started
+        timeout = self._call_timeout()
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [self.claude_command, "-p", full_prompt],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            start_new_session=True
+        )
+        self._track_process(process)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
         except subprocess.TimeoutExpired:
-            logger.error("claude execution timed out")
-            print("\n❌ ERROR: claude execution timed out\n")
-            return None
-        except Exception as e:
-            logger.error(f"Error running claude: {e}")
-            print(f"\n❌ ERROR: {e}\n")
+            logger.warning(f"Killing claude process {process.pid} after {timeout:.0f}s")
+            self._kill_process_group(process)
+            process.communicate()  # Reap the process and close its pipes
+            raise
+        finally:
+            self._track_process(process, running=False)
+            self._observe_duration(time.perf_counter() - start)
+        result = subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
+
+        if not self.console_output:
+            return result.returncode, result.stdout
+
+        # Display output (one write per block so parallel workers don't interleave)
+        if result.stdout:
+            console.output("CLAUDE OUTPUT:", "-" * 80, result.stdout, "-" * 80, sep="\n")
+
+        if result.stderr:
+            console.output("CLAUDE ERRORS:", "-" * 80, result.stderr, "-" * 80, sep="\n")
+
+        return result.returncode, result.stdout
+
+    def _finish(self, returncode: int, stdout: str, cache_key: Optional[str]) -> Optional[str]:
+        """Check the exit code and store successful output in the cache.
+
+        Args:
+            returncode: Exit code of the claude process
+            stdout: Output from claude
+            cache_key: Cache key for the analyzed file, if caching is enabled
+
+        Returns:
+            Output from claude CLI, or None if claude failed
+        """
+        if returncode != 0:
+            self._record_outcome("failure")
+            logger.error(f"claude exited with code {returncode}")
             return None
+
+        self._record_outcome("success")
+
+        console.print("\n" + "="*80)
+        console.print("✅ CLAUDE EXECUTION COMPLETED")
+        console.print("="*80 + "\n")
+
+        if cache_key is not None:
+            try:
+                self.cache.put(cache_key, stdout)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to store result in cache: {e}")
+
+        return stdout
@@ -1,19 +1,118 @@
 """Configuration models for test-assistant using Pydantic."""
+import hashlib
+import re
 from pathlib import Path
 from typing import List, Optional, Literal
-from pydantic import BaseModel, Field, field_validator
-import yaml
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+VALID_TIMESTAMP_FORMATS = [
+    "mmddyy-HH-MM-SS-AMPM",
+    "mmddyy-HHMMSS-AMPM",
+    "mmddyy-HH:MM:SS-AMPM",
+    "mmddyy-HH-MM-SS-fff-AMPM",
+    "mmddyy-HHMMSS-ffffff-AMPM"
+]
+
+
+def validate_directory(v: str) -> str:
+    """Validate that a path is an existing directory and return it resolved."""
+    path = Path(v).expanduser().resolve()
+    if not path.exists():
+        raise ValueError(f"Watch path does not exist: {v}")
+    if not path.is_dir():
+        raise ValueError(f"Watch path is not a directory: {v}")
+    return str(path)
+
+
+def normalize_extensions(v: List[str]) -> List[str]:
+    """Ensure extensions start with a dot."""
+    return [ext if ext.startswith('.') else f'.{ext}' for ext in v]
+
+
+def validate_timestamp_format(v: str) -> str:
+    """Validate a timestamp format."""
+    if v not in VALID_TIMESTAMP_FORMATS:
+        raise ValueError(
+            f"Invalid timestamp format: {v}. "
+            f"Valid formats: {', '.join(VALID_TIMESTAMP_FORMATS)}"
+        )
+    return v
+
+
+class PriorityRule(BaseModel):
+    """Priority class for files matching all of the given conditions."""
+
+    priority: int = Field(..., description="Priority of matching files (lower runs first)")
+    extensions: List[str] = Field(
+        default_factory=list,
+        description="File extensions this rule applies to (empty = any)"
+    )
+    pattern: Optional[str] = Field(
+        default=None,
+        description="Glob matched against the file name, or the full path if it contains a slash"
+    )
+    min_size: Optional[int] = Field(default=None, ge=0, description="Minimum file size in bytes")
+    max_size: Optional[int] = Field(default=None, ge=0, description="Maximum file size in bytes")
+
+    @field_validator('extensions')
+    @classmethod
+    def validate_extensions(cls, v: List[str]) -> List[str]:
+        """Ensure extensions start with a dot."""
+        return normalize_extensions(v)
+
+
+class WatchRootConfig(BaseModel):
+    """A watched directory with its own prompt and file settings.
+
+    Settings left unset fall back to the top-level values.
+    """
+
+    path: str = Field(..., description="Directory path to watch for new files")
+    claude_prompt: Optional[str] = Field(default=None, description="Prompt to send to claude CLI")
+    file_extensions: Optional[List[str]] = Field(
+        default=None,
+        description="List of file extensions to watch (empty list = all files)"
+    )
+    timestamp_format: Optional[str] = Field(default=None, description="Timestamp format for file renaming")
+
+    @field_validator('path')
+    @classmethod
+    def validate_path(cls, v: str) -> str:
+        """Validate that path is a valid directory."""
+        return validate_directory(v)
+
+    @field_validator('file_extensions')
+    @classmethod
+    def validate_extensions(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        """Ensure extensions start with a dot."""
+        return None if v is None else normalize_extensions(v)
+
+    @field_validator('timestamp_format')
+    @classmethod
+    def validate_timestamp_format(cls, v: Optional[str]) -> Optional[str]:
+        """Validate timestamp format."""
+        return None if v is None else validate_timestamp_format(v)
 
 
 class TestAssistantConfig(BaseModel):
     """Configuration model for test-assistant."""
 
-    watch_path: str = Field(..., description="Directory path to watch for new files")
-    claude_prompt: str = Field(..., description="Prompt to send to claude CLI")
+    watch_path: Optional[str] = Field(
+        default=None,
+        description="Directory path to watch for new files (optional if watch_roots is set)"
+    )
+    claude_prompt: Optional[str] = Field(
+        default=None,
+        description="Prompt to send to claude CLI (default prompt of the watch roots)"
+    )
     file_extensions: List[str] = Field(
         default_factory=list,
         description="List of file extensions to watch (empty list = all files)"
     )
+    watch_roots: List[WatchRootConfig] = Field(
+        default_factory=list,
+        description="Further directories to watch, served by the same observer and workers"
+    )
 
     # New configuration options
     dry_run: bool = Field(
@@ -23,7 +122,7 @@ class TestAssistantConfig(BaseModel):
 
     timestamp_format: str = Field(
         default="mmddyy-HH-MM-SS-AMPM",
-        description="Timestamp format for file renaming. Supported: mmddyy-HH-MM-SS-AMPM or mmddyy-HHMMSS-AMPM"
+        description="Timestamp format for file renaming (see VALID_TIMESTAMP_FORMATS)"
     )
 
     process_existing_files: bool = Field(
@@ -31,11 +130,55 @@ class TestAssistantConfig(BaseModel):
         description="If True, process existing files in watch directory on startup"
     )
 
+    result_store_path: Optional[str] = Field(
+        default=None,
+        description="SQLite database recording every claude result (None = disabled)"
+    )
+
+    console_output: bool = Field(
+        default=True,
+        description="Print claude output to the terminal"
+    )
+
+    manifest_path: Optional[str] = Field(
+        default=None,
+        description="Manifest file of processed files, keyed by inode/size/mtime (None = use filename heuristics)"
+    )
+
+    backlog_max_pending: int = Field(
+        default=10,
+        ge=0,
+        description="Pause feeding existing files while this many files are in progress (0 = never pause)"
+    )
+
+    backlog_rate: float = Field(
+        default=0.0,
+        ge=0,
+        description="Maximum existing files queued per second on startup (0 = unlimited)"
+    )
+
     log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = Field(
         default="INFO",
         description="Logging level: DEBUG, INFO, WARNING, or ERROR"
     )
 
+    log_max_bytes: int = Field(
+        default=10 * 1024 * 1024,
+        ge=0,
+        description="Rotate test-assistant.log when it reaches this size in bytes (0 = never rotate)"
+    )
+
+    log_backup_count: int = Field(
+        default=5,
+        ge=0,
+        description="Number of rotated log files to keep"
+    )
+
+    quiet: bool = Field(
+        default=False,
+        description="If True, suppress the banner and status messages on the console (logging is unaffected)"
+    )
+
     file_stability_timeout: float = Field(
         default=5.0,
         description="Maximum seconds to wait for file size to stabilize (default: 5.0)"
@@ -46,42 +189,398 @@ class TestAssistantConfig(BaseModel):
         description="Interval in seconds between file size checks (default: 0.1)"
     )
 
+    recursive: bool = Field(
+        default=False,
+        description="If True, watch subdirectories too; each directory keeps its own -latest file"
+    )
+
+    file_stability_mode: Literal["auto", "close_write", "poll"] = Field(
+        default="auto",
+        description="How to detect completely written files: close_write (inotify), poll, or auto"
+    )
+
+    observer_mode: Literal["auto", "native", "polling"] = Field(
+        default="auto",
+        description="File system observer: native (inotify etc.), polling, or auto (polling on network mounts)"
+    )
+
+    polling_interval: float = Field(
+        default=1.0,
+        gt=0,
+        description="Shortest poll interval of the polling observer in seconds"
+    )
+
+    polling_max_interval: float = Field(
+        default=10.0,
+        gt=0,
+        description="Longest poll interval of the polling observer in seconds (reached while idle)"
+    )
+
+    temp_file_patterns: List[str] = Field(
+        default_factory=lambda: ["*.tmp", "*.temp", "*.part", "*.partial", "*.crdownload", "*.swp", ".~*"],
+        description="Filename globs of partial files; ignored until renamed to their final name"
+    )
+
+    include_patterns: List[str] = Field(
+        default_factory=list,
+        description="If set, only files matching one of these globs (or re: regexes) are processed"
+    )
+
+    exclude_patterns: List[str] = Field(
+        default_factory=list,
+        description="Files matching any of these globs (or re: regexes) are never processed"
+    )
+
+    ignore_hidden_files: bool = Field(
+        default=True,
+        description="Ignore dotfiles and files inside dot-directories"
+    )
+
+    min_file_size: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Skip files smaller than this many bytes once completely written"
+    )
+
+    max_file_size: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="Skip files larger than this many bytes"
+    )
+
+    debounce_window: float = Field(
+        default=0.0,
+        ge=0,
+        description="Seconds a new file must go without further events before it is queued (0 = at once)"
+    )
+
+    max_workers: int = Field(
+        default=1,
+        ge=1,
+        description="Number of files processed in parallel (claude invocations run concurrently)"
+    )
+
+    stability_workers: int = Field(
+        default=4,
+        ge=1,
+        description="Number of files waited on in parallel until completely written"
+    )
+
+    latest_index_reconcile_interval: float = Field(
+        default=300.0,
+        ge=0,
+        description="Seconds between checks of the in-memory -latest index against the disk (0 = never)"
+    )
+
+    claude_command: str = Field(
+        default="claude",
+        description="Name or path of the claude executable"
+    )
+
+    claude_probe_cache_path: Optional[str] = Field(
+        default=None,
+        description="JSON file caching the claude availability check by binary path and mtime (None = always probe)"
+    )
+
+    startup_report: bool = Field(
+        default=False,
+        description="Print how long each startup phase took"
+    )
+
+    async_runner: bool = Field(
+        default=False,
+        description="If True, run claude on a shared asyncio event loop and stream its output live"
+    )
+
+    batch_window: float = Field(
+        default=0.0,
+        ge=0,
+        description="Seconds to collect further new files into one claude call (0 = no batching)"
+    )
+
+    batch_max_files: int = Field(
+        default=10,
+        ge=1,
+        description="Maximum number of files in one batched claude call"
+    )
+
+    batch_max_bytes: int = Field(
+        default=10 * 1024 * 1024,
+        ge=1,
+        description="Maximum total size in bytes of the files in one batched claude call"
+    )
+
+    queue_journal_path: Optional[str] = Field(
+        default=None,
+        description="SQLite journal making the work queue survive restarts and crashes (None = in-memory only)"
+    )
+
+    cache_path: Optional[str] = Field(
+        default=None,
+        description="SQLite file caching claude outputs by file content and prompt (None = disabled)"
+    )
+
+    cache_max_bytes: int = Field(
+        default=100 * 1024 * 1024,
+        ge=0,
+        description="Maximum total size of cached outputs in bytes (0 = unlimited)"
+    )
+
+    cache_max_age: float = Field(
+        default=7 * 24 * 3600,
+        ge=0,
+        description="Maximum age of a cached output in seconds (0 = unlimited)"
+    )
+
+    metrics_port: Optional[int] = Field(
+        default=None,
+        ge=0,
+        le=65535,
+        description="Local port serving Prometheus metrics at /metrics (None = disabled)"
+    )
+
+    metrics_host: str = Field(
+        default="127.0.0.1",
+        description="Interface the metrics endpoint binds to"
+    )
+
+    metrics_snapshot_path: Optional[str] = Field(
+        default=None,
+        description="JSON file receiving periodic metrics snapshots (None = disabled)"
+    )
+
+    metrics_snapshot_interval: float = Field(
+        default=60.0,
+        gt=0,
+        description="Seconds between metrics snapshots"
+    )
+
+    claude_calls_per_minute: float = Field(
+        default=0.0,
+        ge=0,
+        description="Maximum claude invocations per minute (0 = unlimited)"
+    )
+
+    claude_burst: int = Field(
+        default=1,
+        ge=1,
+        description="Claude invocations allowed back to back before the per-minute rate applies"
+    )
+
+    claude_max_concurrent: int = Field(
+        default=0,
+        ge=0,
+        description="Maximum claude invocations running at once (0 = limited by max_workers only)"
+    )
+
+    priority_rules: List[PriorityRule] = Field(
+        default_factory=list,
+        description="Priority classes by extension, size or path pattern (first match wins)"
+    )
+
+    default_priority: int = Field(
+        default=10,
+        description="Priority of files matching no rule (lower runs first)"
+    )
+
+    priority_aging_seconds: float = Field(
+        default=60.0,
+        ge=0,
+        description="Seconds of waiting that raise a queued file by one priority level (0 = no aging)"
+    )
+
+    claude_timeout: float = Field(
+        default=300.0,
+        gt=0,
+        description="Maximum seconds a claude invocation may run before it is killed"
+    )
+
+    claude_max_retries: int = Field(
+        default=0,
+        ge=0,
+        description="Times a file is requeued after claude fails on it (0 = no retries)"
+    )
+
+    claude_retry_backoff: float = Field(
+        default=5.0,
+        ge=0,
+        description="Delay before the first retry in seconds; doubled for each further retry"
+    )
+
+    claude_retry_backoff_max: float = Field(
+        default=300.0,
+        ge=0,
+        description="Maximum delay between retries in seconds"
+    )
+
+    claude_retry_jitter: float = Field(
+        default=0.5,
+        ge=0,
+        le=1,
+        description="Fraction of each retry delay that is randomized"
+    )
+
+    circuit_breaker_threshold: int = Field(
+        default=0,
+        ge=0,
+        description="Consecutive claude failures that pause dispatch (0 = no circuit breaker)"
+    )
+
+    circuit_breaker_reset: float = Field(
+        default=60.0,
+        ge=0,
+        description="Seconds dispatch stays paused before a trial claude call"
+    )
+
+    latency_budget_multiplier: float = Field(
+        default=0.0,
+        ge=0,
+        description="Kill claude calls running longer than this multiple of the recent p95 duration (0 = off)"
+    )
+
+    latency_budget_min: float = Field(
+        default=60.0,
+        ge=0,
+        description="Lower bound of the adaptive latency budget in seconds"
+    )
+
+    archive_dir: Optional[str] = Field(
+        default=None,
+        description="Directory receiving archived files; relative paths are inside each watch root (None = off)"
+    )
+
+    archive_mode: Literal["directory", "zip"] = Field(
+        default="directory",
+        description="Archive into dated subdirectories or into one zip bundle per day"
+    )
+
+    archive_keep_recent: int = Field(
+        default=100,
+        ge=0,
+        description="Newest renamed files always kept in the watch directory"
+    )
+
+    archive_min_age: float = Field(
+        default=86400.0,
+        ge=0,
+        description="Seconds since the last modification before a renamed file is archived"
+    )
+
+    archive_max_hot_files: int = Field(
+        default=1000,
+        ge=0,
+        description="Renamed files in a watch directory that trigger archiving regardless of age (0 = never)"
+    )
+
+    archive_interval: float = Field(
+        default=3600.0,
+        gt=0,
+        description="Seconds between archiving runs"
+    )
+
     @field_validator('watch_path')
     @classmethod
-    def validate_watch_path(cls, v: str) -> str:
+    def validate_watch_path(cls, v: Optional[str]) -> Optional[str]:
         """Validate that watch_path is a valid directory."""
-        path = Path(v).expanduser().resolve()
-        if not path.exists():
-            raise ValueError(f"Watch path does not exist: {v}")
-        if not path.is_dir():
-            raise ValueError(f"Watch path is not a directory: {v}")
-        return str(path)
+        return None if v is None else validate_directory(v)
 
     @field_validator('file_extensions')
     @classmethod
     def validate_extensions(cls, v: List[str]) -> List[str]:
         """Ensure extensions start with a dot."""
-        return [ext if ext.startswith('.') else f'.{ext}' for ext in v]
+        return normalize_extensions(v)
 
     @field_validator('timestamp_format')
     @classmethod
     def validate_timestamp_format(cls, v: str) -> str:
         """Validate timestamp format."""
-        valid_formats = [
-            "mmddyy-HH-MM-SS-AMPM",
-            "mmddyy-HHMMSS-AMPM",
-            "mmddyy-HH:MM:SS-AMPM"
-        ]
-        if v not in valid_formats:
-            raise ValueError(
-                f"Invalid timestamp format: {v}. "
-                f"Valid formats: {', '.join(valid_formats)}"
-            )
+        return validate_timestamp_format(v)
+
+    @field_validator('include_patterns', 'exclude_patterns')
+    @classmethod
+    def validate_patterns(cls, v: List[str]) -> List[str]:
+        """Ensure re: patterns are valid regular expressions."""
+        for pattern in v:
+            if pattern.startswith("re:"):
+                try:
+                    re.compile(pattern[3:])
+                except re.error as e:
+                    raise ValueError(f"Invalid regular expression {pattern!r}: {e}")
         return v
 
+    @model_validator(mode='after')
+    def validate_roots(self) -> 'TestAssistantConfig':
+        """Ensure at least one directory is watched and every root has a prompt."""
+        if self.watch_path is None and not self.watch_roots:
+            raise ValueError("Either watch_path or watch_roots must be set")
+
+        roots = self.resolved_roots()
+        for root in roots:
+            if not root.claude_prompt:
+                raise ValueError(f"No claude_prompt for watch path: {root.path}")
+
+        paths = [root.path for root in roots]
+        duplicates = sorted({path for path in paths if paths.count(path) > 1})
+        if duplicates:
+            raise ValueError(f"Watch path configured more than once: {', '.join(duplicates)}")
+
+        if (self.min_file_size is not None and self.max_file_size is not None
+                and self.min_file_size > self.max_file_size):
+            raise ValueError("min_file_size must not be larger than max_file_size")
+
+        if self.archive_max_hot_files and self.archive_keep_recent >= self.archive_max_hot_files:
+            raise ValueError("archive_keep_recent must be smaller than archive_max_hot_files")
+        return self
+
+    def archive_path(self, root_path: str) -> Optional[Path]:
+        """Return the archive directory of a watch root.
+
+        Args:
+            root_path: Path of the watch root
+
+        Returns:
+            archive_dir inside the root if relative; with several roots, an
+            absolute archive_dir gets one subdirectory per root, named after
+            the root and a hash of its resolved path so that roots with the
+            same name never share a bundle. None if archiving is off.
+        """
+        if not self.archive_dir:
+            return None
+        archive_dir = Path(self.archive_dir).expanduser()
+        if not archive_dir.is_absolute():
+            return (Path(root_path) / archive_dir).resolve()
+        if len(self.resolved_roots()) > 1:
+            root = Path(root_path).expanduser().resolve()
+            digest = hashlib.sha256(str(root).encode()).hexdigest()[:8]
+            return archive_dir.resolve() / f"{root.name}-{digest}"
+        return archive_dir.resolve()
+
+    def resolved_roots(self) -> List[WatchRootConfig]:
+        """Return all watched directories with top-level defaults filled in.
+
+        Returns:
+            watch_path (if set) followed by watch_roots
+        """
+        roots = []
+        if self.watch_path is not None:
+            roots.append(WatchRootConfig.model_construct(path=self.watch_path))
+        roots.extend(self.watch_roots)
+
+        return [
+            WatchRootConfig.model_construct(
+                path=root.path,
+                claude_prompt=root.claude_prompt or self.claude_prompt,
+                file_extensions=self.file_extensions if root.file_extensions is None else root.file_extensions,
+                timestamp_format=root.timestamp_format or self.timestamp_format
+            )
+            for root in roots
+        ]
+
     @classmethod
     def from_yaml(cls, config_path: str) -> 'TestAssistantConfig':
         """Load configuration from YAML file."""
+        import yaml  # Imported on use to keep service startup fast
+
         with open(config_path, 'r') as f:
             config_data = yaml.safe_load(f)
         return cls(**config_data)
@@ -0,0 +1,111 @@
+"""Background console output for test-assistant."""
+import queue
+import sys
+import threading
+from typing import Optional, TextIO
+
+
+class Console:
+    """Terminal output written by a background thread.
+
+    Status lines (banners, emoji progress messages) go through print() and
+    are dropped in quiet mode; claude output goes through output() and is
+    always written. Until start() is called, text is written directly.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        """Initialize the console.
+
+        Args:
+            stream: Stream to write to (default: sys.stdout at write time)
+        """
+        self.stream = stream
+        self.quiet = False
+        self._queue: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def configure(self, quiet: bool = False):
+        """Set the output mode.
+
+        Args:
+            quiet: If True, status lines are suppressed
+        """
+        self.quiet = quiet
+
+    def print(self, *args, sep: str = " ", end: str = "\n"):
+        """Write a status line (suppressed in quiet mode).
+
+        Args:
+            args: Values to print, like the print builtin
+            sep: Separator between values
+            end: Text appended at the end
+        """
+        if not self.quiet:
+            self._write(sep.join(str(arg) for arg in args) + end)
+
+    def output(self, *args, sep: str = " ", end: str = "\n"):
+        """Write claude output (not affected by quiet mode).
+
+        Args:
+            args: Values to print, like the print builtin
+            sep: Separator between values
+            end: Text appended at the end
+        """
+        self._write(sep.join(str(arg) for arg in args) + end)
+
+    def _write(self, text: str):
+        if self._thread is not None:
+            self._queue.put(text)
+            return
+        with self._lock:
+            self._emit(text)
+
+    def _emit(self, text: str):
+        stream = self.stream or sys.stdout
+        try:
+            stream.write(text)
+            stream.flush()
+        except (OSError, ValueError):
+            pass  # Closed or broken terminal; console output is best effort
+
+    def start(self):
+        """Start the background writer."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="console-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            text = self._queue.get()
+            if text is None:
+                return
+            # Write everything queued so far in one go
+            chunks = [text]
+            stop = False
+            while True:
+                try:
+                    text = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if text is None:
+                    stop = True
+                    break
+                chunks.append(text)
+            self._emit("".join(chunks))
+            if stop:
+                return
+
+    def stop(self):
+        """Write pending output and stop the background writer."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=5)
+
+
+# Shared console used by all modules
+console = Console()
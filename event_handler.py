@@ -1,50 +1,240 @@
 """Watchdog event handler for test-assistant."""
 import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from watchdog.events import FileSystemEventHandler, FileCreatedEvent
-from typing import List
+from watchdog.events import FileSystemEventHandler
+from typing import Dict, List, Optional, Set, Tuple
 import logging
+import os
 import queue
 import threading
 
+from file_filter import FileFilter
 from file_handler import FileHandler
 from claude_runner import ClaudeCodeRunner
+from console import console
+from failure_policy import CircuitBreaker, RetryPolicy
+from metrics import Histogram, MetricsRegistry
+from scheduler import PriorityClassifier, PriorityWorkQueue
+from work_queue import WorkJournal
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(eq=False)
+class WatchRoot:
+    """A watched directory with its own claude runner, file handler and file filter."""
+
+    watch_dir: Path
+    claude_runner: ClaudeCodeRunner
+    file_handler: FileHandler
+    file_extensions: List[str] = field(default_factory=list)
+    file_filter: Optional[FileFilter] = None
+
+    def __post_init__(self):
+        self.watch_dir = Path(self.watch_dir)
+        if self.file_filter is None:
+            self.file_filter = FileFilter(extensions=self.file_extensions)
+        self.prefix = os.path.join(str(self.watch_dir), "")
+
+    def contains(self, file_path: Path) -> bool:
+        """Check if a path lies inside this root."""
+        return str(file_path).startswith(self.prefix)
+
+
+@dataclass
+class PipelineItem:
+    """A file moving through the rename and analysis stages."""
+
+    path: Path
+    job: Optional[Tuple[int, str]] = None
+    inode: Optional[int] = None
+    root: Optional[WatchRoot] = None
+    attempts: int = 0
+
+
 class TestAssistantEventHandler(FileSystemEventHandler):
-    """Event handler for file system changes."""
+    """Event handler for file system changes.
+
+    The handler serves one or more watch roots (see add_root) with a single
+    pipeline; events and queued files are routed to the root containing
+    them, so all roots share the workers and the priority queue.
+    """
 
     def __init__(
         self,
         watch_dir: str,
         claude_runner: ClaudeCodeRunner,
         file_handler: FileHandler,
-        file_extensions: List[str]
+        file_extensions: List[str],
+        max_workers: int = 1,
+        stability_workers: int = 4,
+        journal: Optional[WorkJournal] = None,
+        batch_window: float = 0.0,
+        batch_max_files: int = 10,
+        batch_max_bytes: int = 10 * 1024 * 1024,
+        metrics: Optional[MetricsRegistry] = None,
+        priority_classifier: Optional[PriorityClassifier] = None,
+        priority_aging: float = 60.0,
+        file_filter: Optional[FileFilter] = None,
+        debounce_window: float = 0.0,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None
     ):
         """Initialize event handler.
 
         Args:
-            watch_dir: Directory being watched
-            claude_runner: Claude CLI runner instance
-            file_handler: File handler instance with configured settings
-            file_extensions: List of file extensions to watch (empty = all)
+            watch_dir: Directory being watched (the first watch root)
+            claude_runner: Claude CLI runner instance for watch_dir
+            file_handler: File handler instance with configured settings for watch_dir
+            file_extensions: List of file extensions to watch in watch_dir (empty = all)
+            max_workers: Number of analysis workers running claude in parallel
+            stability_workers: Number of workers waiting for files to be completely written
+            journal: Optional durable journal mirroring the in-memory queue
+            batch_window: Seconds to collect further files into one claude call (0 = no batching)
+            batch_max_files: Maximum number of files per batch
+            batch_max_bytes: Maximum total size of the files in a batch
+            metrics: Registry receiving queue depth and stage latencies
+            priority_classifier: Orders queued files by priority (default: FIFO)
+            priority_aging: Seconds of waiting worth one priority level
+            file_filter: Name, size, hidden and temp file rules for watch_dir
+                (default: file_extensions only)
+            debounce_window: Seconds a created file must go without further events
+                before it is queued (0 = queue at once)
+            retry_policy: Requeues files claude failed on, with backoff (default: no retries)
+            circuit_breaker: Pauses analysis after consecutive claude failures
         """
         super().__init__()
         self.watch_dir = Path(watch_dir)
         self.file_handler = file_handler
         self.claude_runner = claude_runner
         self.file_extensions = file_extensions
+        self.journal = journal
+        self.batch_window = batch_window
+        self.batch_max_files = batch_max_files
+        self.batch_max_bytes = batch_max_bytes
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        # Failed items waiting out their backoff, keyed by id(item)
+        self._retry_timers: Dict[int, threading.Timer] = {}
 
-        # Queue-based processing instead of boolean flag
-        self.file_queue = queue.Queue()
-        self.worker_thread = threading.Thread(target=self._process_queue, daemon=True)
-        self.worker_thread.start()
+        # Pipeline: stability workers -> single rename worker -> analysis workers.
+        # file_queue is the entry point; a file counts as unfinished there until
+        # it leaves the last stage, so file_queue.join() waits for the pipeline.
         self._shutdown = False
-    
+        self.file_queue = PriorityWorkQueue(
+            priority_classifier.classify if priority_classifier is not None else None,
+            aging_seconds=priority_aging
+        )
+        self.rename_queue = queue.Queue()
+        self.analysis_queue = PriorityWorkQueue(
+            (lambda item: priority_classifier.classify(item.path)) if priority_classifier is not None else None,
+            aging_seconds=priority_aging
+        )
+
+        # Files past the stability stage, keyed by current path, follow later renames
+        self._in_flight: Dict[Path, PipelineItem] = {}
+        self._in_flight_lock = threading.Lock()
+
+        # Watch roots, most specific first so nested roots win the routing
+        self.roots: List[WatchRoot] = []
+        self.primary_root = WatchRoot(self.watch_dir, claude_runner, file_handler, file_extensions, file_filter)
+        self.add_root(self.primary_root)
+
+        # Queued paths not yet past the stability stage (with their inode); a
+        # writer renaming one of these has finished it under the new name
+        self._awaiting_stability: Dict[Path, Optional[int]] = {}
+        # Inodes of all queued or in-progress files, so duplicate events are
+        # coalesced even after the file was renamed
+        self._pending_inodes: Set[int] = set()
+
+        # Created files waiting out the debounce window, with their deadline
+        self.debounce_window = debounce_window
+        self._debounce_deadlines: Dict[Path, float] = {}
+        self._debounce_cond = threading.Condition()
+
+        self.metrics = metrics or MetricsRegistry()
+        self.metrics.gauge(
+            "file_queue_depth",
+            "Files waiting in the processing queue",
+            callback=self.file_queue.qsize
+        )
+        for stage, stage_queue in (("rename", self.rename_queue), ("analysis", self.analysis_queue)):
+            self.metrics.gauge(
+                "stage_queue_depth",
+                "Files waiting for a pipeline stage",
+                labels={"stage": stage},
+                callback=stage_queue.qsize
+            )
+
+        self.stability_threads = self._start_workers(
+            self._stability_loop, "test-assistant-stability", stability_workers
+        )
+        self.rename_threads = self._start_workers(self._rename_loop, "test-assistant-rename", 1)
+        self.worker_threads = self._start_workers(self._analysis_loop, "test-assistant-worker", max_workers)
+        self.debounce_thread: Optional[threading.Thread] = None
+        if self.debounce_window > 0:
+            self.debounce_thread = self._start_workers(self._debounce_loop, "test-assistant-debounce", 1)[0]
+
+    def _start_workers(self, target, name: str, count: int) -> List[threading.Thread]:
+        """Start the worker threads of one pipeline stage.
+
+        Args:
+            target: Worker loop
+            name: Thread name prefix
+            count: Number of threads
+
+        Returns:
+            Started threads
+        """
+        threads = []
+        for index in range(max(1, count)):
+            worker = threading.Thread(target=target, name=f"{name}-{index + 1}", daemon=True)
+            worker.start()
+            threads.append(worker)
+        return threads
+
+    def add_root(self, root: WatchRoot):
+        """Serve another watched directory with this handler's pipeline.
+
+        Args:
+            root: Directory with its own runner, file handler and extensions
+        """
+        if self.journal is not None:
+            # Keep journal paths current through timestamp and -latest renames
+            root.file_handler.add_rename_listener(self.journal.note_renamed)
+        root.file_handler.add_rename_listener(self._track_rename)
+        self.roots.append(root)
+        self.roots.sort(key=lambda r: len(r.prefix), reverse=True)
+
+    def root_for(self, file_path: Path) -> WatchRoot:
+        """Return the watch root a file belongs to.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            The most specific root containing the file (the first root if none does)
+        """
+        for root in self.roots:
+            if root.contains(file_path):
+                return root
+        return self.primary_root
+
+    def filter_reason(self, file_path: Path) -> Optional[str]:
+        """Check a file against the name rules of its root's filter.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            None if the file should be processed, otherwise why it is rejected
+        """
+        root = self.root_for(file_path)
+        return root.file_filter.reject_reason(file_path, root.watch_dir)
+
     def should_process_file(self, file_path: Path) -> bool:
-        """Check if file should be processed based on extension.
+        """Check if file should be processed based on its name.
 
         Args:
             file_path: Path to the file
@@ -52,64 +242,612 @@ class TestAssistantEventHandler(FileSystemEventHandler):
         Returns:
             True if file should be processed
         """
-        # If no extensions specified, process all files
-        if not self.file_extensions:
-            return True
+        return self.filter_reason(file_path) is None
+
+    def is_temp_file(self, file_path: Path) -> bool:
+        """Check if a file is a partial file still being written.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            True if the filename matches one of the temp file patterns
+        """
+        return self.root_for(file_path).file_filter.is_temp_file(file_path)
 
-        # Check if file extension matches any in the list
-        return file_path.suffix.lower() in [ext.lower() for ext in self.file_extensions]
+    def is_pending(self, file_path: Path) -> bool:
+        """Check if a file is queued or in progress under its current name.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            True while the file is anywhere in the pipeline
+        """
+        with self._in_flight_lock:
+            return file_path in self._awaiting_stability or file_path in self._in_flight
+
+    def pending_count(self) -> int:
+        """Return the number of files anywhere in the pipeline.
+
+        Returns:
+            Files queued or being processed
+        """
+        return self.file_queue.unfinished_tasks
+
+    def enqueue_file(self, file_path: Path) -> bool:
+        """Add a file to the processing queue (and the journal, if enabled).
+
+        Repeated events for a file that is already waiting (by path) or in
+        progress (by inode, under any name) are coalesced into its existing
+        queue entry.
+
+        Args:
+            file_path: Path to the file to process
 
-    def _process_queue(self):
-        """Worker thread that processes files from the queue."""
+        Returns:
+            True if queued, False if the file is already pending or gone
+        """
+        root = self.root_for(file_path)
+        try:
+            stat_result = os.stat(file_path)
+        except OSError:
+            # Typically a late event for a file that was already renamed
+            self._count_duplicate("gone")
+            logger.debug(f"File gone before queueing: {file_path.name}")
+            root.file_handler.forget(file_path)
+            return False
+        inode = stat_result.st_ino
+
+        # Files may still grow, so only max_size can be decided this early
+        max_size = root.file_filter.max_size
+        if max_size is not None and stat_result.st_size > max_size:
+            self._count_filtered("size")
+            logger.info(f"Skipping file (larger than {max_size} bytes): {file_path.name}")
+            root.file_handler.forget(file_path)
+            return False
+
+        with self._in_flight_lock:
+            awaiting = file_path in self._awaiting_stability
+            duplicate = awaiting or inode in self._pending_inodes
+            if not duplicate:
+                self._awaiting_stability[file_path] = inode
+                self._pending_inodes.add(inode)
+        if duplicate:
+            self._count_duplicate("pending")
+            logger.debug(f"File already pending: {file_path.name}")
+            if not awaiting:
+                root.file_handler.forget(file_path)  # Otherwise the queued entry still uses it
+            return False
+
+        if self.journal is not None and not self.journal.enqueue(file_path):
+            logger.debug(f"File already pending in journal: {file_path.name}")
+            with self._in_flight_lock:
+                self._awaiting_stability.pop(file_path, None)
+                self._pending_inodes.discard(inode)
+            root.file_handler.forget(file_path)
+            return False
+
+        self.file_queue.put(file_path)
+        logger.debug(f"File added to queue: {file_path.name}")
+        return True
+
+    def debounce_file(self, file_path: Path):
+        """Queue a file once no further events arrive for debounce_window seconds.
+
+        Args:
+            file_path: Path to the file to process
+        """
+        if self.debounce_window <= 0:
+            self.enqueue_file(file_path)
+            return
+
+        with self._debounce_cond:
+            if file_path in self._debounce_deadlines:
+                self._count_duplicate("debounced")
+            self._debounce_deadlines[file_path] = time.monotonic() + self.debounce_window
+            self._debounce_cond.notify()
+
+    def _debounce_loop(self):
+        """Queue debounced files whose window has passed."""
         while not self._shutdown:
+            with self._debounce_cond:
+                now = time.monotonic()
+                due = [path for path, deadline in self._debounce_deadlines.items() if deadline <= now]
+                for file_path in due:
+                    del self._debounce_deadlines[file_path]
+                if not due:
+                    next_deadline = min(self._debounce_deadlines.values(), default=now + 1.0)
+                    self._debounce_cond.wait(min(1.0, next_deadline - now))
+                    continue
+            for file_path in due:
+                self.enqueue_file(file_path)
+
+    def _count_duplicate(self, reason: str):
+        """Count file events coalesced into an existing queue entry.
+
+        Args:
+            reason: pending, debounced or gone
+        """
+        self.metrics.counter(
+            "duplicate_events_total",
+            "File events suppressed as duplicates by reason",
+            labels={"reason": reason}
+        ).inc()
+
+    def _count_filtered(self, reason: str):
+        """Count file events rejected by the file filter.
+
+        Args:
+            reason: Rule that rejected the file (see FileFilter.reject_reason),
+                size or renamed_output
+        """
+        self.metrics.counter(
+            "filtered_events_total",
+            "File events rejected by the file filter by reason",
+            labels={"reason": reason}
+        ).inc()
+
+    def resume_journal(self) -> int:
+        """Requeue files left unfinished by a previous run.
+
+        Returns:
+            Number of files requeued
+        """
+        if self.journal is None:
+            return 0
+
+        recovered = self.journal.recover()
+        for file_path in recovered:
+            # Register like enqueue_file, so live events for the file are coalesced
             try:
-                # Wait for a file with timeout to allow checking shutdown flag
-                file_path = self.file_queue.get(timeout=1.0)
+                inode = os.stat(file_path).st_ino
+            except OSError:
+                inode = None  # Gone; the stability stage finds out and drops the job
+            with self._in_flight_lock:
+                self._awaiting_stability[file_path] = inode
+                if inode is not None:
+                    self._pending_inodes.add(inode)
+            self.file_queue.put(file_path)
+        if recovered:
+            logger.info(f"Resumed {len(recovered)} file(s) from work journal")
+        return len(recovered)
+
+    def _track_rename(self, old_path: Path, new_path: Path):
+        """Keep in-flight paths current (FileHandler rename listener).
 
-                if file_path is None:  # Shutdown signal
-                    break
+        Args:
+            old_path: Path before renaming
+            new_path: Path after renaming
+        """
+        with self._in_flight_lock:
+            item = self._in_flight.pop(old_path, None)
+            if item is not None:
+                item.path = new_path
+                self._in_flight[new_path] = item
+
+    def _track(self, item: PipelineItem):
+        """Start following renames of an item."""
+        with self._in_flight_lock:
+            self._in_flight[item.path] = item
+
+    def _finish_item(self, item: PipelineItem):
+        """Release an item that left the pipeline.
+
+        Args:
+            item: Finished, skipped or failed item
+        """
+        with self._in_flight_lock:
+            if self._in_flight.get(item.path) is item:
+                del self._in_flight[item.path]
+            if item.inode is not None:
+                self._pending_inodes.discard(item.inode)
+        if item.job is not None:
+            self.journal.ack(item.job[0])
+        self.file_queue.task_done()
+
+    def _next_item(self, stage_queue: queue.Queue):
+        """Take the next entry from a stage queue.
 
-                self._process_file(file_path)
+        Args:
+            stage_queue: Queue of the calling stage
+
+        Returns:
+            The entry, None for the shutdown signal, or False on timeout
+        """
+        try:
+            # Wait with timeout to allow checking shutdown flag
+            return stage_queue.get(timeout=1.0)
+        except queue.Empty:
+            return False
+
+    def _stability_loop(self):
+        """Stability stage: wait until files are completely written.
+
+        Slow uploads are waited on here in parallel, so complete files are
+        not held up behind them.
+        """
+        while not self._shutdown:
+            file_path = self._next_item(self.file_queue)
+            if file_path is False:
+                continue
+            if file_path is None:  # Shutdown signal
                 self.file_queue.task_done()
+                break
 
-            except queue.Empty:
+            with self._in_flight_lock:
+                item = PipelineItem(
+                    file_path,
+                    inode=self._awaiting_stability.get(file_path),
+                    root=self.root_for(file_path)
+                )
+            try:
+                item.job = self.journal.claim(file_path) if self.journal is not None else None
+                logger.info(f"Processing file from queue: {file_path.name}")
+                console.print(f"\n📁 PROCESSING FILE: {file_path.name}")
+
+                if item.job is not None and item.job[1] == WorkJournal.RENAMED:
+                    # Renamed before a restart; only the analysis is missing
+                    if not file_path.exists():
+                        logger.warning(f"Journaled file disappeared: {file_path.name}")
+                        self._skip(item)
+                        continue
+                    console.print(f"♻️  RESUMING ANALYSIS: {file_path.name}\n")
+                    self._track(item)
+                    self.analysis_queue.put(item)
+                    continue
+
+                # Wait for file to be stable (completely written)
+                with self._stage_timer("stability").time():
+                    is_stable = item.root.file_handler.wait_for_file_stability(file_path)
+                if not is_stable:
+                    with self._in_flight_lock:
+                        if file_path not in self._awaiting_stability:
+                            item.inode = None  # Renamed; the new name owns the inode now
+                    logger.warning(f"File not stable, skipping: {file_path.name}")
+                    self._skip(item)
+                    continue
+                if not self._size_accepted(item):
+                    self._skip(item)
+                    continue
+
+                self._track(item)
+                self.rename_queue.put(item)
+            except Exception as e:
+                self._fail(item, e)
+            finally:
+                with self._in_flight_lock:
+                    self._awaiting_stability.pop(file_path, None)
+                item.root.file_handler.forget(file_path)
+
+    def _size_accepted(self, item: PipelineItem) -> bool:
+        """Check a completely written file against the size bounds of its filter.
+
+        Args:
+            item: Pipeline item past the stability stage
+
+        Returns:
+            True if the file is within the bounds (or none are configured)
+        """
+        file_filter = item.root.file_filter
+        if not file_filter.has_size_limits:
+            return True
+        try:
+            size = item.path.stat().st_size
+        except OSError:
+            return True  # Let the rename stage report the missing file
+        if file_filter.accepts_size(size):
+            return True
+        self._count_filtered("size")
+        logger.info(f"Skipping file (size {size} bytes outside limits): {item.path.name}")
+        return False
+
+    def _rename_loop(self):
+        """Rename stage: rename complete files with timestamp-latest.
+
+        Renames are serialized by FileHandler, so this stage has one worker.
+        """
+        while not self._shutdown:
+            item = self._next_item(self.rename_queue)
+            if item is False:
                 continue
+            if item is None:  # Shutdown signal
+                self.rename_queue.task_done()
+                break
+
+            try:
+                # Check if file still exists
+                if not item.path.exists():
+                    logger.warning(f"File disappeared: {item.path.name}")
+                    self._skip(item)
+                    continue
+
+                # Rename with timestamp-latest; _track_rename updates item.path
+                with self._stage_timer("rename").time():
+                    item.root.file_handler.process_new_file(item.path)
+
+                console.print(f"✅ FILE RENAMED: {item.path.name}\n")
+                self.analysis_queue.put(item)
             except Exception as e:
+                self._fail(item, e)
+            finally:
+                self.rename_queue.task_done()
+
+    def _analysis_loop(self):
+        """Analysis stage: run claude on renamed files.
+
+        Several workers run this loop concurrently; files arriving within
+        the batch window share one claude invocation.
+        """
+        while not self._shutdown:
+            item = self._next_item(self.analysis_queue)
+            if item is False:
+                continue
+            if item is None:  # Shutdown signal
+                self.analysis_queue.task_done()
+                break
+
+            batch = [item]
+            if self.batch_window > 0:
+                batch.extend(self._collect_batch(item))
+
+            # Ids of files that stay pending: retried, or not sent to claude
+            # before shutdown (those stay in the journal)
+            retried: Set[int] = {id(entry) for entry in batch}
+            try:
+                # A claude call covers files of one root (one prompt); each
+                # call needs its own go-ahead from the circuit breaker
+                failed: List[PipelineItem] = []
+                for root in dict.fromkeys(entry.root for entry in batch):
+                    if not self._wait_for_circuit():
+                        break
+                    items = [entry for entry in batch if entry.root is root]
+                    retried.difference_update(id(entry) for entry in items)
+                    if len(items) > 1:
+                        failed.extend(self._process_batch(items))
+                    else:
+                        failed.extend(self._process_file(items[0]))
+                retried.update(id(entry) for entry in failed if self._retry(entry))
+            except Exception as e:
+                retried.clear()
+                self._count_file("error", len(batch))
                 logger.error(f"Error in queue processing: {e}", exc_info=True)
+            finally:
+                for entry in batch:
+                    if id(entry) not in retried:
+                        self._finish_item(entry)
+                    self.analysis_queue.task_done()
+
+    def _wait_for_circuit(self) -> bool:
+        """Block while the circuit breaker pauses claude dispatch.
 
-    def _process_file(self, file_path: Path):
-        """Process a single file.
+        Returns:
+            True to proceed, False if the handler is shutting down
+        """
+        if self.circuit_breaker is None:
+            return True
+        while not self.circuit_breaker.before_call(timeout=1.0):
+            if self._shutdown:
+                return False
+        return True
+
+    def _record_call(self, succeeded: bool):
+        """Report the outcome of a claude call to the circuit breaker."""
+        if self.circuit_breaker is None:
+            return
+        if succeeded:
+            self.circuit_breaker.record_success()
+        else:
+            self.circuit_breaker.record_failure()
+
+    def _retry(self, item: PipelineItem) -> bool:
+        """Schedule another claude attempt for a file claude failed on.
 
         Args:
-            file_path: Path to the file to process
+            item: Failed item
+
+        Returns:
+            True if the file stays pending (retry scheduled, or killed by
+            shutdown and kept in the journal), False if the file is given up
+        """
+        if self._shutdown:
+            logger.info(f"Interrupted by shutdown, kept for next start: {item.path.name}")
+            return True
+
+        attempt = item.attempts + 1
+        if self.retry_policy is None or not self.retry_policy.should_retry(attempt):
+            logger.error(f"Giving up on {item.path.name} after {item.attempts + 1} attempt(s)")
+            self._count_file("failed")
+            return False
+
+        item.attempts = attempt
+        delay = self.retry_policy.delay(attempt)
+        logger.warning(
+            f"claude failed on {item.path.name}; retry {attempt}/{self.retry_policy.max_retries} in {delay:.1f}s"
+        )
+        console.print(f"🔁 RETRYING {item.path.name} in {delay:.1f}s")
+        self.metrics.counter("claude_retries_total", "Files requeued after a claude failure").inc()
+
+        timer = threading.Timer(delay, self._requeue, args=(item,))
+        timer.daemon = True
+        with self._in_flight_lock:
+            self._retry_timers[id(item)] = timer
+        timer.start()
+        return True
+
+    def _requeue(self, item: PipelineItem):
+        """Put a failed item back into the analysis queue after its backoff."""
+        with self._in_flight_lock:
+            self._retry_timers.pop(id(item), None)
+        if not self._shutdown:
+            self.analysis_queue.put(item)
+
+    def _skip(self, item: PipelineItem):
+        """Drop an item that does not need analysis."""
+        self._count_file("skipped")
+        self._finish_item(item)
+
+    def _fail(self, item: PipelineItem, error: Exception):
+        """Drop an item after an unexpected error."""
+        self._count_file("error")
+        logger.error(f"Error processing file: {error}", exc_info=True)
+        console.print(f"\n❌ ERROR: {error}\n")
+        self._finish_item(item)
+
+    def _collect_batch(self, first: PipelineItem) -> List[PipelineItem]:
+        """Collect renamed files arriving within the batch window after the first one.
+
+        Args:
+            first: Item that opened the batch
+
+        Returns:
+            Additional items for the batch (possibly empty)
+        """
+        collected: List[PipelineItem] = []
+        total_bytes = self._file_size(first.path)
+        deadline = time.time() + self.batch_window
+
+        while len(collected) + 1 < self.batch_max_files and total_bytes < self.batch_max_bytes:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                item = self.analysis_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            if item is None:
+                # Leave the shutdown signal for the worker loop
+                self.analysis_queue.task_done()
+                self.analysis_queue.put(None)
+                break
+
+            collected.append(item)
+            total_bytes += self._file_size(item.path)
+
+        if collected:
+            logger.info(f"Batched {len(collected) + 1} files ({total_bytes} bytes)")
+        return collected
+
+    def _stage_timer(self, stage: str) -> Histogram:
+        """Return the latency histogram of a processing stage.
+
+        Args:
+            stage: Stage name (stability, rename or claude)
+
+        Returns:
+            Histogram to time the stage with
+        """
+        return self.metrics.histogram(
+            "stage_duration_seconds",
+            "Time spent per processing stage",
+            labels={"stage": stage}
+        )
+
+    def _count_file(self, outcome: str, count: int = 1):
+        """Count processed files by outcome.
+
+        Args:
+            outcome: analyzed, failed, skipped or error
+            count: Number of files
+        """
+        self.metrics.counter(
+            "files_processed_total",
+            "Files taken from the queue by outcome",
+            labels={"outcome": outcome}
+        ).inc(count)
+
+    @staticmethod
+    def _file_size(file_path: Path) -> int:
+        """Return the current size of a file (0 if it cannot be read).
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            Size in bytes
         """
         try:
-            logger.info(f"Processing file from queue: {file_path.name}")
-            print(f"\n📁 PROCESSING FILE: {file_path.name}")
+            return file_path.stat().st_size
+        except OSError:
+            return 0
 
-            # Wait for file to be stable (completely written)
-            if not self.file_handler.wait_for_file_stability(file_path):
-                logger.warning(f"File not stable, skipping: {file_path.name}")
-                return
+    @staticmethod
+    def _hold(item: PipelineItem) -> Path:
+        """Keep an item's file name valid while claude reads it (see FileHandler.hold).
 
-            # Check if file still exists
-            if not file_path.exists():
-                logger.warning(f"File disappeared: {file_path.name}")
-                return
+        Args:
+            item: Item about to be analyzed
+
+        Returns:
+            Path to give claude; release it once claude is done
+        """
+        while True:
+            file_path = item.path
+            # A failed hold after a rename is retried with the path _track_rename set
+            if item.root.file_handler.hold(file_path) or item.path == file_path:
+                return file_path
+
+    def _process_file(self, item: PipelineItem) -> List[PipelineItem]:
+        """Analyze a single renamed file.
 
-            # Process the file (rename with timestamp-latest)
-            renamed_path = self.file_handler.process_new_file(file_path)
+        Args:
+            item: Renamed file
 
-            print(f"✅ FILE RENAMED: {renamed_path.name}\n")
+        Returns:
+            The item if claude failed on it, otherwise an empty list
+        """
+        # Trigger claude CLI
+        file_path = self._hold(item)
+        try:
+            with self._stage_timer("claude").time():
+                output = item.root.claude_runner.run_claude_code(file_path)
+        except Exception:
+            self._record_call(False)  # Otherwise a half-open trial never ends
+            raise
+        finally:
+            item.root.file_handler.release(file_path)
+        self._record_call(output is not None)
 
-            # Trigger claude CLI
-            self.claude_runner.run_claude_code(renamed_path)
+        console.print("\n👀 Watching for next file...\n")
+        if output is None:
+            return [item]
+        self._count_file("analyzed")
+        return []
 
-            print(f"\n👀 Watching for next file...\n")
+    def _process_batch(self, items: List[PipelineItem]) -> List[PipelineItem]:
+        """Analyze several renamed files with a single claude invocation.
 
-        except Exception as e:
-            logger.error(f"Error processing file: {e}", exc_info=True)
-            print(f"\n❌ ERROR: {e}\n")
+        Args:
+            items: Renamed files
+
+        Returns:
+            Items claude failed on
+        """
+        logger.info(f"Processing batch of {len(items)} files from queue")
+        console.print(f"\n📦 PROCESSING BATCH OF {len(items)} FILES")
+
+        # Trigger one claude CLI call for the whole batch
+        file_handler = items[0].root.file_handler
+        paths = [self._hold(item) for item in items]
+        try:
+            with self._stage_timer("claude").time():
+                results = items[0].root.claude_runner.run_claude_code_batch(paths)
+        except Exception:
+            self._record_call(False)
+            raise
+        finally:
+            for path in paths:
+                file_handler.release(path)
+        failed = [item for item, path in zip(items, paths) if results.get(path) is None]
+        self._record_call(len(failed) < len(items))
+        self._count_file("analyzed", len(items) - len(failed))
+        for path in paths:
+            status = "ok" if results.get(path) is not None else "failed"
+            logger.info(f"Batch result for {path.name}: {status}")
+
+        console.print("\n👀 Watching for next file...\n")
+        return failed
 
     def on_created(self, event):
         """Handle file creation events.
@@ -122,22 +860,142 @@ class TestAssistantEventHandler(FileSystemEventHandler):
             return
 
         file_path = Path(event.src_path)
+        file_handler = self.root_for(file_path).file_handler
+        file_handler.note_file_added(file_path)
+        if file_handler.is_own_link(file_path):
+            return  # Our own rename, done by link/unlink
 
         # Check if we should process this file
-        if not self.should_process_file(file_path):
-            logger.info(f"Skipping file (extension not watched): {file_path.name}")
+        reason = self.filter_reason(file_path)
+        if reason is None and file_handler.is_renamed_output(file_path):
+            reason = "renamed_output"
+        if reason is not None:
+            self._count_filtered(reason)
+            logger.debug(f"Skipping file ({reason}): {file_path.name}")
             return
 
         logger.info(f"New file detected: {file_path.name}")
-        print(f"\n📁 NEW FILE DETECTED: {file_path.name}")
+        console.print(f"\n📁 NEW FILE DETECTED: {file_path.name}")
 
-        # Add to queue for processing
-        self.file_queue.put(file_path)
-        logger.debug(f"File added to queue: {file_path.name}")
+        # Register before queueing so an early close-write is not missed
+        file_handler.expect_close(file_path)
+
+        # Add to queue for processing (after the debounce window, if any)
+        self.debounce_file(file_path)
+
+    def on_deleted(self, event):
+        """Handle file deletion events (keeps the -latest index in sync).
+
+        Args:
+            event: File system event
+        """
+        if event.is_directory:
+            return
+
+        file_path = Path(event.src_path)
+        self.root_for(file_path).file_handler.note_file_removed(file_path)
+
+    def on_moved(self, event):
+        """Handle file move events.
+
+        Keeps the -latest index in sync. A file moved to a name the filter
+        accepts was written completely by an atomic rename (from a temp or
+        hidden name, a non-watched extension, or outside the watched tree)
+        and is queued without waiting for stability. Renames to the
+        timestamped form are our own and are not queued.
+
+        Args:
+            event: File system event
+        """
+        if event.is_directory:
+            return
+
+        # Unmatched inotify moves have an empty source or destination path
+        src_path = Path(event.src_path) if event.src_path else None
+        dest_path = Path(event.dest_path) if event.dest_path else None
+
+        if src_path is not None:
+            src_handler = self.root_for(src_path).file_handler
+            src_handler.note_file_removed(src_path)
+            # Wake a stability wait on the old name; it finds the file gone
+            src_handler.notify_closed(src_path)
+        if dest_path is None:
+            return
+        dest_handler = self.root_for(dest_path).file_handler
+        dest_handler.note_file_added(dest_path)
+
+        if src_path is not None:
+            with self._in_flight_lock:
+                # The new name takes over the queue entry of a file waiting
+                # for stability; the old entry finds its file gone
+                inode = self._awaiting_stability.pop(src_path, None)
+                if inode is not None:
+                    self._pending_inodes.discard(inode)
+                # Items past the stability stage follow the file instead
+                item = self._in_flight.pop(src_path, None)
+                if item is not None:
+                    item.path = dest_path
+                    self._in_flight[dest_path] = item
+            src_handler.forget(src_path)
+            if item is not None:
+                return
+            with self._debounce_cond:
+                self._debounce_deadlines.pop(src_path, None)
+
+        if dest_handler.is_renamed_output(dest_path):
+            return  # Our own timestamp renames
+        reason = self.filter_reason(dest_path)
+        if reason is not None:
+            self._count_filtered(reason)
+            return
+
+        logger.info(f"File moved into place: {dest_path.name}")
+        console.print(f"\n📁 NEW FILE DETECTED: {dest_path.name}")
+        dest_handler.mark_complete(dest_path)
+        self.enqueue_file(dest_path)
+
+    def on_closed(self, event):
+        """Handle file closed-after-writing events (inotify IN_CLOSE_WRITE).
+
+        Args:
+            event: File system event
+        """
+        if event.is_directory:
+            return
+
+        file_path = Path(event.src_path)
+        self.root_for(file_path).file_handler.notify_closed(file_path)
 
     def shutdown(self):
         """Shutdown the event handler gracefully."""
         logger.info("Shutting down event handler...")
         self._shutdown = True
-        self.file_queue.put(None)  # Signal worker to stop
-        self.worker_thread.join(timeout=5)
+        with self._in_flight_lock:
+            timers, self._retry_timers = list(self._retry_timers.values()), {}
+        for timer in timers:
+            timer.cancel()  # Files waiting for a retry stay in the journal
+
+        # claude runs in its own session, so it does not see the terminal's
+        # Ctrl+C; kill it so the workers are not left waiting on it
+        for claude_runner in dict.fromkeys(root.claude_runner for root in self.roots):
+            if hasattr(claude_runner, "terminate_processes"):
+                claude_runner.terminate_processes()
+
+        stages = (
+            (self.file_queue, self.stability_threads),
+            (self.rename_queue, self.rename_threads),
+            (self.analysis_queue, self.worker_threads),
+        )
+        for stage_queue, threads in stages:
+            for _ in threads:
+                stage_queue.put(None)  # Signal each worker to stop
+
+        with self._debounce_cond:
+            self._debounce_cond.notify()
+        if self.debounce_thread is not None:
+            self.debounce_thread.join(timeout=1)
+
+        deadline = time.time() + 5
+        for _, threads in stages:
+            for worker in threads:
+                worker.join(timeout=max(0.0, deadline - time.time()))
@@ -0,0 +1,213 @@
+"""Retry, circuit breaker and latency budget for claude invocations in test-assistant."""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """Bounded retries with exponential backoff and jitter."""
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        backoff: float = 5.0,
+        backoff_max: float = 300.0,
+        jitter: float = 0.5
+    ):
+        """Initialize the retry policy.
+
+        Args:
+            max_retries: Retries after the first attempt (0 = never retry)
+            backoff: Delay before the first retry in seconds; doubled for each further retry
+            backoff_max: Upper bound of the delay
+            jitter: Fraction of the delay that is randomized (0 = fixed delays)
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+
+    def should_retry(self, attempt: int) -> bool:
+        """Check if another attempt is allowed.
+
+        Args:
+            attempt: Number of the retry about to be made (1 = first retry)
+
+        Returns:
+            True if the retry is within max_retries
+        """
+        return attempt <= self.max_retries
+
+    def delay(self, attempt: int) -> float:
+        """Return the delay before a retry.
+
+        Args:
+            attempt: Number of the retry (1 = first retry)
+
+        Returns:
+            Seconds to wait; spread out so failed files do not retry in lockstep
+        """
+        delay = min(self.backoff_max, self.backoff * 2 ** (attempt - 1))
+        return delay * (1 - self.jitter * random.random())
+
+
+class CircuitBreaker:
+    """Pauses claude dispatch after consecutive failures.
+
+    After failure_threshold failures in a row the circuit opens and
+    before_call() blocks for reset_timeout seconds. Then a single trial call
+    is let through (half open): success closes the circuit, failure opens
+    it again.
+    """
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 60.0,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        """Initialize the circuit breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial call
+            metrics: Registry receiving the circuit state
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._cond = threading.Condition()
+
+        self.metrics = metrics or MetricsRegistry()
+        self.metrics.gauge(
+            "claude_circuit_open",
+            "1 while claude dispatch is paused by the circuit breaker",
+            callback=lambda: 0 if self.state == self.CLOSED else 1
+        )
+
+    def before_call(self, timeout: Optional[float] = None) -> bool:
+        """Block until a call may be dispatched.
+
+        Args:
+            timeout: Maximum seconds to wait (None = no limit)
+
+        Returns:
+            True if the call may proceed, False if the timeout expired first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                if self.state == self.CLOSED:
+                    return True
+                if self.state == self.OPEN and now >= self._opened_at + self.reset_timeout:
+                    self.state = self.HALF_OPEN
+                    logger.info("Circuit half open: sending a trial claude call")
+                if self.state == self.HALF_OPEN and not self._trial_running:
+                    self._trial_running = True
+                    return True
+
+                wait = self._opened_at + self.reset_timeout - now if self.state == self.OPEN else None
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+    def record_success(self):
+        """Record a successful call (closes the circuit)."""
+        with self._cond:
+            self._failures = 0
+            self._trial_running = False
+            if self.state != self.CLOSED:
+                logger.info("Circuit closed: claude calls are succeeding again")
+                self.state = self.CLOSED
+                self._cond.notify_all()
+
+    def record_failure(self):
+        """Record a failed call (may open the circuit)."""
+        with self._cond:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                logger.warning(
+                    f"Circuit open after {self._failures} consecutive claude failure(s); "
+                    f"pausing dispatch for {self.reset_timeout:.0f}s"
+                )
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._cond.notify_all()
+            self._trial_running = False
+
+
+class LatencyBudget:
+    """Adaptive time limit for a claude call, derived from recent durations.
+
+    Once min_samples calls have finished, a call may run for multiplier
+    times the 95th percentile of recent durations (but at least minimum
+    seconds). Calls killed at the budget are recorded at the budget, so the
+    limit grows again if work legitimately gets slower.
+    """
+
+    def __init__(
+        self,
+        multiplier: float = 4.0,
+        minimum: float = 60.0,
+        window: int = 50,
+        min_samples: int = 10
+    ):
+        """Initialize the latency budget.
+
+        Args:
+            multiplier: Budget as a multiple of the recent 95th percentile
+            minimum: Lower bound of the budget in seconds
+            window: Number of recent durations considered
+            min_samples: Durations needed before the budget applies
+        """
+        self.multiplier = multiplier
+        self.minimum = minimum
+        self.min_samples = min_samples
+        self._durations = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """Record the duration of a finished (or killed) call.
+
+        Args:
+            seconds: Wall time of the call
+        """
+        with self._lock:
+            self._durations.append(seconds)
+
+    def limit(self, ceiling: float) -> float:
+        """Return the time limit for the next call.
+
+        Args:
+            ceiling: Hard timeout the budget never exceeds
+
+        Returns:
+            Seconds the call may run
+        """
+        with self._lock:
+            if len(self._durations) < self.min_samples:
+                return ceiling
+            durations = sorted(self._durations)
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        return min(ceiling, max(self.minimum, self.multiplier * p95))
@@ -0,0 +1,213 @@
+"""Include/exclude rules deciding which files enter the test-assistant pipeline."""
+import fnmatch
+import os
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Pattern
+
+REGEX_PREFIX = "re:"
+
+
+def compile_patterns(patterns: Iterable[str]) -> List[Optional[Pattern]]:
+    """Compile filename patterns into at most three combined regexes.
+
+    A pattern is a glob matched against the file name, a glob matched
+    against the full path if it contains a slash, or a regular expression
+    searched in the full path if it starts with "re:".
+
+    Args:
+        patterns: Patterns to compile
+
+    Returns:
+        [name regex, path glob regex, path search regex]; None where no pattern applies
+
+    Raises:
+        re.error: If a regular expression is invalid
+    """
+    name_globs, path_globs, regexes = [], [], []
+    for pattern in patterns:
+        if pattern.startswith(REGEX_PREFIX):
+            regexes.append(f"(?:{pattern[len(REGEX_PREFIX):]})")
+        elif "/" in pattern:
+            path_globs.append(fnmatch.translate(pattern))
+        else:
+            name_globs.append(fnmatch.translate(pattern))
+    return [re.compile("|".join(group)) if group else None for group in (name_globs, path_globs, regexes)]
+
+
+class FileFilter:
+    """Precompiled file filter shared by the event handler and the startup scan.
+
+    Name rules (extension, hidden, temp file and include/exclude patterns)
+    are checked from the path alone, so rejected events cost no system
+    call. Size bounds need the file's size and are checked separately
+    (see accepts_size), once it is known.
+    """
+
+    def __init__(
+        self,
+        extensions: Optional[Iterable[str]] = None,
+        include_patterns: Optional[Iterable[str]] = None,
+        exclude_patterns: Optional[Iterable[str]] = None,
+        temp_file_patterns: Optional[Iterable[str]] = None,
+        ignore_hidden: bool = False,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        exclude_dirs: Optional[Iterable[Path]] = None
+    ):
+        """Initialize the filter.
+
+        Args:
+            extensions: File extensions to accept (empty = all)
+            include_patterns: If given, only files matching one of these are accepted
+            exclude_patterns: Files matching any of these are rejected
+            temp_file_patterns: Filename globs of partial files still being written
+            ignore_hidden: If True, reject dotfiles and files in dot-directories
+            min_size: Minimum file size in bytes
+            max_size: Maximum file size in bytes
+            exclude_dirs: Directories whose files are always rejected (e.g. the archive)
+        """
+        self.extensions = frozenset(ext.lower() for ext in extensions or ())
+        self.include_patterns = list(include_patterns or [])
+        self.exclude_patterns = list(exclude_patterns or [])
+        self.temp_file_patterns = list(temp_file_patterns or [])
+        self.ignore_hidden = ignore_hidden
+        self.min_size = min_size
+        self.max_size = max_size
+        self.exclude_dirs = [Path(directory) for directory in exclude_dirs or ()]
+        self._excluded_prefixes = tuple(os.path.join(str(directory), "") for directory in self.exclude_dirs)
+
+        self._include = compile_patterns(self.include_patterns)
+        self._exclude = compile_patterns(self.exclude_patterns)
+        self._temp_pattern = (
+            re.compile("|".join(fnmatch.translate(pattern) for pattern in self.temp_file_patterns))
+            if self.temp_file_patterns else None
+        )
+
+    @property
+    def has_size_limits(self) -> bool:
+        """True if accepting a file requires its size."""
+        return self.min_size is not None or self.max_size is not None
+
+    @staticmethod
+    def _matches(compiled: List[Optional[Pattern]], name: str, path: str) -> bool:
+        name_regex, path_glob_regex, path_regex = compiled
+        return bool(
+            (name_regex is not None and name_regex.match(name))
+            or (path_glob_regex is not None and path_glob_regex.match(path))
+            or (path_regex is not None and path_regex.search(path))
+        )
+
+    def is_temp_file(self, file_path: Path) -> bool:
+        """Check if a file is a partial file still being written.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            True if the filename matches one of the temp file patterns
+        """
+        return self._temp_pattern is not None and self._temp_pattern.match(file_path.name) is not None
+
+    def is_hidden(self, file_path: Path, root: Optional[Path] = None) -> bool:
+        """Check if a file, or a directory between root and the file, is hidden.
+
+        Args:
+            file_path: Path to the file
+            root: Watched directory (default: only the file name is checked)
+
+        Returns:
+            True if a checked path component starts with a dot
+        """
+        prefix = os.path.join(str(root), "") if root is not None else None
+        if prefix is None or not str(file_path).startswith(prefix):
+            return file_path.name.startswith(".")
+        relative = str(file_path)[len(prefix):]
+        return relative.startswith(".") or f"{os.sep}." in relative
+
+    def reject_reason(self, file_path: Path, root: Optional[Path] = None) -> Optional[str]:
+        """Check the name rules, cheapest first.
+
+        Args:
+            file_path: Path to the file
+            root: Watched directory containing the file (for hidden directories)
+
+        Returns:
+            None if accepted, otherwise extension, hidden, temp, excluded or not_included
+        """
+        name = file_path.name
+        if self.extensions and file_path.suffix.lower() not in self.extensions:
+            return "extension"
+        if self.ignore_hidden and self.is_hidden(file_path, root):
+            return "hidden"
+        if self._temp_pattern is not None and self._temp_pattern.match(name):
+            return "temp"
+        path = str(file_path)
+        if self._excluded_prefixes and path.startswith(self._excluded_prefixes):
+            return "excluded"
+        if self.exclude_patterns and self._matches(self._exclude, name, path):
+            return "excluded"
+        if self.include_patterns and not self._matches(self._include, name, path):
+            return "not_included"
+        return None
+
+    def accepts_name(self, file_path: Path, root: Optional[Path] = None) -> bool:
+        """Check the name rules.
+
+        Args:
+            file_path: Path to the file
+            root: Watched directory containing the file
+
+        Returns:
+            True if the file passes all name rules
+        """
+        return self.reject_reason(file_path, root) is None
+
+    def accepts_size(self, size: int) -> bool:
+        """Check the size bounds.
+
+        Args:
+            size: File size in bytes
+
+        Returns:
+            True if the size is within min_size and max_size
+        """
+        if self.min_size is not None and size < self.min_size:
+            return False
+        return self.max_size is None or size <= self.max_size
+
+    def accepts_directory(self, dir_path: Path, root: Optional[Path] = None) -> bool:
+        """Check if a directory may contain accepted files (used to prune scans).
+
+        Args:
+            dir_path: Path to the directory
+            root: Watched directory containing it
+
+        Returns:
+            False for excluded directories, and for hidden ones when hidden files are ignored
+        """
+        if self._excluded_prefixes and os.path.join(str(dir_path), "").startswith(self._excluded_prefixes):
+            return False
+        return not (self.ignore_hidden and self.is_hidden(dir_path, root))
+
+    def accepts_entry(self, entry: os.DirEntry, root: Optional[Path] = None) -> bool:
+        """Check a directory entry from os.scandir against all rules.
+
+        The size is only read (from the entry's stat cache) if size bounds
+        are configured and the name rules pass.
+
+        Args:
+            entry: Directory entry of a regular file
+            root: Watched directory containing it
+
+        Returns:
+            True if the file is accepted
+        """
+        if not self.accepts_name(Path(entry.path), root):
+            return False
+        if not self.has_size_limits:
+            return True
+        try:
+            return self.accepts_size(entry.stat().st_size)
+        except OSError:
+            return False
@@ -1,24 +1,116 @@
 """File handling logic for test-assistant."""
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Set
+import ctypes
+import errno
 import logging
+import os
+import re
+import sys
+import threading
 import time
 
 logger = logging.getLogger(__name__)
 
+# Stem of a file renamed by rename_to_latest / remove_latest_suffix, in any
+# timestamp format, with optional sequence numbers and -latest suffix
+RENAMED_STEM_PATTERN = re.compile(
+    r"^\d{6}-(?:\d{2}-\d{2}-\d{2}(?:-\d{3})?|\d{2}:\d{2}:\d{2}|\d{6}(?:-\d{6})?)-[AP]M(?:-\d+)*(?:-latest)?$"
+)
+
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1
+
+# renameat2 errors meaning the file system (or kernel) lacks RENAME_NOREPLACE
+NOREPLACE_UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP}
+
+
+def _load_renameat2():
+    """Return libc's renameat2 (glibc 2.28+), or None if unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+    renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    renameat2.restype = ctypes.c_int
+    return renameat2
+
+
+_renameat2 = _load_renameat2()
+
+
+def rename_no_replace(src: Path, dst: Path) -> bool:
+    """Rename a file without ever replacing an existing destination.
+
+    Uses renameat2(RENAME_NOREPLACE) where the kernel and file system
+    support it, otherwise a hard link to the new name followed by unlinking
+    the old one. Both fail atomically if dst exists. File systems without
+    hard links fall back to a checked os.rename, which only guards against
+    collisions within this process.
+
+    Args:
+        src: Existing file
+        dst: New path
+
+    Returns:
+        True if the file was renamed by link/unlink (observers see a new
+        file rather than a move), False for a real rename
+
+    Raises:
+        FileExistsError: If dst already exists
+        OSError: If the rename fails for another reason
+    """
+    if _renameat2 is not None:
+        if _renameat2(AT_FDCWD, os.fsencode(src), AT_FDCWD, os.fsencode(dst), RENAME_NOREPLACE) == 0:
+            return False
+        error = ctypes.get_errno()
+        if error not in NOREPLACE_UNSUPPORTED:
+            raise OSError(error, os.strerror(error), str(src), None, str(dst))
+
+    if os.name == "nt":
+        os.rename(src, dst)  # Never replaces on Windows
+        return False
+
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError:
+        # No hard links (e.g. SMB, FAT); not atomic against other processes
+        if os.path.lexists(dst):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), str(dst))
+        os.rename(src, dst)
+        return False
+
+    try:
+        os.unlink(src)
+    except OSError:
+        os.unlink(dst)
+        raise
+    return True
+
 
 class FileHandler:
     """Handles file renaming and management."""
 
     LATEST_SUFFIX = "-latest"
 
+    # Names tried before a rename gives up on finding a free one
+    MAX_NAME_ATTEMPTS = 1000
+
+    # Seconds a link/unlink rename is remembered, to recognize its create event
+    OWN_LINK_TTL = 60.0
+
     def __init__(
         self,
         watch_dir: str,
         timestamp_format: str = "mmddyy-HH-MM-SS-AMPM",
         stability_timeout: float = 5.0,
-        stability_check_interval: float = 0.1
+        stability_check_interval: float = 0.1,
+        stability_mode: str = "poll"
     ):
         """Initialize file handler.
 
@@ -27,11 +119,45 @@ class FileHandler:
             timestamp_format: Format for timestamp (e.g., mmddyy-HH-MM-SS-AMPM)
             stability_timeout: Max seconds to wait for file size to stabilize
             stability_check_interval: Interval between file size checks
+            stability_mode: "poll", "close_write" or "auto" (close_write on Linux)
         """
         self.watch_dir = Path(watch_dir)
         self.timestamp_format = timestamp_format
         self.stability_timeout = stability_timeout
         self.stability_check_interval = stability_check_interval
+        self.stability_mode = self.resolve_stability_mode(stability_mode)
+
+        # Close-write notifications for files awaiting stability, keyed by path
+        self._close_events: Dict[Path, threading.Event] = {}
+        self._close_lock = threading.Lock()
+
+        # Files known to be complete (atomically renamed into place)
+        self._complete_files: Set[Path] = set()
+
+        # Serializes the -latest handover when several workers rename at once
+        self._rename_lock = threading.RLock()
+
+        # Callbacks notified with (old_path, new_path) after every rename
+        self._rename_listeners: List[Callable[[Path, Path], None]] = []
+
+        # In-memory index of the current -latest file per directory; a
+        # directory is seeded by one scan the first time it is used
+        self._latest_files: Dict[Path, Optional[Path]] = {}
+        # Index updates per directory, so a scan run without the rename lock
+        # can tell whether a rename changed the index meanwhile
+        self._latest_changes: Dict[Path, int] = {}
+
+        # Last timestamp handed out and how often it was repeated
+        self._last_timestamp: Optional[str] = None
+        self._sequence = 0
+
+        # Files renamed by link/unlink -> time of the rename
+        self._own_links: Dict[Path, float] = {}
+
+        # -latest files claude is reading (see hold), and those of them that
+        # lose the suffix once released because a newer file took it over
+        self._held: Set[Path] = set()
+        self._deferred_handovers: Set[Path] = set()
 
     def generate_timestamp(self) -> str:
         """Generate timestamp based on configured format.
@@ -57,13 +183,144 @@ class FileHandler:
             second = now.strftime("%S")
             ampm = now.strftime("%p")
             time_part = f"{hour}:{minute}:{second}-{ampm}"
+        elif self.timestamp_format == "mmddyy-HH-MM-SS-fff-AMPM":
+            # Format: mmddyy-HH-MM-SS-milliseconds-AM/PM
+            time_part = f"{now.strftime('%I-%M-%S')}-{now.microsecond // 1000:03d}-{now.strftime('%p')}"
+        elif self.timestamp_format == "mmddyy-HHMMSS-ffffff-AMPM":
+            # Format: mmddyy-HHMMSS-microseconds-AM/PM
+            time_part = now.strftime("%I%M%S-%f-%p")
         else:  # mmddyy-HHMMSS-AMPM (no separators)
             time_part = now.strftime("%I%M%S-%p")
 
         return f"{date_part}-{time_part}"
 
+    def unique_timestamp(self) -> str:
+        """Generate a timestamp not handed out before by this handler.
+
+        A timestamp repeating the previous one (several files within the
+        format's resolution) gets a sequence number, e.g. 102325-10-07-50-AM-2.
+        Must be called with the rename lock held.
+
+        Returns:
+            Timestamp string, with a sequence number if needed
+        """
+        timestamp = self.generate_timestamp()
+        if timestamp == self._last_timestamp:
+            self._sequence += 1
+            return f"{timestamp}-{self._sequence}"
+        self._last_timestamp, self._sequence = timestamp, 0
+        return timestamp
+
+    @staticmethod
+    def resolve_stability_mode(stability_mode: str) -> str:
+        """Resolve the "auto" stability mode for the current platform.
+
+        Args:
+            stability_mode: Configured mode ("auto", "close_write" or "poll")
+
+        Returns:
+            "close_write" or "poll"
+        """
+        if stability_mode == "auto":
+            # inotify (IN_CLOSE_WRITE) is only available on Linux
+            return "close_write" if sys.platform.startswith("linux") else "poll"
+        return stability_mode
+
+    def _rename(self, file_path: Path, new_path: Path):
+        """Rename without replacing, remembering link/unlink renames.
+
+        Raises:
+            FileExistsError: If new_path already exists
+        """
+        if rename_no_replace(file_path, new_path):
+            now = time.monotonic()
+            with self._close_lock:
+                self._own_links = {
+                    path: renamed_at for path, renamed_at in self._own_links.items()
+                    if now - renamed_at < self.OWN_LINK_TTL
+                }
+                self._own_links[new_path] = now
+
+    def is_own_link(self, file_path: Path) -> bool:
+        """Check if a created file is one of our own link/unlink renames.
+
+        Args:
+            file_path: Path from a file creation event
+
+        Returns:
+            True (once per rename) if the file was created by renaming
+        """
+        with self._close_lock:
+            renamed_at = self._own_links.pop(file_path, None)
+        return renamed_at is not None and time.monotonic() - renamed_at < self.OWN_LINK_TTL
+
+    def is_renamed_output(self, file_path: Path) -> bool:
+        """Check if a file name has the form this handler renames files to.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            True for names like 102325-10-07-50-AM-latest.txt
+        """
+        return RENAMED_STEM_PATTERN.match(file_path.stem) is not None
+
+    def expect_close(self, file_path: Path):
+        """Register a file whose writer is expected to emit a close-write event.
+
+        Args:
+            file_path: Path to the newly created file
+        """
+        if self.stability_mode != "close_write":
+            return
+        with self._close_lock:
+            self._close_events.setdefault(file_path, threading.Event())
+
+    def mark_complete(self, file_path: Path):
+        """Register a file that was renamed into place already written.
+
+        Its stability check returns immediately, in every stability mode.
+
+        Args:
+            file_path: Path to the complete file
+        """
+        with self._close_lock:
+            self._complete_files.add(file_path)
+
+    def forget(self, file_path: Path):
+        """Drop the expect_close / mark_complete registration of a file.
+
+        Called for files that will not be waited on (rejected when queued,
+        moved away) and once a file has left the stability stage, so a later
+        file at the same path starts without a stale registration.
+
+        Args:
+            file_path: Path of the file
+        """
+        with self._close_lock:
+            self._close_events.pop(file_path, None)
+            self._complete_files.discard(file_path)
+
+    def notify_closed(self, file_path: Path):
+        """Record that the writer of a file has closed it.
+
+        Args:
+            file_path: Path to the closed file
+        """
+        with self._close_lock:
+            close_event = self._close_events.get(file_path)
+        if close_event is not None:
+            logger.debug(f"Close-write received: {file_path.name}")
+            close_event.set()
+
     def wait_for_file_stability(self, file_path: Path) -> bool:
-        """Wait for file size to stabilize before processing.
+        """Wait for file to be completely written before processing.
+
+        In close_write mode, files registered through expect_close are
+        considered stable as soon as their writer closes them. Files without
+        a registration (e.g. existing files on startup) and files whose close
+        event does not arrive within the timeout fall back to size polling.
+        Files registered through mark_complete are never waited on.
 
         Args:
             file_path: Path to the file to check
@@ -71,6 +328,43 @@ class FileHandler:
         Returns:
             True if file is stable, False if timeout or file disappeared
         """
+        with self._close_lock:
+            is_complete = file_path in self._complete_files
+            self._complete_files.discard(file_path)
+        if is_complete:
+            if not file_path.exists():
+                logger.warning(f"File disappeared before processing: {file_path.name}")
+                return False
+            return True
+
+        if self.stability_mode == "close_write":
+            with self._close_lock:
+                close_event = self._close_events.get(file_path)
+
+            if close_event is not None:
+                try:
+                    logger.debug(f"Waiting for close-write event: {file_path.name}")
+                    if close_event.wait(self.stability_timeout):
+                        if not file_path.exists():
+                            logger.warning(f"File disappeared before processing: {file_path.name}")
+                            return False
+                        return True
+                    logger.info(f"No close-write event for {file_path.name}, falling back to polling")
+                finally:
+                    with self._close_lock:
+                        self._close_events.pop(file_path, None)
+
+        return self._poll_for_stability(file_path)
+
+    def _poll_for_stability(self, file_path: Path) -> bool:
+        """Wait for file size to stabilize by polling its size.
+
+        Args:
+            file_path: Path to the file to check
+
+        Returns:
+            True if file is stable, False if file disappeared
+        """
         logger.debug(f"Waiting for file stability: {file_path.name}")
         start_time = time.time()
         prev_size = -1
@@ -98,20 +392,171 @@ class FileHandler:
         logger.warning(f"File stability check timeout after {self.stability_timeout}s: {file_path.name}")
         return True  # Proceed anyway after timeout
     
-    def find_latest_file(self) -> Optional[Path]:
-        """Find the file with -latest suffix in the watch directory.
-        
+    def add_rename_listener(self, listener: Callable[[Path, Path], None]):
+        """Register a callback invoked with (old_path, new_path) after each rename.
+
+        Args:
+            listener: Callback to register
+        """
+        self._rename_listeners.append(listener)
+
+    def _notify_renamed(self, old_path: Path, new_path: Path):
+        """Invoke rename listeners, logging (not raising) their errors.
+
+        Args:
+            old_path: Path before renaming
+            new_path: Path after renaming
+        """
+        for listener in self._rename_listeners:
+            try:
+                listener(old_path, new_path)
+            except Exception as e:
+                logger.error(f"Rename listener failed: {e}")
+
+    def find_latest_file(self, directory: Optional[Path] = None) -> Optional[Path]:
+        """Find the file with -latest suffix in a directory.
+
+        The result comes from the in-memory index; the directory is only
+        scanned the first time (or when reconciling). Each directory keeps
+        its own -latest file when watching recursively.
+
+        Args:
+            directory: Directory to look in (default: the watch directory)
+
         Returns:
             Path to the file with -latest suffix, or None if not found
         """
-        for file_path in self.watch_dir.iterdir():
-            if file_path.is_file() and self.LATEST_SUFFIX in file_path.stem:
-                return file_path
-        return None
-    
+        directory = directory or self.watch_dir
+        with self._rename_lock:
+            if directory not in self._latest_files:
+                self.seed_latest_index(directory)
+            return self._latest_files[directory]
+
+    def _scan_for_latest(self, directory: Path) -> List[Path]:
+        """Scan a directory for files with -latest suffix.
+
+        Runs without the rename lock; the file type comes from the directory
+        entry, so matching names cost no extra stat call.
+
+        Args:
+            directory: Directory to scan
+
+        Returns:
+            Paths of the files with -latest suffix, in directory order
+        """
+        found = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if (self.LATEST_SUFFIX in entry.name and self.LATEST_SUFFIX in Path(entry.name).stem
+                        and entry.is_file()):
+                    found.append(Path(entry.path))
+        return found
+
+    def _pick_latest(self, found: List[Path]) -> Optional[Path]:
+        """Return the first scanned -latest file whose handover is not pending (rename lock held)."""
+        return next((file_path for file_path in found if file_path not in self._deferred_handovers), None)
+
+    def _set_latest(self, directory: Path, latest: Optional[Path]):
+        """Update the -latest index of a directory (rename lock held)."""
+        self._latest_files[directory] = latest
+        self._latest_changes[directory] = self._latest_changes.get(directory, 0) + 1
+
+    def seed_latest_index(self, directory: Optional[Path] = None):
+        """Populate the -latest index of a directory with a full scan, unless it is indexed already.
+
+        Args:
+            directory: Directory to scan (default: the watch directory)
+        """
+        directory = directory or self.watch_dir
+        found = self._scan_for_latest(directory)
+        with self._rename_lock:
+            if directory in self._latest_files:
+                return  # Seeded by a rename during the scan
+            latest = self._pick_latest(found)
+            self._set_latest(directory, latest)
+            logger.debug(f"Latest index seeded for {directory}: {latest.name if latest else None}")
+
+    def reconcile_latest_index(self, directory: Optional[Path] = None) -> Optional[Path]:
+        """Check the -latest index of a directory against the disk and repair it on drift.
+
+        The directory is scanned without the rename lock, so renames are not
+        held up by a large directory; the lock is only taken to compare and
+        swap the index. If a rename updated the index during the scan, the
+        index is newer than the scan and is kept.
+
+        Args:
+            directory: Directory to check (default: the watch directory)
+
+        Returns:
+            Path to the file with -latest suffix, or None if not found
+        """
+        directory = directory or self.watch_dir
+        with self._rename_lock:
+            changes = self._latest_changes.get(directory, 0)
+        found = self._scan_for_latest(directory)
+        with self._rename_lock:
+            if self._latest_changes.get(directory, 0) != changes:
+                logger.debug(f"Latest index of {directory} changed during the scan, keeping it")
+                return self._latest_files.get(directory)
+            on_disk = self._pick_latest(found)
+            if directory in self._latest_files and on_disk != self._latest_files[directory]:
+                logger.warning(
+                    f"Latest index out of sync (indexed: {self._latest_files[directory]}, "
+                    f"on disk: {on_disk}), repairing"
+                )
+            self._set_latest(directory, on_disk)
+            return on_disk
+
+    def reconcile_all_latest_indexes(self):
+        """Reconcile every indexed directory, dropping ones that no longer exist."""
+        with self._rename_lock:
+            directories = list(self._latest_files)
+        for directory in directories:
+            if not directory.is_dir():
+                with self._rename_lock:
+                    self._latest_files.pop(directory, None)
+                    self._latest_changes.pop(directory, None)
+                continue
+            self.reconcile_latest_index(directory)
+
+    def note_file_added(self, file_path: Path):
+        """Update the -latest index for a file that appeared externally.
+
+        Only adopts the file when the index is empty or stale, so events for
+        our own renames that arrive late cannot overwrite a newer entry.
+
+        Args:
+            file_path: Path of the created or moved-in file
+        """
+        if self.LATEST_SUFFIX not in file_path.stem:
+            return
+        with self._rename_lock:
+            directory = file_path.parent
+            if directory not in self._latest_files:
+                return
+            current = self._latest_files[directory]
+            if current is not None and current.exists():
+                return
+            if file_path.is_file():
+                self._set_latest(directory, file_path)
+
+    def note_file_removed(self, file_path: Path):
+        """Update the -latest index for a file that was deleted or moved away.
+
+        Args:
+            file_path: Path of the removed file
+        """
+        with self._rename_lock:
+            directory = file_path.parent
+            if self._latest_files.get(directory) == file_path and not file_path.exists():
+                self._set_latest(directory, None)
+
     def remove_latest_suffix(self, file_path: Path) -> Path:
         """Remove -latest suffix from a file.
-        
+
+        If the name without the suffix is taken (e.g. by a file from an
+        earlier run), a sequence number is appended instead of replacing it.
+
         Args:
             file_path: Path to the file with -latest suffix
             
@@ -123,34 +568,100 @@ class FileHandler:
         
         # Remove -latest from the stem
         new_stem = stem.replace(self.LATEST_SUFFIX, "")
-        new_path = file_path.parent / f"{new_stem}{suffix}"
-        
-        logger.info(f"Removing -latest suffix: {file_path.name} -> {new_path.name}")
-        file_path.rename(new_path)
+
+        with self._rename_lock:
+            for attempt in range(self.MAX_NAME_ATTEMPTS):
+                new_path = file_path.parent / (f"{new_stem}-{attempt}{suffix}" if attempt else f"{new_stem}{suffix}")
+                try:
+                    self._rename(file_path, new_path)
+                    break
+                except FileExistsError:
+                    continue
+            else:
+                raise FileExistsError(errno.EEXIST, "No free name for file", str(file_path))
+            logger.info(f"Removed -latest suffix: {file_path.name} -> {new_path.name}")
+            if self._latest_files.get(file_path.parent) == file_path:
+                self._set_latest(file_path.parent, None)
+            self._notify_renamed(file_path, new_path)
         return new_path
     
     def rename_to_latest(self, file_path: Path) -> Path:
         """Rename a file with timestamp-latest format.
-        
+
+        Never replaces an existing file: the timestamp gets a sequence number
+        until both the -latest name and the name it will later be renamed to
+        are free.
+
         Args:
             file_path: Path to the new file
             
         Returns:
             New path after renaming
         """
-        timestamp = self.generate_timestamp()
         suffix = file_path.suffix
-        new_name = f"{timestamp}{self.LATEST_SUFFIX}{suffix}"
-        new_path = file_path.parent / new_name
-        
-        logger.info(f"Renaming new file: {file_path.name} -> {new_name}")
-        file_path.rename(new_path)
+
+        with self._rename_lock:
+            for _ in range(self.MAX_NAME_ATTEMPTS):
+                timestamp = self.unique_timestamp()
+                new_path = file_path.parent / f"{timestamp}{self.LATEST_SUFFIX}{suffix}"
+                if (file_path.parent / f"{timestamp}{suffix}").exists():
+                    continue
+                try:
+                    self._rename(file_path, new_path)
+                    break
+                except FileExistsError:
+                    continue
+            else:
+                raise FileExistsError(errno.EEXIST, "No free name for file", str(file_path))
+            logger.info(f"Renamed new file: {file_path.name} -> {new_path.name}")
+            if new_path.parent in self._latest_files:
+                self._set_latest(new_path.parent, new_path)
+            self._notify_renamed(file_path, new_path)
         return new_path
     
+    def hold(self, file_path: Path) -> bool:
+        """Keep a file's name while claude reads it.
+
+        If a newer file takes over the -latest suffix meanwhile, the held
+        file keeps its -latest name until release.
+
+        Args:
+            file_path: Path given to claude
+
+        Returns:
+            True if held, False if no file exists at the path (e.g. renamed just now)
+        """
+        with self._rename_lock:
+            if not file_path.exists():
+                return False
+            self._held.add(file_path)
+            return True
+
+    def release(self, file_path: Path):
+        """End a hold, completing a -latest handover deferred by it.
+
+        Args:
+            file_path: Path passed to hold
+        """
+        with self._rename_lock:
+            self._held.discard(file_path)
+            if file_path not in self._deferred_handovers:
+                return
+            self._deferred_handovers.discard(file_path)
+            if not file_path.exists():
+                return
+            try:
+                self.remove_latest_suffix(file_path)
+            except OSError as e:
+                logger.error(f"Failed to remove -latest suffix from {file_path.name}: {e}")
+
     def process_new_file(self, file_path: Path) -> Path:
         """Process a newly detected file.
         
         This removes -latest from any existing file and adds it to the new one.
+        The whole handover runs under a lock so that concurrent workers never
+        leave more than one file with the -latest suffix. A previous file
+        claude is still reading (see hold) loses the suffix once released.
         
         Args:
             file_path: Path to the newly detected file
@@ -159,13 +670,20 @@ class FileHandler:
             Path to the renamed file with -latest suffix
         """
         logger.info(f"Processing new file: {file_path.name}")
-        
-        # Step 1: Find and remove -latest from any existing file
-        existing_latest = self.find_latest_file()
-        if existing_latest and existing_latest != file_path:
-            self.remove_latest_suffix(existing_latest)
-        
-        # Step 2: Rename the new file with timestamp-latest
-        new_path = self.rename_to_latest(file_path)
-        
+
+        with self._rename_lock:
+            # Step 1: Find and remove -latest from any existing file in the same directory
+            existing_latest = self.find_latest_file(file_path.parent)
+            if existing_latest and not existing_latest.exists():
+                existing_latest = self.reconcile_latest_index(file_path.parent)
+            if existing_latest and existing_latest != file_path:
+                if existing_latest in self._held:
+                    logger.info(f"Deferring -latest handover of {existing_latest.name} until analyzed")
+                    self._deferred_handovers.add(existing_latest)
+                else:
+                    self.remove_latest_suffix(existing_latest)
+
+            # Step 2: Rename the new file with timestamp-latest
+            new_path = self.rename_to_latest(file_path)
+
         return new_path
@@ -1,14 +1,34 @@
 """Main service for test-assistant."""
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-from pathlib import Path
-from watchdog.observers import Observer
+import threading
 import time
+from pathlib import Path
 
+# Wall-clock time of the project imports below, reported as the "imports" startup phase
+_IMPORT_START = time.perf_counter()
+
+from backlog import BacklogFeeder
 from config_model import TestAssistantConfig
+from console import console
+from archiver import Archiver
+from claude_cache import ClaudeResultCache
 from claude_runner import ClaudeCodeRunner
 from file_handler import FileHandler
-from event_handler import TestAssistantEventHandler
+from event_handler import TestAssistantEventHandler, WatchRoot
+from file_filter import FileFilter
+from failure_policy import CircuitBreaker, LatencyBudget, RetryPolicy
+from manifest import ProcessedManifest
+from metrics import MetricsRegistry, MetricsServer, SnapshotWriter, StartupTimer
+from result_store import ResultStore
+from scheduler import PriorityClassifier, RateLimiter
+from work_queue import WorkJournal
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +42,9 @@ class TestAssistantService:
         Args:
             config_path: Path to configuration YAML file
         """
+        self.startup = StartupTimer()
+        self.startup.add_phase("imports", IMPORT_SECONDS)
+
         # Load configuration first
         try:
             self.config = TestAssistantConfig.from_yaml(config_path)
@@ -30,171 +53,595 @@ class TestAssistantService:
             raise
 
         # Configure logging with level from config
+        self.log_listener = None
         self._setup_logging()
+        console.configure(quiet=self.config.quiet)
+        console.start()
+        self.startup.mark("config")
 
         logger.info("Initializing test-assistant service...")
         logger.info(f"Configuration loaded from: {config_path}")
-        logger.info(f"Watch path: {self.config.watch_path}")
-        logger.info(f"Claude prompt: {self.config.claude_prompt}")
-        logger.info(f"File extensions: {self.config.file_extensions or 'ALL'}")
+        self.roots = self.config.resolved_roots()
+        for root in self.roots:
+            logger.info(f"Watch path: {root.path}")
+            logger.info(f"  Claude prompt: {root.claude_prompt}")
+            logger.info(f"  File extensions: {root.file_extensions or 'ALL'}")
+            logger.info(f"  Timestamp format: {root.timestamp_format}")
         logger.info(f"Dry run mode: {self.config.dry_run}")
-        logger.info(f"Timestamp format: {self.config.timestamp_format}")
         logger.info(f"Process existing files: {self.config.process_existing_files}")
-
-        # Validate watch path exists
-        watch_path = Path(self.config.watch_path)
-        if not watch_path.exists() or not watch_path.is_dir():
-            raise ValueError(f"Watch path does not exist or is not a directory: {self.config.watch_path}")
-
-        # Initialize Claude runner
-        self.claude_runner = ClaudeCodeRunner(
-            self.config.claude_prompt,
-            dry_run=self.config.dry_run
-        )
-
-        # Check if claude CLI is available (skip in dry-run mode)
+        logger.info(f"Max workers: {self.config.max_workers}")
+        logger.info(f"Stability workers: {self.config.stability_workers}")
+        logger.info(f"Recursive: {self.config.recursive}")
+        logger.info(f"File stability mode: {self.config.file_stability_mode}")
+        logger.info(f"Observer mode: {self.config.observer_mode}")
+
+        # Validate watch paths exist
+        for root in self.roots:
+            watch_path = Path(root.path)
+            if not watch_path.exists() or not watch_path.is_dir():
+                raise ValueError(f"Watch path does not exist or is not a directory: {root.path}")
+
+        # Set by stop() so the service loop also ends when stopped from another thread
+        self._stop_requested = threading.Event()
+        self.backlog_feeders = []
+
+        # Metrics shared by all components; exporters start with the service
+        self.metrics = MetricsRegistry()
+        self.metrics_server = None
+        self.snapshot_writer = None
+
+        # Initialize result cache (optional)
+        self.result_cache = None
+        if self.config.cache_path:
+            self.result_cache = ClaudeResultCache(
+                self.config.cache_path,
+                max_bytes=self.config.cache_max_bytes,
+                max_age=self.config.cache_max_age
+            )
+            logger.info(f"Result cache: {self.config.cache_path}")
+
+        # Initialize result store (optional)
+        self.result_store = None
+        if self.config.result_store_path:
+            self.result_store = ResultStore(self.config.result_store_path)
+            logger.info(f"Result store: {self.config.result_store_path}")
+
+        # Rate limiter in front of every claude invocation (optional)
+        self.rate_limiter = None
+        if self.config.claude_calls_per_minute or self.config.claude_max_concurrent:
+            self.rate_limiter = RateLimiter(
+                calls_per_minute=self.config.claude_calls_per_minute,
+                burst=self.config.claude_burst,
+                max_concurrent=self.config.claude_max_concurrent,
+                metrics=self.metrics
+            )
+            logger.info(
+                f"Claude rate limit: {self.config.claude_calls_per_minute or 'unlimited'}/min, "
+                f"max concurrent: {self.config.claude_max_concurrent or 'unlimited'}"
+            )
+
+        # Adaptive latency budget shared by all runners (optional)
+        self.latency_budget = None
+        if self.config.latency_budget_multiplier:
+            self.latency_budget = LatencyBudget(
+                multiplier=self.config.latency_budget_multiplier,
+                minimum=self.config.latency_budget_min
+            )
+
+        # Initialize one Claude runner per watch root; cache, store and limiter are shared
+        runner_class = ClaudeCodeRunner
+        if self.config.async_runner:
+            from async_runner import AsyncClaudeCodeRunner  # Imports asyncio only when needed
+            runner_class = AsyncClaudeCodeRunner
+        self.claude_runners = [
+            runner_class(
+                root.claude_prompt,
+                dry_run=self.config.dry_run,
+                cache=self.result_cache,
+                timeout=self.config.claude_timeout,
+                metrics=self.metrics,
+                claude_command=self.config.claude_command,
+                result_store=self.result_store,
+                console_output=self.config.console_output,
+                rate_limiter=self.rate_limiter,
+                latency_budget=self.latency_budget
+            )
+            for root in self.roots
+        ]
+        self.claude_runner = self.claude_runners[0]
+
+        # Check if claude CLI is available in the background (skip in dry-run mode)
+        self.claude_probe = None
         if not self.config.dry_run:
-            if not self.claude_runner.check_claude_code_available():
-                logger.warning("⚠️  claude CLI not found or not available")
-                print("\n⚠️  WARNING: claude CLI is not available!")
-                print("The service will run, but claude execution will fail.")
-                print("Please ensure claude CLI is installed and in your PATH.\n")
-            else:
-                logger.info("✅ claude CLI is available")
+            self.claude_probe = threading.Thread(target=self._probe_claude, name="claude-probe", daemon=True)
+            self.claude_probe.start()
         else:
             logger.info("🔸 Dry run mode enabled - skipping claude CLI check")
-
-        # Initialize file handler
-        self.file_handler = FileHandler(
-            watch_dir=self.config.watch_path,
-            timestamp_format=self.config.timestamp_format,
-            stability_timeout=self.config.file_stability_timeout,
-            stability_check_interval=self.config.file_stability_check_interval
-        )
-
-        # Initialize event handler
+        self.startup.mark("claude runner")
+
+        # Native (inotify etc.) or polling observer, chosen when it starts;
+        # it decides how file stability is detected
+        self.observer_mode = None
+        self.observer = None
+
+        # Initialize one file handler per watch root; the -latest index is
+        # seeded in the background once the observer runs
+        self.file_handlers = []
+        for root in self.roots:
+            file_handler = FileHandler(
+                watch_dir=root.path,
+                timestamp_format=root.timestamp_format,
+                stability_timeout=self.config.file_stability_timeout,
+                stability_check_interval=self.config.file_stability_check_interval,
+                stability_mode=self.config.file_stability_mode
+            )
+            self.file_handlers.append(file_handler)
+        self.file_handler = self.file_handlers[0]
+        self.startup.mark("file handler")
+
+        # Initialize processed-file manifest (optional)
+        self.manifest = None
+        if self.config.manifest_path:
+            self.manifest = ProcessedManifest(self.config.manifest_path)
+            for file_handler in self.file_handlers:
+                file_handler.add_rename_listener(self.manifest.note_renamed)
+            logger.info(f"Processed-file manifest: {self.config.manifest_path} ({len(self.manifest)} entries)")
+
+        # Initialize durable work journal (optional)
+        self.journal = None
+        if self.config.queue_journal_path:
+            self.journal = WorkJournal(self.config.queue_journal_path)
+            logger.info(f"Work journal: {self.config.queue_journal_path}")
+
+        # Archive directories are never processed (or polled)
+        self.archive_paths = [self.config.archive_path(root.path) for root in self.roots]
+
+        # One file filter per watch root (extensions may differ per root)
+        self.file_filters = [
+            FileFilter(
+                extensions=root.file_extensions,
+                include_patterns=self.config.include_patterns,
+                exclude_patterns=self.config.exclude_patterns,
+                temp_file_patterns=self.config.temp_file_patterns,
+                ignore_hidden=self.config.ignore_hidden_files,
+                min_size=self.config.min_file_size,
+                max_size=self.config.max_file_size,
+                exclude_dirs=[archive_path] if archive_path is not None else None
+            )
+            for root, archive_path in zip(self.roots, self.archive_paths)
+        ]
+
+        # Initialize event handler (one pipeline and worker pool for all watch roots)
         self.event_handler = TestAssistantEventHandler(
-            watch_dir=self.config.watch_path,
+            watch_dir=self.roots[0].path,
             claude_runner=self.claude_runner,
             file_handler=self.file_handler,
-            file_extensions=self.config.file_extensions
+            file_extensions=self.roots[0].file_extensions,
+            max_workers=self.config.max_workers,
+            stability_workers=self.config.stability_workers,
+            journal=self.journal,
+            batch_window=self.config.batch_window,
+            batch_max_files=self.config.batch_max_files,
+            batch_max_bytes=self.config.batch_max_bytes,
+            metrics=self.metrics,
+            priority_classifier=PriorityClassifier(
+                self.config.priority_rules,
+                default_priority=self.config.default_priority
+            ),
+            priority_aging=self.config.priority_aging_seconds,
+            file_filter=self.file_filters[0],
+            debounce_window=self.config.debounce_window,
+            retry_policy=RetryPolicy(
+                max_retries=self.config.claude_max_retries,
+                backoff=self.config.claude_retry_backoff,
+                backoff_max=self.config.claude_retry_backoff_max,
+                jitter=self.config.claude_retry_jitter
+            ),
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=self.config.circuit_breaker_threshold,
+                reset_timeout=self.config.circuit_breaker_reset,
+                metrics=self.metrics
+            ) if self.config.circuit_breaker_threshold else None
         )
+        for root, claude_runner, file_handler, file_filter in zip(
+            self.roots[1:], self.claude_runners[1:], self.file_handlers[1:], self.file_filters[1:]
+        ):
+            self.event_handler.add_root(
+                WatchRoot(root.path, claude_runner, file_handler, root.file_extensions, file_filter)
+            )
+
+        # Move older renamed files out of the watch directories (optional)
+        self.archivers = [
+            Archiver(
+                file_handler,
+                archive_path,
+                mode=self.config.archive_mode,
+                keep_recent=self.config.archive_keep_recent,
+                min_age=self.config.archive_min_age,
+                max_hot_files=self.config.archive_max_hot_files,
+                interval=self.config.archive_interval,
+                recursive=self.config.recursive,
+                is_busy=self.event_handler.is_pending,
+                metrics=self.metrics
+            )
+            for file_handler, archive_path in zip(self.file_handlers, self.archive_paths)
+            if archive_path is not None
+        ]
+
+        self.startup.mark("event handler")
+
+    def _select_observer_mode(self) -> str:
+        """Decide between the native and the polling observer.
+
+        Returns:
+            "native" or "polling"
+        """
+        if self.config.observer_mode != "auto":
+            return self.config.observer_mode
 
-        # Initialize observer
-        self.observer = Observer()
-        self.observer.schedule(
-            self.event_handler,
-            self.config.watch_path,
-            recursive=False
-        )
+        from polling_observer import is_network_filesystem  # Imports watchdog's observers
+
+        network_roots = [root.path for root in self.roots if is_network_filesystem(root.path)]
+        if network_roots:
+            logger.info(f"Network file system detected ({', '.join(network_roots)}); using the polling observer")
+            return "polling"
+        return "native"
+
+    def _stability_mode(self) -> str:
+        """Return the file stability mode matching the observer.
+
+        Returns:
+            Configured mode; "auto" becomes "poll" with the polling observer,
+            which never reports close-write events
+        """
+        if self.observer_mode != "polling":
+            return self.config.file_stability_mode
+        if self.config.file_stability_mode == "close_write":
+            logger.warning(
+                "close_write stability with the polling observer: every file waits "
+                "file_stability_timeout before size polling"
+            )
+            return "close_write"
+        return "poll"
+
+    def _create_observer(self):
+        """Create the observer for the current mode and schedule all watch roots.
+
+        Returns:
+            Observer (not started)
+        """
+        # Deferred: importing watchdog's observers loads the platform backend
+        if self.observer_mode == "polling":
+            from polling_observer import ScandirPollingObserver
+            observer = ScandirPollingObserver(
+                interval=self.config.polling_interval,
+                max_interval=self.config.polling_max_interval,
+                ignore_dirs=[str(path) for path in self.archive_paths if path is not None]
+            )
+        else:
+            from watchdog.observers import Observer
+            try:
+                # inotify: report files moved in from outside the tree as moves,
+                # so atomically renamed files skip the stability wait
+                observer = Observer(generate_full_events=True)
+            except TypeError:
+                observer = Observer()
+
+        for root in self.roots:
+            observer.schedule(
+                self.event_handler,
+                root.path,
+                recursive=self.config.recursive
+            )
+        return observer
+
+    def _start_observer(self):
+        """Create and start the observer, falling back to polling if the native one cannot start."""
+        self.observer_mode = self._select_observer_mode()
+        stability_mode = self._stability_mode()
+        for file_handler in self.file_handlers:
+            file_handler.stability_mode = file_handler.resolve_stability_mode(stability_mode)
+        self.observer = self._create_observer()
+        try:
+            self.observer.start()
+        except OSError as e:
+            if self.config.observer_mode != "auto" or self.observer_mode == "polling":
+                raise
+            # e.g. the inotify watch limit is exhausted
+            logger.warning(f"Native file system observer unavailable ({e}); falling back to polling")
+            self.observer_mode = "polling"
+            for file_handler in self.file_handlers:
+                file_handler.stability_mode = file_handler.resolve_stability_mode(self._stability_mode())
+            self.observer = self._create_observer()
+            self.observer.start()
+
+    def _seed_latest_indexes(self):
+        """Find the -latest file of each watch root (unless a rename already did)."""
+        for file_handler in self.file_handlers:
+            try:
+                file_handler.seed_latest_index()
+            except OSError as e:
+                logger.warning(f"Cannot scan {file_handler.watch_dir} for the -latest file: {e}")
+
+    def _probe_claude(self):
+        """Check if claude CLI is available (runs in a background thread)."""
+        if not self.claude_runner.check_claude_code_available(self.config.claude_probe_cache_path):
+            logger.warning("⚠️  claude CLI not found or not available")
+            console.print("\n⚠️  WARNING: claude CLI is not available!")
+            console.print("The service will run, but claude execution will fail.")
+            console.print("Please ensure claude CLI is installed and in your PATH.\n")
+        else:
+            logger.info("✅ claude CLI is available")
 
     def _setup_logging(self):
-        """Setup logging with configured level."""
+        """Setup logging with configured level.
+
+        Records are handed to a QueueHandler and written to the rotating log
+        file and stdout by a background QueueListener, so observer and worker
+        threads never block on disk or terminal writes.
+        """
         log_level = getattr(logging, self.config.log_level, logging.INFO)
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handlers = [
+            logging.handlers.RotatingFileHandler(
+                'test-assistant.log',
+                maxBytes=self.config.log_max_bytes,
+                backupCount=self.config.log_backup_count
+            ),
+            logging.StreamHandler(sys.stdout)
+        ]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        self.log_queue_handler = logging.handlers.QueueHandler(log_queue)
+        # The listener's handlers apply the full format; only merge message and args here
+        self.log_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        self.log_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
         logging.basicConfig(
             level=log_level,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('test-assistant.log'),
-                logging.StreamHandler(sys.stdout)
-            ],
+            handlers=[self.log_queue_handler],
             force=True  # Override any existing configuration
         )
-    
-    def _process_existing_files(self):
-        """Process existing files in watch directory on startup."""
-        watch_path = Path(self.config.watch_path)
-        existing_files = []
-
-        # Find all files matching configured extensions
-        for file_path in watch_path.iterdir():
-            if not file_path.is_file():
-                continue
+        self.log_listener.start()
+        atexit.register(self._stop_logging)
 
-            if self.config.file_extensions:
-                if file_path.suffix.lower() not in [ext.lower() for ext in self.config.file_extensions]:
-                    continue
-
-            # Skip files that already have the timestamp format or -latest suffix
-            if "-latest" in file_path.stem or self._looks_like_timestamp(file_path.stem):
-                logger.debug(f"Skipping already processed file: {file_path.name}")
-                continue
+    def _stop_logging(self):
+        """Flush queued log records and log synchronously from now on."""
+        if self.log_listener is None:
+            return
+        listener, self.log_listener = self.log_listener, None
+        listener.stop()
 
-            existing_files.append(file_path)
+        root_logger = logging.getLogger()
+        if self.log_queue_handler in root_logger.handlers:
+            root_logger.removeHandler(self.log_queue_handler)
+            for handler in listener.handlers:
+                root_logger.addHandler(handler)
+        atexit.unregister(self._stop_logging)
 
-        if not existing_files:
-            logger.info("No existing files to process")
-            return
+    def _process_existing_files(self):
+        """Start feeding existing files in the watch directories into the queue.
 
-        print(f"\n📦 Found {len(existing_files)} existing file(s) to process")
-        logger.info(f"Processing {len(existing_files)} existing files...")
+        The scans stream in the background (see BacklogFeeder), so the first
+        files are processed while the rest of the directories are still read.
+        """
+        for root, file_filter in zip(self.roots, self.file_filters):
+            root_path = Path(root.path)
+            backlog_feeder = BacklogFeeder(
+                root=root_path,
+                enqueue=self.event_handler.enqueue_file,
+                accept=self._accept_existing_entry,
+                accept_dir=lambda entry, f=file_filter, r=root_path: f.accepts_directory(Path(entry.path), r),
+                queue_depth=self.event_handler.pending_count,
+                recursive=self.config.recursive,
+                max_pending=self.config.backlog_max_pending,
+                rate=self.config.backlog_rate,
+                on_complete=self._backlog_complete if self.manifest is not None else None
+            )
+            self.backlog_feeders.append(backlog_feeder)
+        # Started once all exist, so _backlog_complete sees every root
+        for backlog_feeder in self.backlog_feeders:
+            backlog_feeder.start()
+
+        console.print("\n📦 Queueing existing files in the background")
+        logger.info("Streaming existing files into the queue...")
+
+    def _backlog_complete(self):
+        """Mark the manifest seeded once the backlog of every root was scanned."""
+        if all(backlog_feeder.completed for backlog_feeder in self.backlog_feeders):
+            self.manifest.mark_seeded()
+
+    def _accept_existing_entry(self, entry: os.DirEntry) -> bool:
+        """Decide from a directory entry whether an existing file needs processing.
 
-        for file_path in sorted(existing_files, key=lambda p: p.stat().st_mtime):
-            logger.info(f"Processing existing file: {file_path.name}")
-            self.event_handler.file_queue.put(file_path)
+        Args:
+            entry: Directory entry from os.scandir
 
-        print(f"✅ Queued {len(existing_files)} file(s) for processing\n")
+        Returns:
+            True if the file should be queued
+        """
+        file_path = Path(entry.path)
+        root = self.event_handler.root_for(file_path)
+        if not root.file_filter.accepts_entry(entry, root.watch_dir):
+            return False
 
-    def _looks_like_timestamp(self, filename: str) -> bool:
-        """Check if filename looks like it already has a timestamp."""
-        # Simple heuristic: check if it starts with digits in mmddyy format
-        import re
-        return bool(re.match(r'^\d{6}-', filename))
+        if self.manifest is not None and self.manifest.is_seeded:
+            if self.manifest.contains(entry):
+                logger.debug(f"Skipping already processed file: {file_path.name}")
+                return False
+            return True
+
+        # Skip files already renamed to the timestamp format (same rule as live events)
+        if root.file_handler.is_renamed_output(file_path):
+            logger.debug(f"Skipping already processed file: {file_path.name}")
+            if self.manifest is not None:
+                # Until a complete scan seeded the manifest, adopt files processed without it
+                self.manifest.add(entry.stat())
+            return False
+
+        return True
+
+    def _start_metrics_exporters(self):
+        """Start the Prometheus endpoint and snapshot writer if configured."""
+        if self.config.metrics_port is not None:
+            self.metrics_server = MetricsServer(
+                self.metrics,
+                port=self.config.metrics_port,
+                host=self.config.metrics_host
+            )
+            self.metrics_server.start()
+            console.print(f"📈 Metrics: http://{self.config.metrics_host}:{self.metrics_server.port}/metrics")
+
+        if self.config.metrics_snapshot_path:
+            self.snapshot_writer = SnapshotWriter(
+                self.metrics,
+                self.config.metrics_snapshot_path,
+                interval=self.config.metrics_snapshot_interval
+            )
+            self.snapshot_writer.start()
+            logger.info(f"Metrics snapshots: {self.config.metrics_snapshot_path}")
 
     def start(self):
-        """Start the service."""
+        """Start the service.
+
+        The observer starts first so no event is missed; the banner,
+        exporters and backlog follow once files are already being watched.
+        """
         logger.info("Starting test-assistant service...")
 
-        print("\n" + "="*80)
-        print("🚀 TEST-ASSISTANT SERVICE STARTED")
-        print("="*80)
-        print(f"📂 Watching directory: {self.config.watch_path}")
-        print(f"🤖 Claude prompt: {self.config.claude_prompt}")
-        if self.config.file_extensions:
-            print(f"📄 Watching extensions: {', '.join(self.config.file_extensions)}")
-        else:
-            print(f"📄 Watching: ALL file types")
-        print(f"⚙️  Timestamp format: {self.config.timestamp_format}")
-        print(f"🔸 Dry run mode: {'ENABLED' if self.config.dry_run else 'DISABLED'}")
-        print(f"📊 Log level: {self.config.log_level}")
-        print("="*80)
+        self._start_observer()
+        self.startup.mark("observer started")
+
+        # Resume work left in the journal by a previous run (live events for
+        # the same files are coalesced with it)
+        resumed = self.event_handler.resume_journal()
+        threading.Thread(target=self._seed_latest_indexes, name="latest-index-seed", daemon=True).start()
+        self.startup.mark("journal")
+
+        console.print("\n" + "="*80)
+        console.print("🚀 TEST-ASSISTANT SERVICE STARTED")
+        console.print("="*80)
+        for root in self.roots:
+            console.print(f"📂 Watching directory: {root.path}{' (recursive)' if self.config.recursive else ''}")
+            console.print(f"🤖 Claude prompt: {root.claude_prompt}")
+            if root.file_extensions:
+                console.print(f"📄 Watching extensions: {', '.join(root.file_extensions)}")
+            else:
+                console.print(f"📄 Watching: ALL file types")
+            console.print(f"⚙️  Timestamp format: {root.timestamp_format}")
+        console.print(f"🔸 Dry run mode: {'ENABLED' if self.config.dry_run else 'DISABLED'}")
+        console.print(f"🧵 Max workers: {self.config.max_workers}")
+        console.print(f"👁️  Observer: {self.observer_mode}")
+        if self.archivers:
+            console.print(f"🗄️  Archive: {self.config.archive_dir} ({self.config.archive_mode})")
+        console.print(f"📊 Log level: {self.config.log_level}")
+        console.print("="*80)
+
+        self._start_metrics_exporters()
+
+        if resumed:
+            console.print(f"\n♻️  Resumed {resumed} unfinished file(s) from the work journal")
 
         # Process existing files if configured
         if self.config.process_existing_files:
             self._process_existing_files()
 
-        print("\n👀 Waiting for new files...")
-        print("Press Ctrl+C to stop the service\n")
+        for archiver in self.archivers:
+            archiver.start()
+        if self.archivers:
+            logger.info(f"Archiving renamed files ({self.config.archive_mode} mode) to: "
+                        f"{', '.join(str(archiver.archive_dir) for archiver in self.archivers)}")
 
-        self.observer.start()
+        self.startup.mark("exporters and backlog")
+        self._report_startup()
+
+        console.print("\n👀 Waiting for new files...")
+        console.print("Press Ctrl+C to stop the service\n")
+
+        last_reconcile = time.time()
 
         try:
-            while True:
-                # Check if watch directory still exists
-                if not Path(self.config.watch_path).exists():
-                    logger.error("Watch directory no longer exists!")
-                    print("\n❌ ERROR: Watch directory was deleted or is no longer accessible")
-                    print("Stopping service...\n")
+            while not self._stop_requested.is_set():
+                # Check if the watch directories still exist
+                missing = [root.path for root in self.roots if not Path(root.path).exists()]
+                if missing:
+                    logger.error(f"Watch directory no longer exists: {', '.join(missing)}")
+                    console.print("\n❌ ERROR: Watch directory was deleted or is no longer accessible")
+                    console.print("Stopping service...\n")
                     break
 
-                time.sleep(1)
+                # Periodically verify the -latest indexes against the disk
+                reconcile_interval = self.config.latest_index_reconcile_interval
+                if reconcile_interval and time.time() - last_reconcile >= reconcile_interval:
+                    for file_handler in self.file_handlers:
+                        file_handler.reconcile_all_latest_indexes()
+                    last_reconcile = time.time()
+
+                self._stop_requested.wait(1)
         except KeyboardInterrupt:
             self.stop()
-    
+
+    def _report_startup(self):
+        """Log (and optionally print) how long each startup phase took."""
+        self.startup.record(self.metrics)
+        watching = self.startup.until("observer started")
+        logger.info(f"Watching {watching * 1000:.0f} ms after start; startup phases:\n{self.startup.report()}")
+        if self.config.startup_report:
+            console.print(f"\n⏱️  Startup timing (watching after {watching * 1000:.0f} ms):")
+            console.print(self.startup.report())
+
     def stop(self):
-        """Stop the service."""
+        """Stop the service (safe to call from another thread, and only once)."""
+        if self._stop_requested.is_set():
+            return
+        self._stop_requested.set()
+
         logger.info("Stopping test-assistant service...")
-        print("\n\n🛑 Stopping test-assistant service...")
+        console.print("\n\n🛑 Stopping test-assistant service...")
 
-        # Shutdown event handler first
+        # Stop feeding the startup backlog and archiving, then shutdown event handler
+        for backlog_feeder in self.backlog_feeders:
+            backlog_feeder.stop()
+        for archiver in self.archivers:
+            archiver.stop()
         self.event_handler.shutdown()
 
         # Stop observer
-        self.observer.stop()
-        self.observer.join()
+        if self.observer is not None:
+            self.observer.stop()
+            if self.observer.is_alive():
+                self.observer.join()
+
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.stop()
+
+        if self.journal is not None:
+            logger.info(f"Work journal: {self.journal.pending_count()} unfinished file(s) kept for next start")
+            self.journal.close()
+
+        if self.manifest is not None:
+            self.manifest.close()
+
+        # Kills any claude process still running (the event handler already
+        # did on shutdown; this covers calls that started afterwards)
+        for claude_runner in self.claude_runners:
+            claude_runner.close()
+
+        if self.result_cache is not None:
+            logger.info(f"Result cache stats: {self.result_cache.stats()}")
+            self.result_cache.close()
+
+        if self.result_store is not None:
+            self.result_store.close()
 
         logger.info("Service stopped")
-        print("✅ Service stopped successfully\n")
+        console.print("✅ Service stopped successfully\n")
+        console.stop()
+        self._stop_logging()
 
 
 def main():
@@ -0,0 +1,154 @@
+"""Persistent manifest of processed files for test-assistant."""
+import logging
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# One record per processed file: inode, size, mtime in nanoseconds
+RECORD = struct.Struct("<QQq")
+
+FileKey = Tuple[int, int, int]
+
+
+class ProcessedManifest:
+    """Append-only file of (inode, size, mtime) keys of processed files.
+
+    Renames keep all three values, so a file stays recognized through the
+    timestamp rename and later -latest suffix changes, while an edited or
+    replaced file gets a new key and is processed again. Lookups are done by
+    inode first, so unknown files are rejected without a stat call.
+
+    Files processed before the manifest existed are only known once a
+    complete startup scan has adopted them (see mark_seeded); until then
+    the manifest alone cannot tell which files were processed.
+    """
+
+    # Sidecar file whose presence means a complete scan has seeded the manifest
+    SEEDED_SUFFIX = ".seeded"
+
+    def __init__(self, path: str):
+        """Initialize the manifest, loading existing records.
+
+        Args:
+            path: Path to the manifest file (created if missing)
+        """
+        self.path = Path(path)
+        self.seeded_marker = self.path.with_name(self.path.name + self.SEEDED_SUFFIX)
+        self.is_seeded = self.seeded_marker.exists()
+
+        self._keys: Set[FileKey] = set()
+        self._inodes: Set[int] = set()
+        self._lock = threading.Lock()
+
+        if self.path.exists() and self.path.stat().st_size > 0:
+            self._load()
+        self._file = open(self.path, "ab")
+
+    def _load(self):
+        """Read all records, dropping a torn record left by a crash."""
+        data = self.path.read_bytes()
+        usable = len(data) - len(data) % RECORD.size
+        for key in RECORD.iter_unpack(data[:usable]):
+            self._add_key(key)
+        if usable != len(data):
+            logger.warning(f"Dropping incomplete record at the end of {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(usable)
+        logger.info(f"Loaded {len(self._keys)} processed file(s) from {self.path}")
+
+    def _add_key(self, key: FileKey) -> bool:
+        """Add a key to the in-memory index.
+
+        Returns:
+            True if the key was not known before
+        """
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        self._inodes.add(key[0])
+        return True
+
+    @staticmethod
+    def key_for(stat_result: os.stat_result) -> FileKey:
+        """Build the manifest key from a stat result.
+
+        Args:
+            stat_result: Result of os.stat or DirEntry.stat
+
+        Returns:
+            Tuple of (inode, size, mtime in nanoseconds)
+        """
+        return stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns
+
+    def add(self, stat_result: os.stat_result):
+        """Record a file as processed.
+
+        Args:
+            stat_result: Stat result of the processed file
+        """
+        key = self.key_for(stat_result)
+        with self._lock:
+            if self._add_key(key):
+                self._file.write(RECORD.pack(*key))
+                self._file.flush()
+
+    def record(self, file_path: Path):
+        """Record a file as processed by path.
+
+        Args:
+            file_path: Path to the processed file
+        """
+        try:
+            self.add(os.stat(file_path))
+        except OSError as e:
+            logger.warning(f"Could not record {file_path} in manifest: {e}")
+
+    def note_renamed(self, old_path: Path, new_path: Path):
+        """Record a file once it is handed over (FileHandler rename listener).
+
+        Args:
+            old_path: Path before renaming
+            new_path: Path after renaming
+        """
+        self.record(new_path)
+
+    def contains(self, entry: os.DirEntry) -> bool:
+        """Check whether a directory entry was already processed.
+
+        Args:
+            entry: Directory entry from os.scandir
+
+        Returns:
+            True if the file's (inode, size, mtime) is in the manifest
+        """
+        # The inode comes from the dirent; only stat files whose inode is known
+        if entry.inode() not in self._inodes:
+            return False
+        return self.key_for(entry.stat()) in self._keys
+
+    def mark_seeded(self):
+        """Record that a complete scan has added every processed file.
+
+        The records are synced to disk before the marker is written, so a
+        crash never leaves a seeded manifest missing adopted files.
+        """
+        with self._lock:
+            if self.is_seeded:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.seeded_marker.touch()
+            self.is_seeded = True
+        logger.info(f"Manifest seeded with {len(self._keys)} processed file(s)")
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def close(self):
+        """Close the manifest file."""
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,446 @@
+"""Metrics registry and exporters for test-assistant."""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from fast renames up to long claude runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    """Convert a label dict into a hashable, sorted key."""
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(label_key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Format labels for the Prometheus text format."""
+    items = list(label_key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    parts = []
+    for name, value in items:
+        value = value.replace("\\", "\\\\").replace('"', '\\"')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Counter:
+    """Monotonically increasing counter."""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        """Increase the counter.
+
+        Args:
+            amount: Amount to add (must not be negative)
+        """
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        """Current counter value."""
+        return self._value
+
+
+class Gauge:
+    """Value that can go up and down, or is read from a callback."""
+
+    def __init__(self, callback: Optional[Callable[[], float]] = None):
+        self._value = 0.0
+        self._callback = callback
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        """Set the gauge value.
+
+        Args:
+            value: New value
+        """
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1.0):
+        """Increase the gauge value.
+
+        Args:
+            amount: Amount to add
+        """
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        """Decrease the gauge value.
+
+        Args:
+            amount: Amount to subtract
+        """
+        self.inc(-amount)
+
+    @property
+    def value(self) -> float:
+        """Current gauge value."""
+        if self._callback is not None:
+            try:
+                return float(self._callback())
+            except Exception as e:
+                logger.debug(f"Gauge callback failed: {e}")
+                return float("nan")
+        return self._value
+
+
+class Histogram:
+    """Cumulative histogram of observed values."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record an observation.
+
+        Args:
+            value: Observed value (seconds for durations)
+        """
+        with self._lock:
+            self._sum += value
+            self._count += 1
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[index] += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of the wrapped block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Return count, sum and cumulative bucket counts.
+
+        Returns:
+            Dictionary with count, sum and buckets
+        """
+        with self._lock:
+            return {
+                "count": self._count,
+                "sum": self._sum,
+                "buckets": {str(bound): count for bound, count in zip(self.buckets, self._counts)},
+            }
+
+
+class MetricsRegistry:
+    """Thread-safe registry of named counters, gauges and histograms."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, kind: str, name: str, help_text: str, labels, factory):
+        """Return the metric child for a name and label set, creating it if needed."""
+        with self._lock:
+            family = self._metrics.setdefault(name, {"kind": kind, "help": help_text, "children": {}})
+            if family["kind"] != kind:
+                raise ValueError(f"Metric {name} already registered as {family['kind']}")
+            children = family["children"]
+            key = _label_key(labels)
+            if key not in children:
+                children[key] = factory()
+            return children[key]
+
+    def counter(self, name: str, help_text: str = "", labels: Optional[Dict[str, str]] = None) -> Counter:
+        """Get or create a counter.
+
+        Args:
+            name: Metric name
+            help_text: Description shown in the Prometheus output
+            labels: Optional label values
+
+        Returns:
+            Counter instance
+        """
+        return self._get_or_create("counter", name, help_text, labels, Counter)
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        callback: Optional[Callable[[], float]] = None
+    ) -> Gauge:
+        """Get or create a gauge.
+
+        Args:
+            name: Metric name
+            help_text: Description shown in the Prometheus output
+            labels: Optional label values
+            callback: Optional function returning the current value
+
+        Returns:
+            Gauge instance
+        """
+        return self._get_or_create("gauge", name, help_text, labels, lambda: Gauge(callback))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Get or create a histogram.
+
+        Args:
+            name: Metric name
+            help_text: Description shown in the Prometheus output
+            labels: Optional label values
+            buckets: Upper bounds of the histogram buckets
+
+        Returns:
+            Histogram instance
+        """
+        return self._get_or_create("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def _families(self) -> List[Tuple[str, Dict[str, object]]]:
+        """Return a stable copy of the registered metric families."""
+        with self._lock:
+            return [
+                (name, {"kind": family["kind"], "help": family["help"], "children": dict(family["children"])})
+                for name, family in sorted(self._metrics.items())
+            ]
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            Metrics text
+        """
+        lines = []
+        for name, family in self._families():
+            if family["help"]:
+                lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['kind']}")
+            for label_key, metric in family["children"].items():
+                if family["kind"] == "histogram":
+                    data = metric.snapshot()
+                    for bound, count in data["buckets"].items():
+                        lines.append(f"{name}_bucket{_format_labels(label_key, ('le', bound))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(label_key, ('le', '+Inf'))} {data['count']}")
+                    lines.append(f"{name}_sum{_format_labels(label_key)} {data['sum']}")
+                    lines.append(f"{name}_count{_format_labels(label_key)} {data['count']}")
+                else:
+                    lines.append(f"{name}{_format_labels(label_key)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, object]:
+        """Return all metric values as a JSON-serializable dictionary.
+
+        Returns:
+            Mapping of metric name to its values per label set
+        """
+        result: Dict[str, object] = {"timestamp": time.time()}
+        for name, family in self._families():
+            values = []
+            for label_key, metric in family["children"].items():
+                entry: Dict[str, object] = {"labels": dict(label_key)}
+                if family["kind"] == "histogram":
+                    entry.update(metric.snapshot())
+                else:
+                    entry["value"] = metric.value
+                values.append(entry)
+            result[name] = values
+        return result
+
+
+class MetricsServer:
+    """Serves the registry as Prometheus text on a local HTTP port."""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+        """Initialize the metrics server.
+
+        Args:
+            registry: Registry to expose
+            port: Port to listen on (0 = pick a free port)
+            host: Interface to bind to
+        """
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start serving /metrics in a background thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only needed when enabled
+
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                logger.debug(f"Metrics request: {format % args}")
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics endpoint: http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        """Stop the HTTP server."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class SnapshotWriter:
+    """Periodically writes a JSON snapshot of the registry to a file."""
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = 60.0):
+        """Initialize the snapshot writer.
+
+        Args:
+            registry: Registry to snapshot
+            path: Output JSON file
+            interval: Seconds between snapshots
+        """
+        self.registry = registry
+        self.path = Path(path)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self):
+        """Write one snapshot atomically (temp file + rename)."""
+        tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.registry.snapshot(), f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def start(self):
+        """Start writing snapshots in a background thread."""
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                logger.error(f"Failed to write metrics snapshot: {e}")
+
+    def stop(self):
+        """Stop the writer and write a final snapshot."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        try:
+            self.write()
+        except OSError as e:
+            logger.error(f"Failed to write metrics snapshot: {e}")
+
+
+class StartupTimer:
+    """Records how long each startup phase took."""
+
+    def __init__(self, start: Optional[float] = None):
+        """Initialize the timer.
+
+        Args:
+            start: time.perf_counter() value the first phase starts at (default: now)
+        """
+        self.start = time.perf_counter() if start is None else start
+        self.phases: List[Tuple[str, float]] = []
+        self._last = self.start
+
+    def mark(self, phase: str):
+        """End a phase.
+
+        Args:
+            phase: Name of the phase that just finished
+        """
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def add_phase(self, phase: str, seconds: float):
+        """Record a phase that finished before the timer was created.
+
+        Args:
+            phase: Phase name
+            seconds: Duration of the phase
+        """
+        self.start -= seconds
+        self.phases.append((phase, seconds))
+
+    def until(self, phase: str) -> float:
+        """Return seconds from the start to the end of a phase.
+
+        Args:
+            phase: Phase name
+
+        Returns:
+            Cumulative duration up to and including the phase
+        """
+        total = 0.0
+        for name, seconds in self.phases:
+            total += seconds
+            if name == phase:
+                break
+        return total
+
+    def elapsed(self) -> float:
+        """Return seconds from the start to the last mark."""
+        return self._last - self.start
+
+    def record(self, registry: MetricsRegistry):
+        """Export the phase durations as startup_phase_seconds gauges.
+
+        Args:
+            registry: Registry receiving the gauges
+        """
+        for phase, seconds in self.phases:
+            registry.gauge(
+                "startup_phase_seconds",
+                "Duration of each service startup phase",
+                labels={"phase": phase}
+            ).set(seconds)
+
+    def report(self) -> str:
+        """Format the phases as a table.
+
+        Returns:
+            Report text
+        """
+        lines = [f"  {phase:<24}{seconds * 1000:8.1f} ms" for phase, seconds in self.phases]
+        lines.append(f"  {'total':<24}{self.elapsed() * 1000:8.1f} ms")
+        return "\n".join(lines)
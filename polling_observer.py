@@ -0,0 +1,303 @@
+"""Polling observer for watch directories on network file systems.
+
+inotify events are not delivered for changes made on other hosts, so NFS
+and SMB mounts must be polled. Unlike watchdog's PollingObserver, which
+stats every file on every cycle, this observer keeps a snapshot of each
+directory (entry name -> inode) taken with os.scandir and only rereads
+directories whose modification time changed. Creating, deleting or
+renaming an entry changes its directory's mtime, so an idle tree costs one
+stat per directory per poll.
+"""
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from watchdog.events import (
+    DirCreatedEvent,
+    DirDeletedEvent,
+    DirMovedEvent,
+    FileCreatedEvent,
+    FileDeletedEvent,
+    FileMovedEvent,
+)
+from watchdog.observers.api import BaseObserver, EventEmitter
+
+logger = logging.getLogger(__name__)
+
+# File system types on which inotify does not see remote changes
+NETWORK_FILESYSTEMS = frozenset({
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "glusterfs", "fuse.sshfs", "ncpfs"
+})
+
+MOUNT_ESCAPE_PATTERN = re.compile(r"\\([0-7]{3})")
+
+# Entry name -> (inode, is directory)
+Entries = Dict[str, Tuple[int, bool]]
+
+# A directory read within this time of its mtime is read again on the next
+# poll, since coarse server timestamps can hide a change made in the same tick
+RACY_MTIME_NS = 2_000_000_000
+
+
+def filesystem_type(path: str, mounts_file: str = "/proc/mounts") -> Optional[str]:
+    """Return the type of the file system containing a path.
+
+    Args:
+        path: Path inside the file system
+        mounts_file: Mount table to read (Linux format)
+
+    Returns:
+        File system type (e.g. "ext4", "nfs4"), or None if unknown
+    """
+    try:
+        with open(mounts_file) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None  # Not Linux, or /proc is unavailable
+
+    path = os.path.realpath(path)
+    best_mount, best_type = "", None
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 3:
+            continue
+        # Spaces and other special characters are octal-escaped
+        mount_point = MOUNT_ESCAPE_PATTERN.sub(lambda m: chr(int(m.group(1), 8)), fields[1])
+        inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+        if inside and len(mount_point) >= len(best_mount):
+            best_mount, best_type = mount_point, fields[2]
+    return best_type
+
+
+def is_network_filesystem(path: str, mounts_file: str = "/proc/mounts") -> bool:
+    """Check if a path lies on a network file system.
+
+    Args:
+        path: Path to check
+        mounts_file: Mount table to read (Linux format)
+
+    Returns:
+        True for NFS, SMB/CIFS and similar mounts
+    """
+    fs_type = filesystem_type(path, mounts_file)
+    return fs_type is not None and (fs_type in NETWORK_FILESYSTEMS or fs_type.startswith("nfs"))
+
+
+@dataclass
+class DirectoryState:
+    """Snapshot of one directory."""
+
+    mtime_ns: int
+    read_ns: int
+    entries: Entries = field(default_factory=dict)
+
+    def is_current(self, mtime_ns: int) -> bool:
+        """Check if the snapshot still matches a directory with this mtime."""
+        return mtime_ns == self.mtime_ns and self.read_ns - self.mtime_ns > RACY_MTIME_NS
+
+
+class ScandirPollingEmitter(EventEmitter):
+    """Emitter that diffs incremental os.scandir snapshots of a watched tree.
+
+    Emits created, deleted and moved events for files and directories
+    (moves are matched by inode); file content changes are not reported.
+    The poll interval starts at the observer timeout and grows by half
+    after every poll without changes, up to max_interval.
+    """
+
+    def __init__(
+        self,
+        event_queue,
+        watch,
+        *,
+        timeout: float = 1.0,
+        event_filter=None,
+        max_interval: float = 10.0,
+        full_scan_every: int = 10,
+        ignore_dirs: Tuple[str, ...] = ()
+    ):
+        """Initialize the emitter.
+
+        Args:
+            event_queue: Observer event queue
+            watch: Watched path
+            timeout: Shortest poll interval in seconds
+            event_filter: Event classes to emit (None = all)
+            max_interval: Longest poll interval in seconds
+            full_scan_every: Reread all directories every this many polls, in
+                case a client-side attribute cache hid an mtime change (0 = never)
+            ignore_dirs: Directories that are not polled (e.g. the archive)
+        """
+        # event_filter only exists since watchdog 4.0, whose observers always pass it
+        filter_kwargs = {"event_filter": event_filter} if event_filter is not None else {}
+        super().__init__(event_queue, watch, timeout=timeout, **filter_kwargs)
+        self.min_interval = timeout
+        self.max_interval = max(timeout, max_interval)
+        self.interval = timeout
+        self.full_scan_every = full_scan_every
+        self.ignore_dirs = frozenset(ignore_dirs)
+        self._dirs: Dict[str, DirectoryState] = {}
+        self._polls = 0
+
+    def on_thread_start(self):
+        self._dirs = {}
+        self._scan_tree(self.watch.path)
+
+    def queue_events(self, timeout: float):
+        if self.stopped_event.wait(self.interval):
+            return
+        changed = self.poll()
+        self.interval = self.min_interval if changed else min(self.max_interval, self.interval * 1.5)
+
+    @staticmethod
+    def _read_directory(dir_path: str) -> Optional[DirectoryState]:
+        """Read one directory without stat calls per entry.
+
+        Returns:
+            Directory snapshot, or None if the directory cannot be read
+        """
+        try:
+            # Stat first: a change during the scan leaves a newer mtime for the next poll
+            state = DirectoryState(os.stat(dir_path).st_mtime_ns, time.time_ns())
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    try:
+                        state.entries[entry.name] = (entry.inode(), entry.is_dir(follow_symlinks=False))
+                    except OSError:
+                        continue
+            return state
+        except OSError:
+            return None
+
+    def _scan_tree(self, top: str) -> List[Tuple[str, bool]]:
+        """Snapshot a directory (and its subdirectories if recursive).
+
+        Returns:
+            (path, is directory) of every entry found below top
+        """
+        found: List[Tuple[str, bool]] = []
+        pending = [top] if top not in self.ignore_dirs else []
+        while pending:
+            dir_path = pending.pop()
+            state = self._read_directory(dir_path)
+            if state is None:
+                continue
+            self._dirs[dir_path] = state
+            for name, (_, is_dir) in state.entries.items():
+                entry_path = os.path.join(dir_path, name)
+                found.append((entry_path, is_dir))
+                if is_dir and self.watch.is_recursive and entry_path not in self.ignore_dirs:
+                    pending.append(entry_path)
+        return found
+
+    def _subtree(self, dir_path: str) -> List[str]:
+        """Return the snapshotted directories at or below dir_path."""
+        prefix = os.path.join(dir_path, "")
+        return [path for path in self._dirs if path == dir_path or path.startswith(prefix)]
+
+    def poll(self) -> bool:
+        """Compare the tree with the snapshot and emit events for the differences.
+
+        Returns:
+            True if anything changed
+        """
+        self._polls += 1
+        full_scan = self.full_scan_every and self._polls % self.full_scan_every == 0
+
+        removed: List[Tuple[str, int, bool]] = []
+        added: List[Tuple[str, int, bool]] = []
+        for dir_path in list(self._dirs):
+            old_state = self._dirs.get(dir_path)
+            if old_state is None:
+                continue  # Dropped with a removed or moved parent
+            try:
+                mtime_ns = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                if dir_path == self.watch.path:
+                    logger.warning(f"Watched directory disappeared: {dir_path}")
+                    self.queue_event(DirDeletedEvent(dir_path))
+                    self.stop()
+                    return True
+                continue  # Reported through its parent directory
+            if old_state.is_current(mtime_ns) and not full_scan:
+                continue
+
+            new_state = self._read_directory(dir_path)
+            if new_state is None:
+                continue
+            self._dirs[dir_path] = new_state
+            for name, entry in old_state.entries.items():
+                if new_state.entries.get(name) != entry:
+                    removed.append((os.path.join(dir_path, name), *entry))
+            for name, entry in new_state.entries.items():
+                if old_state.entries.get(name) != entry:
+                    added.append((os.path.join(dir_path, name), *entry))
+
+        if not removed and not added:
+            return False
+
+        # An entry that vanished under one name and appeared under another was moved
+        added_by_inode = {(inode, is_dir): path for path, inode, is_dir in added}
+        for src_path, inode, is_dir in removed:
+            dest_path = added_by_inode.pop((inode, is_dir), None)
+            if dest_path is not None:
+                self._emit_move(src_path, dest_path, is_dir)
+            elif is_dir:
+                self._emit_directory_removal(src_path)
+            else:
+                self.queue_event(FileDeletedEvent(src_path))
+
+        for (_, is_dir), path in added_by_inode.items():
+            if not is_dir:
+                self.queue_event(FileCreatedEvent(path))
+                continue
+            self.queue_event(DirCreatedEvent(path))
+            if self.watch.is_recursive:
+                for entry_path, entry_is_dir in self._scan_tree(path):
+                    self.queue_event(DirCreatedEvent(entry_path) if entry_is_dir else FileCreatedEvent(entry_path))
+        return True
+
+    def _emit_move(self, src_path: str, dest_path: str, is_dir: bool):
+        """Emit a move and carry the snapshot of a moved directory over."""
+        if not is_dir:
+            self.queue_event(FileMovedEvent(src_path, dest_path))
+            return
+
+        self.queue_event(DirMovedEvent(src_path, dest_path))
+        for old_dir in self._subtree(src_path):
+            new_dir = dest_path + old_dir[len(src_path):]
+            state = self._dirs.pop(old_dir)
+            self._dirs[new_dir] = state
+            for name, (_, entry_is_dir) in state.entries.items():
+                event_class = DirMovedEvent if entry_is_dir else FileMovedEvent
+                self.queue_event(event_class(os.path.join(old_dir, name), os.path.join(new_dir, name)))
+
+    def _emit_directory_removal(self, dir_path: str):
+        """Emit deletions for a removed directory and everything known below it."""
+        for old_dir in self._subtree(dir_path):
+            state = self._dirs.pop(old_dir)
+            for name, (_, entry_is_dir) in state.entries.items():
+                if not entry_is_dir:
+                    self.queue_event(FileDeletedEvent(os.path.join(old_dir, name)))
+        self.queue_event(DirDeletedEvent(dir_path))
+
+
+class ScandirPollingObserver(BaseObserver):
+    """Observer polling watched trees with ScandirPollingEmitter."""
+
+    def __init__(self, interval: float = 1.0, max_interval: float = 10.0, ignore_dirs: Tuple[str, ...] = ()):
+        """Initialize the observer.
+
+        Args:
+            interval: Shortest poll interval in seconds (used while changes keep arriving)
+            max_interval: Longest poll interval in seconds (reached when the tree is idle)
+            ignore_dirs: Directories inside watched trees that are not polled
+        """
+        super().__init__(
+            partial(ScandirPollingEmitter, max_interval=max_interval, ignore_dirs=tuple(ignore_dirs)),
+            timeout=interval
+        )
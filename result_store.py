@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Indexed store of claude results for test-assistant.
+
+Every analysis is recorded with its file path, content hash, prompt,
+output, exit code and timings. Run this module to query the store:
+
+    python result_store.py results.db --file watch/102325 --status failure
+    python result_store.py results.db --since 2025-10-22T09:00 --output
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    "id", "path", "content_hash", "prompt", "output", "exit_code",
+    "status", "started_at", "finished_at", "duration"
+)
+
+# Sorts after any text following a path prefix, bounding prefix range queries
+PATH_PREFIX_END = "\U0010ffff"
+
+
+class ResultStore:
+    """SQLite (WAL mode) table of claude results, indexed by path, time and status."""
+
+    def __init__(self, db_path: str):
+        """Initialize the result store.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " path TEXT NOT NULL,"
+            " content_hash TEXT,"
+            " prompt TEXT NOT NULL,"
+            " output TEXT,"
+            " exit_code INTEGER,"
+            " status TEXT NOT NULL,"
+            " started_at REAL NOT NULL,"
+            " finished_at REAL NOT NULL,"
+            " duration REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_path ON results (path)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_finished_at ON results (finished_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_status ON results (status)")
+        self._conn.commit()
+
+    def record(
+        self,
+        file_path: Path,
+        prompt: str,
+        status: str,
+        output: Optional[str],
+        exit_code: Optional[int],
+        started_at: float,
+        finished_at: Optional[float] = None,
+        content_hash: Optional[str] = None
+    ) -> int:
+        """Store one result.
+
+        Args:
+            file_path: Path of the analyzed file
+            prompt: Full prompt sent to claude
+            status: success, failure, timeout, error, cached or dry_run
+            output: Output from claude (None if there was none)
+            exit_code: Exit code of the claude process (None if it did not finish)
+            started_at: Time the analysis started
+            finished_at: Time the analysis finished (default: now)
+            content_hash: SHA-256 of the file content
+
+        Returns:
+            Id of the stored result
+        """
+        finished_at = time.time() if finished_at is None else finished_at
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO results (path, content_hash, prompt, output, exit_code, status,"
+                " started_at, finished_at, duration) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(file_path), content_hash, prompt, output, exit_code, status,
+                 started_at, finished_at, finished_at - started_at)
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def query(
+        self,
+        path: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        status: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, object]]:
+        """Look up results, newest first.
+
+        Args:
+            path: Match results whose path starts with this text (a file, its
+                -latest name, or every file under a directory)
+            since: Only results finished at or after this time
+            until: Only results finished before this time
+            status: Only results with this status
+            limit: Maximum number of results
+
+        Returns:
+            List of result dictionaries
+        """
+        clauses, params = [], []
+        if path:
+            # A range over the path index instead of a full table scan
+            clauses.append("path >= ? AND path < ?")
+            params.extend([path, path + PATH_PREFIX_END])
+        if since is not None:
+            clauses.append("finished_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("finished_at < ?")
+            params.append(until)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM results"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY finished_at DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def close(self):
+        """Close the underlying database."""
+        with self._lock:
+            self._conn.close()
+
+
+def parse_time(value: str) -> float:
+    """Parse an ISO 8601 date/time or a Unix timestamp.
+
+    Args:
+        value: Command line value
+
+    Returns:
+        Unix timestamp
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def format_result(result: Dict[str, object], show_output: bool = False) -> str:
+    """Format a result for the terminal.
+
+    Args:
+        result: Result dictionary from ResultStore.query
+        show_output: If True, include the claude output
+
+    Returns:
+        Formatted text
+    """
+    finished = datetime.fromtimestamp(result["finished_at"]).strftime("%Y-%m-%d %H:%M:%S")
+    exit_code = "-" if result["exit_code"] is None else result["exit_code"]
+    line = (
+        f"#{result['id']:<6} {finished}  {result['status']:<8} exit={exit_code:<4} "
+        f"{result['duration']:7.2f}s  {result['path']}"
+    )
+    if show_output and result["output"]:
+        line += "\n" + "-" * 80 + "\n" + result["output"].rstrip("\n") + "\n" + "-" * 80
+    return line
+
+
+def main(argv: Optional[List[str]] = None):
+    """Query the result store from the command line.
+
+    Args:
+        argv: Arguments (default: sys.argv)
+    """
+    import argparse  # Only needed by the command line
+
+    parser = argparse.ArgumentParser(description="Query stored claude results")
+    parser.add_argument("db_path", help="Result store database (result_store_path)")
+    parser.add_argument("--file", help="Only results whose path starts with this path (a file, prefix or directory)")
+    parser.add_argument("--since", type=parse_time, help="Only results finished at or after this time")
+    parser.add_argument("--until", type=parse_time, help="Only results finished before this time")
+    parser.add_argument("--status", choices=["success", "failure", "timeout", "error", "cached", "dry_run"],
+                        help="Only results with this status")
+    parser.add_argument("--limit", type=int, default=50, help="Maximum number of results (0 = all)")
+    parser.add_argument("--output", action="store_true", help="Print the claude output of each result")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+
+    if not Path(args.db_path).exists():
+        parser.error(f"result store not found: {args.db_path}")
+
+    store = ResultStore(args.db_path)
+    try:
+        results = store.query(
+            path=str(Path(args.file).expanduser().resolve()) if args.file else None,
+            since=args.since,
+            until=args.until,
+            status=args.status,
+            limit=args.limit or None
+        )
+    finally:
+        store.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(format_result(result, show_output=args.output))
+    if not results:
+        print("No matching results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Priority queue and rate limiting for claude invocations in test-assistant."""
+import fnmatch
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+from config_model import PriorityRule
+from metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class PriorityClassifier:
+    """Assigns a priority to a file from the configured rules."""
+
+    def __init__(self, rules: List[PriorityRule], default_priority: int = 10):
+        """Initialize the classifier.
+
+        Args:
+            rules: Priority rules, checked in order (first match wins)
+            default_priority: Priority of files matching no rule
+        """
+        self.rules = rules
+        self.default_priority = default_priority
+        self._extensions = [frozenset(ext.lower() for ext in rule.extensions) for rule in rules]
+
+    def classify(self, file_path: Path) -> int:
+        """Return the priority of a file (lower runs first).
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            Priority of the first matching rule, or the default priority
+        """
+        size = None
+        for rule, extensions in zip(self.rules, self._extensions):
+            if extensions and file_path.suffix.lower() not in extensions:
+                continue
+            if rule.pattern:
+                target = str(file_path) if "/" in rule.pattern else file_path.name
+                if not fnmatch.fnmatch(target, rule.pattern):
+                    continue
+            if rule.min_size is not None or rule.max_size is not None:
+                if size is None:
+                    try:
+                        size = file_path.stat().st_size
+                    except OSError:
+                        continue
+                if rule.min_size is not None and size < rule.min_size:
+                    continue
+                if rule.max_size is not None and size > rule.max_size:
+                    continue
+            return rule.priority
+        return self.default_priority
+
+
+class PriorityWorkQueue(queue.Queue):
+    """Work queue ordered by file priority, with aging.
+
+    Drop-in replacement for queue.Queue: put() and get() take and return
+    plain paths. A file waiting aging_seconds is ranked like a file one
+    priority level more urgent that arrives now, so low-priority work is
+    never starved. Files of equal rank keep FIFO order, and the None
+    shutdown signal always comes first.
+    """
+
+    def __init__(
+        self,
+        classify: Optional[Callable[[Path], int]] = None,
+        aging_seconds: float = 60.0
+    ):
+        """Initialize the queue.
+
+        Args:
+            classify: Returns the priority of a file (default: all equal)
+            aging_seconds: Waiting time worth one priority level (0 = strict priorities)
+        """
+        super().__init__()
+        self.classify = classify or (lambda file_path: 0)
+        self.aging_seconds = aging_seconds
+        self._sequence = itertools.count()
+
+    def _rank(self, item) -> float:
+        """Compute the sort key of an item at the time it is queued."""
+        if item is None:
+            return float("-inf")
+        priority = self.classify(item)
+        if self.aging_seconds:
+            return priority + time.monotonic() / self.aging_seconds
+        return float(priority)
+
+    def put(self, item, block: bool = True, timeout: Optional[float] = None):
+        # Classify outside the queue lock; the heap entry carries the rank
+        super().put((self._rank(item), next(self._sequence), item), block, timeout)
+
+    def _init(self, maxsize):
+        self.queue = []
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, entry):
+        heapq.heappush(self.queue, entry)
+
+    def _get(self):
+        return heapq.heappop(self.queue)[2]
+
+
+class RateLimiter:
+    """Token bucket (calls per minute) plus a cap on concurrent calls."""
+
+    def __init__(
+        self,
+        calls_per_minute: float = 0.0,
+        burst: int = 1,
+        max_concurrent: int = 0,
+        metrics: Optional[MetricsRegistry] = None
+    ):
+        """Initialize the rate limiter.
+
+        Args:
+            calls_per_minute: Sustained call rate (0 = unlimited)
+            burst: Calls allowed back to back when the bucket is full
+            max_concurrent: Maximum calls running at once (0 = unlimited)
+            metrics: Registry receiving the time spent waiting
+        """
+        self.calls_per_minute = calls_per_minute
+        self.burst = max(1, burst)
+        self.max_concurrent = max_concurrent
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+
+        self.metrics = metrics or MetricsRegistry()
+        self._wait_time = self.metrics.histogram(
+            "claude_rate_limit_wait_seconds",
+            "Time claude invocations waited for the rate limiter"
+        )
+
+    def _take_token(self) -> float:
+        """Take a token if one is available.
+
+        Returns:
+            0 if a token was taken, otherwise seconds until the next token
+        """
+        with self._lock:
+            now = time.monotonic()
+            rate = self.calls_per_minute / 60.0
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / rate
+
+    @contextmanager
+    def acquire(self) -> Iterator[None]:
+        """Block until a call is allowed and hold a concurrency slot while it runs."""
+        start = time.perf_counter()
+        if self._slots is not None:
+            self._slots.acquire()
+        try:
+            if self.calls_per_minute:
+                while True:
+                    delay = self._take_token()
+                    if not delay:
+                        break
+                    time.sleep(delay)
+            waited = time.perf_counter() - start
+            self._wait_time.observe(waited)
+            if waited > 1:
+                logger.info(f"Rate limit delayed claude by {waited:.1f}s")
+            yield
+        finally:
+            if self._slots is not None:
+                self._slots.release()
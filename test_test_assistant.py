@@ -1,15 +1,72 @@
 #!/usr/bin/env python3
 """Comprehensive unit tests for test-assistant."""
+import asyncio
+import io
+import json
+import logging
+import logging.handlers
+import os
+import urllib.request
 import unittest
 import tempfile
 import shutil
+from unittest import mock
 from pathlib import Path
+import threading
 import time
+import zipfile
+from datetime import datetime
 import yaml
-
-from config_model import TestAssistantConfig
-from file_handler import FileHandler
-from claude_runner import ClaudeCodeRunner
+from watchdog.events import FileCreatedEvent, FileMovedEvent
+from watchdog.observers.api import EventEmitter, EventQueue, ObservedWatch
+
+from config_model import PriorityRule, TestAssistantConfig
+from file_filter import FileFilter
+from file_handler import FileHandler, rename_no_replace
+from claude_runner import ClaudeCodeRunner, split_batch_output
+from async_runner import AsyncClaudeCodeRunner
+from claude_cache import ClaudeResultCache, hash_file
+from event_handler import TestAssistantEventHandler, WatchRoot
+from work_queue import WorkJournal
+from metrics import MetricsRegistry, MetricsServer, SnapshotWriter, StartupTimer
+from backlog import BacklogFeeder
+from archiver import INDEX_NAME, Archiver
+from manifest import RECORD, ProcessedManifest
+from console import Console
+from result_store import ResultStore
+from scheduler import PriorityClassifier, PriorityWorkQueue, RateLimiter
+from failure_policy import CircuitBreaker, LatencyBudget, RetryPolicy
+from polling_observer import ScandirPollingEmitter, filesystem_type, is_network_filesystem
+import file_handler
+import result_store
+import benchmark
+
+
+class FakeClaudeRunner:
+    """Stand-in for ClaudeCodeRunner that records concurrent invocations."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = []
+        self.batches = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def run_claude_code(self, file_path):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+            self.calls.append(file_path)
+        return "fake output"
+
+    def run_claude_code_batch(self, file_paths):
+        with self._lock:
+            self.batches.append(list(file_paths))
+        return {file_path: "fake output" for file_path in file_paths}
 
 
 class TestConfigModel(unittest.TestCase):
@@ -84,6 +141,11 @@ class TestConfigModel(unittest.TestCase):
         self.assertFalse(config.process_existing_files)
         self.assertEqual(config.log_level, "INFO")
         self.assertEqual(config.file_stability_timeout, 5.0)
+        # Failure handling beyond claude_timeout is opt-in
+        self.assertEqual(config.claude_timeout, 300)
+        self.assertEqual(config.claude_max_retries, 0)
+        self.assertEqual(config.circuit_breaker_threshold, 0)
+        self.assertEqual(config.latency_budget_multiplier, 0)
 
     def test_invalid_timestamp_format(self):
         """Test that invalid timestamp format raises error."""
@@ -99,6 +161,54 @@ class TestConfigModel(unittest.TestCase):
         with self.assertRaises(ValueError):
             TestAssistantConfig.from_yaml(str(self.config_path))
 
+    def test_watch_roots(self):
+        """Test that watch roots inherit unset settings from the top level."""
+        reports = Path(self.temp_dir) / "reports"
+        reports.mkdir()
+        config = TestAssistantConfig(
+            claude_prompt="Default prompt",
+            file_extensions=[".txt"],
+            watch_roots=[
+                {"path": self.temp_dir},
+                {"path": str(reports), "claude_prompt": "Summarize:", "file_extensions": ["md"],
+                 "timestamp_format": "mmddyy-HHMMSS-AMPM"}
+            ]
+        )
+        self.assertIsNone(config.watch_path)
+        first, second = config.resolved_roots()
+        self.assertEqual(first.claude_prompt, "Default prompt")
+        self.assertEqual(first.file_extensions, [".txt"])
+        self.assertEqual(first.timestamp_format, "mmddyy-HH-MM-SS-AMPM")
+        self.assertEqual(second.claude_prompt, "Summarize:")
+        self.assertEqual(second.file_extensions, [".md"])
+        self.assertEqual(second.timestamp_format, "mmddyy-HHMMSS-AMPM")
+
+    def test_watch_roots_validation(self):
+        """Test that a watch path and a prompt for every root are required."""
+        with self.assertRaises(ValueError):
+            TestAssistantConfig(claude_prompt="Test")
+        with self.assertRaises(ValueError):
+            TestAssistantConfig(watch_roots=[{"path": self.temp_dir}])
+        with self.assertRaises(ValueError):
+            TestAssistantConfig(
+                watch_path=self.temp_dir,
+                claude_prompt="Test",
+                watch_roots=[{"path": self.temp_dir}]
+            )
+
+    def test_filter_validation(self):
+        """Test that invalid filter regexes and size bounds are rejected."""
+        config = TestAssistantConfig(
+            watch_path=self.temp_dir,
+            claude_prompt="Test",
+            exclude_patterns=["*.log", "re:/cache/"]
+        )
+        self.assertTrue(config.ignore_hidden_files)
+        with self.assertRaises(ValueError):
+            TestAssistantConfig(watch_path=self.temp_dir, claude_prompt="Test", include_patterns=["re:("])
+        with self.assertRaises(ValueError):
+            TestAssistantConfig(watch_path=self.temp_dir, claude_prompt="Test", min_file_size=10, max_file_size=5)
+
 
 class TestFileHandler(unittest.TestCase):
     """Test file handler."""
@@ -141,6 +251,67 @@ class TestFileHandler(unittest.TestCase):
         self.assertEqual(len(parts[0]), 6)  # mmddyy
         self.assertEqual(len(parts[1]), 6)  # HHMMSS
 
+    def test_subsecond_timestamp_formats(self):
+        """Test timestamp generation with milliseconds and microseconds."""
+        handler = FileHandler(watch_dir=self.temp_dir, timestamp_format="mmddyy-HH-MM-SS-fff-AMPM")
+        self.assertRegex(handler.generate_timestamp(), r"^\d{6}-\d{2}-\d{2}-\d{2}-\d{3}-(AM|PM)$")
+
+        handler = FileHandler(watch_dir=self.temp_dir, timestamp_format="mmddyy-HHMMSS-ffffff-AMPM")
+        self.assertRegex(handler.generate_timestamp(), r"^\d{6}-\d{6}-\d{6}-(AM|PM)$")
+
+    def test_renames_within_one_timestamp_do_not_collide(self):
+        """Test that files renamed within the same timestamp keep distinct names."""
+        self.handler.generate_timestamp = lambda: "102325-10-07-50-AM"
+        (Path(self.temp_dir) / "102325-10-07-50-AM-1.txt").write_text("earlier run")
+        for index in range(4):
+            new_file = Path(self.temp_dir) / f"new{index}.txt"
+            new_file.write_text(f"content {index}")
+            self.handler.process_new_file(new_file)
+
+        names = sorted(path.name for path in Path(self.temp_dir).iterdir())
+        self.assertEqual(names, [
+            "102325-10-07-50-AM-1.txt",
+            "102325-10-07-50-AM-2.txt",
+            "102325-10-07-50-AM-3.txt",
+            "102325-10-07-50-AM-4-latest.txt",
+            "102325-10-07-50-AM.txt",
+        ])
+        self.assertEqual((Path(self.temp_dir) / "102325-10-07-50-AM-1.txt").read_text(), "earlier run")
+        self.assertEqual((Path(self.temp_dir) / "102325-10-07-50-AM-4-latest.txt").read_text(), "content 3")
+
+    def test_rename_no_replace(self):
+        """Test that renames fail instead of replacing an existing file."""
+        src = Path(self.temp_dir) / "src.txt"
+        dst = Path(self.temp_dir) / "dst.txt"
+        src.write_text("new")
+        dst.write_text("old")
+        with self.assertRaises(FileExistsError):
+            rename_no_replace(src, dst)
+        self.assertEqual(dst.read_text(), "old")
+
+        # Without renameat2: hard link to the new name, then unlink the old one
+        with mock.patch.object(file_handler, "_renameat2", None):
+            with self.assertRaises(FileExistsError):
+                rename_no_replace(src, dst)
+            if os.name != "nt":
+                moved = Path(self.temp_dir) / "moved.txt"
+                self.assertTrue(rename_no_replace(src, moved))
+                self.assertFalse(src.exists())
+                self.assertEqual(moved.read_text(), "new")
+        self.assertEqual(dst.read_text(), "old")
+
+    @unittest.skipIf(os.name == "nt", "link/unlink fallback is POSIX only")
+    def test_link_renames_are_recognized(self):
+        """Test that create events of our own link/unlink renames can be ignored."""
+        new_file = Path(self.temp_dir) / "new.txt"
+        new_file.write_text("content")
+        with mock.patch.object(file_handler, "_renameat2", None):
+            result_path = self.handler.process_new_file(new_file)
+
+        self.assertTrue(self.handler.is_own_link(result_path))
+        self.assertFalse(self.handler.is_own_link(result_path))  # Only once
+        self.assertFalse(self.handler.is_own_link(new_file))
+
     def test_find_latest_file(self):
         """Test finding file with -latest suffix."""
         # Create test files
@@ -159,6 +330,82 @@ class TestFileHandler(unittest.TestCase):
         latest = self.handler.find_latest_file()
         self.assertIsNone(latest)
 
+    def test_latest_index_avoids_rescan(self):
+        """Test that the -latest index is updated without rescanning."""
+        new_file = Path(self.temp_dir) / "new.txt"
+        new_file.write_text("content")
+        result_path = self.handler.process_new_file(new_file)
+
+        # Hide the scan so only the index can answer
+        self.handler._scan_for_latest = lambda directory: []
+        self.assertEqual(self.handler.find_latest_file(), result_path)
+
+    def test_latest_index_external_removal(self):
+        """Test that external deletion of the -latest file is reconciled."""
+        latest_file = Path(self.temp_dir) / "102325-10-00-00-AM-latest.txt"
+        latest_file.touch()
+        self.assertEqual(self.handler.find_latest_file(), latest_file)
+
+        latest_file.unlink()
+        self.handler.note_file_removed(latest_file)
+        self.assertIsNone(self.handler.find_latest_file())
+
+        # Out-of-band change picked up by reconciliation
+        other_latest = Path(self.temp_dir) / "102325-11-00-00-AM-latest.txt"
+        other_latest.touch()
+        self.assertEqual(self.handler.reconcile_latest_index(), other_latest)
+        self.assertEqual(self.handler.find_latest_file(), other_latest)
+
+    def test_reconcile_scan_does_not_block_renames(self):
+        """Test that renames proceed while reconciliation scans the directory."""
+        old_latest = Path(self.temp_dir) / "102325-10-00-00-AM-latest.txt"
+        old_latest.touch()
+        self.assertEqual(self.handler.find_latest_file(), old_latest)
+
+        scanning, resume = threading.Event(), threading.Event()
+        scan = self.handler._scan_for_latest
+
+        def slow_scan(directory):
+            found = scan(directory)
+            scanning.set()
+            resume.wait(5)
+            return found
+
+        reconciled = []
+        with mock.patch.object(self.handler, "_scan_for_latest", slow_scan):
+            reconciler = threading.Thread(target=lambda: reconciled.append(self.handler.reconcile_latest_index()))
+            reconciler.start()
+            self.assertTrue(scanning.wait(5))
+
+            new_file = Path(self.temp_dir) / "new.txt"
+            new_file.write_text("new")
+            start = time.monotonic()
+            result_path = self.handler.process_new_file(new_file)
+            self.assertLess(time.monotonic() - start, 1.0)
+            resume.set()
+            reconciler.join(5)
+
+        # The scan saw the old -latest file; the rename during it wins
+        self.assertEqual(reconciled, [result_path])
+        self.assertEqual(self.handler.find_latest_file(), result_path)
+
+    def test_latest_tracked_per_directory(self):
+        """Test that each subdirectory keeps its own -latest file."""
+        sub_dir = Path(self.temp_dir) / "project"
+        sub_dir.mkdir()
+        root_file = Path(self.temp_dir) / "root.txt"
+        sub_file = sub_dir / "sub.txt"
+        root_file.write_text("root")
+        sub_file.write_text("sub")
+
+        root_latest = self.handler.process_new_file(root_file)
+        sub_latest = self.handler.process_new_file(sub_file)
+
+        self.assertEqual(sub_latest.parent, sub_dir)
+        self.assertTrue(root_latest.exists())
+        self.assertEqual(self.handler.find_latest_file(), root_latest)
+        self.assertEqual(self.handler.find_latest_file(sub_dir), sub_latest)
+
     def test_remove_latest_suffix(self):
         """Test removing -latest suffix from file."""
         test_file = Path(self.temp_dir) / "102325-10-00-00-AM-latest.txt"
@@ -169,6 +416,25 @@ class TestFileHandler(unittest.TestCase):
         self.assertTrue(new_path.exists())
         self.assertFalse(test_file.exists())
 
+    def test_handover_deferred_while_held(self):
+        """Test that a held -latest file keeps its name until released."""
+        held = Path(self.temp_dir) / "102325-10-00-00-AM-latest.txt"
+        held.write_text("being analyzed")
+        self.assertTrue(self.handler.hold(held))
+
+        new_file = Path(self.temp_dir) / "new.txt"
+        new_file.write_text("new content")
+        result_path = self.handler.process_new_file(new_file)
+        self.assertTrue(held.exists())
+        self.assertEqual(self.handler.find_latest_file(), result_path)
+        self.assertEqual(self.handler.reconcile_latest_index(), result_path)
+
+        self.handler.release(held)
+        self.assertFalse(held.exists())
+        self.assertTrue((Path(self.temp_dir) / "102325-10-00-00-AM.txt").exists())
+        self.assertEqual([p for p in Path(self.temp_dir).iterdir() if "-latest" in p.stem], [result_path])
+        self.assertFalse(self.handler.hold(held))
+
     def test_rename_to_latest(self):
         """Test renaming file with timestamp-latest format."""
         test_file = Path(self.temp_dir) / "test.txt"
@@ -234,6 +500,137 @@ class TestFileHandler(unittest.TestCase):
         is_stable = handler.wait_for_file_stability(test_file)
         self.assertFalse(is_stable)
 
+    def test_close_write_stability(self):
+        """Test that a close-write event marks the file stable immediately."""
+        test_file = Path(self.temp_dir) / "test.txt"
+        test_file.write_text("content")
+
+        handler = FileHandler(
+            watch_dir=self.temp_dir,
+            stability_timeout=5.0,
+            stability_mode="close_write"
+        )
+        handler.expect_close(test_file)
+        threading.Timer(0.1, handler.notify_closed, args=(test_file,)).start()
+
+        start = time.time()
+        self.assertTrue(handler.wait_for_file_stability(test_file))
+        self.assertLess(time.time() - start, 2.0)
+        self.assertNotIn(test_file, handler._close_events)
+
+    def test_close_write_falls_back_to_polling(self):
+        """Test that unregistered files fall back to size polling."""
+        test_file = Path(self.temp_dir) / "test.txt"
+        test_file.write_text("content")
+
+        handler = FileHandler(
+            watch_dir=self.temp_dir,
+            stability_timeout=2.0,
+            stability_check_interval=0.05,
+            stability_mode="close_write"
+        )
+        self.assertTrue(handler.wait_for_file_stability(test_file))
+
+    def test_complete_file_is_not_waited_on(self):
+        """Test that files marked complete skip the stability wait."""
+        test_file = Path(self.temp_dir) / "test.txt"
+        test_file.write_text("content")
+
+        handler = FileHandler(
+            watch_dir=self.temp_dir,
+            stability_timeout=5.0,
+            stability_check_interval=1.0,
+            stability_mode="poll"
+        )
+        handler.mark_complete(test_file)
+
+        start = time.time()
+        self.assertTrue(handler.wait_for_file_stability(test_file))
+        self.assertLess(time.time() - start, 0.5)
+        self.assertNotIn(test_file, handler._complete_files)
+
+    def test_auto_stability_mode(self):
+        """Test that auto mode resolves to a concrete mode."""
+        mode = FileHandler.resolve_stability_mode("auto")
+        self.assertIn(mode, ["close_write", "poll"])
+        self.assertEqual(FileHandler.resolve_stability_mode("poll"), "poll")
+
+
+class TestFileFilter(unittest.TestCase):
+    """Test the precompiled file filter."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = Path(self.temp_dir)
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_name_rules(self):
+        """Test extension, hidden, temp and include/exclude rules."""
+        file_filter = FileFilter(
+            extensions=[".py", ".TXT"],
+            include_patterns=["test_*", "*/src/*", "re:/docs/v\\d+/"],
+            exclude_patterns=["*_generated.py", "*/build/*"],
+            temp_file_patterns=["*.part", ".~*"],
+            ignore_hidden=True
+        )
+        cases = {
+            "test_a.py": None,
+            "src/module.py": None,
+            "docs/v2/notes.txt": None,
+            "notes.md": "extension",
+            "src/.hidden.py": "hidden",
+            ".git/test_x.py": "hidden",
+            "test_a.py.part": "extension",
+            "src/test_gen_generated.py": "excluded",
+            "build/src/test_b.py": "excluded",
+            "other.py": "not_included",
+            "docs/vx/notes.txt": "not_included",
+        }
+        for relative, reason in cases.items():
+            with self.subTest(relative):
+                self.assertEqual(file_filter.reject_reason(self.root / relative, self.root), reason)
+
+        temp_filter = FileFilter(temp_file_patterns=["*.part", ".~*"])
+        self.assertEqual(temp_filter.reject_reason(self.root / "a.txt.part"), "temp")
+        self.assertTrue(temp_filter.is_temp_file(Path(".~lock.txt")))
+        self.assertTrue(temp_filter.accepts_name(self.root / ".env"))  # Hidden files allowed by default
+        self.assertTrue(FileFilter().accepts_name(self.root / "anything.bin"))
+
+    def test_size_bounds(self):
+        """Test size bounds on sizes and on directory entries."""
+        file_filter = FileFilter(min_size=2, max_size=4)
+        self.assertTrue(file_filter.has_size_limits)
+        self.assertFalse(file_filter.accepts_size(1))
+        self.assertTrue(file_filter.accepts_size(4))
+        self.assertFalse(file_filter.accepts_size(5))
+        self.assertFalse(FileFilter().has_size_limits)
+
+        for name, content in (("small.txt", "a"), ("fits.txt", "abc"), ("large.txt", "abcdef")):
+            (self.root / name).write_text(content)
+        with os.scandir(self.temp_dir) as entries:
+            accepted = sorted(entry.name for entry in entries if file_filter.accepts_entry(entry, self.root))
+        self.assertEqual(accepted, ["fits.txt"])
+
+    def test_hidden_directories_are_pruned(self):
+        """Test that hidden directories are not scanned when hidden files are ignored."""
+        file_filter = FileFilter(ignore_hidden=True)
+        self.assertFalse(file_filter.accepts_directory(self.root / ".git", self.root))
+        self.assertTrue(file_filter.accepts_directory(self.root / "src", self.root))
+        self.assertTrue(FileFilter().accepts_directory(self.root / ".git", self.root))
+
+    def test_excluded_directories(self):
+        """Test that files below excluded directories are rejected."""
+        archive = self.root / "archive"
+        file_filter = FileFilter(exclude_dirs=[archive])
+        self.assertEqual(file_filter.reject_reason(archive / "2025" / "a.txt", self.root), "excluded")
+        self.assertTrue(file_filter.accepts_name(self.root / "archived.txt", self.root))
+        self.assertFalse(file_filter.accepts_directory(archive, self.root))
+        self.assertTrue(file_filter.accepts_directory(self.root / "archive2", self.root))
+
 
 class TestClaudeRunner(unittest.TestCase):
     """Test Claude CLI runner."""
@@ -265,6 +662,1763 @@ class TestClaudeRunner(unittest.TestCase):
         self.assertEqual(runner.prompt_template, "Analyze this:")
 
 
+def install_fake_claude(directory: str, script: str):
+    """Write a fake claude executable and return a PATH patcher for it."""
+    claude_path = Path(directory) / "claude"
+    claude_path.write_text("#!/bin/sh\n" + script)
+    claude_path.chmod(0o755)
+    return mock.patch.dict(os.environ, {"PATH": f"{directory}{os.pathsep}{os.environ['PATH']}"})
+
+
+@unittest.skipIf(os.name == "nt", "fake claude executable requires a POSIX shell")
+class TestClaudeProbe(unittest.TestCase):
+    """Test the cached claude availability check."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.calls_log = Path(self.temp_dir) / "calls.log"
+        self.cache_path = str(Path(self.temp_dir) / "probe.json")
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _probe_count(self):
+        return len(self.calls_log.read_text().splitlines()) if self.calls_log.exists() else 0
+
+    def test_probe_is_cached_until_binary_changes(self):
+        """Test that a successful probe is reused until the executable changes."""
+        script = f'echo probe >> "{self.calls_log}"\necho "claude 1.0"\n'
+        runner = ClaudeCodeRunner("Analyze:")
+        with install_fake_claude(self.temp_dir, script):
+            self.assertTrue(runner.check_claude_code_available(self.cache_path))
+            self.assertTrue(runner.check_claude_code_available(self.cache_path))
+            self.assertEqual(self._probe_count(), 1)
+
+            install_fake_claude(self.temp_dir, script + "# updated\n")
+            self.assertTrue(runner.check_claude_code_available(self.cache_path))
+            self.assertEqual(self._probe_count(), 2)
+
+    def test_failed_probe_is_not_cached(self):
+        """Test that a failing claude is probed again next time."""
+        runner = ClaudeCodeRunner("Analyze:")
+        with install_fake_claude(self.temp_dir, f'echo probe >> "{self.calls_log}"\nexit 1\n'):
+            self.assertFalse(runner.check_claude_code_available(self.cache_path))
+            self.assertFalse(runner.check_claude_code_available(self.cache_path))
+        self.assertEqual(self._probe_count(), 2)
+
+    def test_missing_executable(self):
+        """Test that a missing executable is reported without a subprocess."""
+        runner = ClaudeCodeRunner("Analyze:", claude_command="no-such-claude-binary")
+        self.assertFalse(runner.check_claude_code_available(self.cache_path))
+
+
+@unittest.skipIf(os.name == "nt", "fake claude executable requires a POSIX shell")
+class TestBatchRunner(unittest.TestCase):
+    """Test batched Claude CLI invocations."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.files = []
+        for i in range(3):
+            file_path = Path(self.temp_dir) / f"file{i}.txt"
+            file_path.write_text(f"content {i}")
+            self.files.append(file_path)
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_split_batch_output(self):
+        """Test splitting batch output into per-file sections."""
+        output = (
+            f"preamble\n=== FILE: {self.files[0]} ===\nfirst\n"
+            f"=== FILE: {self.files[2]} ===\nthird\nmore\n"
+        )
+        sections = split_batch_output(output, self.files)
+        self.assertEqual(sections[self.files[0]], "first\n")
+        self.assertEqual(sections[self.files[2]], "third\nmore\n")
+        self.assertIsNone(sections[self.files[1]])
+
+    def test_dry_run_batch(self):
+        """Test that dry run returns a result for every file."""
+        runner = ClaudeCodeRunner(prompt_template="Analyze:", dry_run=True)
+        results = runner.run_claude_code_batch(self.files)
+        self.assertEqual(set(results), set(self.files))
+        self.assertTrue(all("DRY RUN" in output for output in results.values()))
+
+    @unittest.skipIf(os.name == "nt", "fake claude executable requires a POSIX shell")
+    def test_single_invocation_for_batch(self):
+        """Test that a batch uses one claude call and records per-file results."""
+        script = (
+            "echo call >> \"$(dirname \"$0\")/calls.log\"\n"
+            "printf '%s\\n' \"$2\" | tail -n +3 | while read -r p; do\n"
+            "  echo \"=== FILE: $p ===\"\n"
+            "  echo \"analysis of $(basename \"$p\")\"\n"
+            "done\n"
+        )
+        runner = ClaudeCodeRunner(prompt_template="Analyze:")
+        with install_fake_claude(self.temp_dir, script):
+            results = runner.run_claude_code_batch(self.files)
+
+        calls = (Path(self.temp_dir) / "calls.log").read_text().splitlines()
+        self.assertEqual(len(calls), 1)
+        for file_path in self.files:
+            self.assertEqual(results[file_path], f"analysis of {file_path.name}\n")
+
+
+@unittest.skipIf(os.name == "nt", "fake claude executable requires a POSIX shell")
+class TestAsyncClaudeRunner(unittest.TestCase):
+    """Test asyncio-based Claude CLI runner."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_file = Path(self.temp_dir) / "test.txt"
+        self.test_file.write_text("content")
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_streams_output_lines(self):
+        """Test that output lines reach the sink and are returned."""
+        lines = []
+        runner = AsyncClaudeCodeRunner("Analyze:", stdout_sink=lines.append, stderr_sink=lambda line: None)
+        with install_fake_claude(self.temp_dir, "echo line1\necho line2\necho oops >&2\n"):
+            output = asyncio.run(runner.run_claude_code_async(self.test_file))
+
+        self.assertEqual(lines, ["line1", "line2"])
+        self.assertEqual(output, "line1\nline2\n")
+
+    def test_concurrent_invocations(self):
+        """Test that invocations run concurrently on one loop."""
+        runner = AsyncClaudeCodeRunner("Analyze:", stdout_sink=lambda line: None)
+        with install_fake_claude(self.temp_dir, "sleep 0.5\necho done\n"):
+            start = time.time()
+            outputs = asyncio.run(runner.run_many([self.test_file] * 4, concurrency=4))
+
+        self.assertEqual(outputs, ["done\n"] * 4)
+        self.assertLess(time.time() - start, 1.8)
+
+    def test_rate_limiter_applies_to_async_calls(self):
+        """Test that run_many waits for the rate limiter's concurrency cap."""
+        limiter = RateLimiter(max_concurrent=1)
+        runner = AsyncClaudeCodeRunner("Analyze:", stdout_sink=lambda line: None, rate_limiter=limiter)
+        with install_fake_claude(self.temp_dir, "sleep 0.3\necho done\n"):
+            start = time.time()
+            outputs = asyncio.run(runner.run_many([self.test_file] * 3, concurrency=3))
+
+        self.assertEqual(outputs, ["done\n"] * 3)
+        self.assertGreaterEqual(time.time() - start, 0.9)
+        self.assertEqual(limiter.metrics.histogram("claude_rate_limit_wait_seconds").snapshot()["count"], 3)
+
+    def test_timeout_kills_process(self):
+        """Test that a timed-out invocation returns None without hanging."""
+        runner = AsyncClaudeCodeRunner("Analyze:", timeout=0.3, stdout_sink=lambda line: None)
+        with install_fake_claude(self.temp_dir, "exec sleep 30\n"):
+            start = time.time()
+            output = runner.run_claude_code(self.test_file)
+            runner.close()
+
+        self.assertIsNone(output)
+        self.assertLess(time.time() - start, 5)
+
+    def test_close_cancels_running_invocations(self):
+        """Test that close kills running claude processes and releases waiting workers."""
+        runner = AsyncClaudeCodeRunner("Analyze:", timeout=30, stdout_sink=lambda line: None)
+        outputs = []
+        with install_fake_claude(self.temp_dir, "exec sleep 30\n"):
+            worker = threading.Thread(target=lambda: outputs.append(runner.run_claude_code(self.test_file)))
+            worker.start()
+            deadline = time.time() + 5
+            while not runner._processes and time.time() < deadline:
+                time.sleep(0.05)
+            process = next(iter(runner._processes))
+            runner.close()
+            worker.join(timeout=5)
+
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(outputs, [None])
+        self.assertIsNotNone(process.returncode)
+
+    def test_nonzero_exit(self):
+        """Test that a failing claude process returns None."""
+        runner = AsyncClaudeCodeRunner("Analyze:", stdout_sink=lambda line: None)
+        with install_fake_claude(self.temp_dir, "echo partial\nexit 3\n"):
+            output = runner.run_claude_code(self.test_file)
+            runner.close()
+
+        self.assertIsNone(output)
+
+
+class TestResultCache(unittest.TestCase):
+    """Test content-addressed result cache."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = str(Path(self.temp_dir) / "cache.db")
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_hash_file_streams_content(self):
+        """Test that hashing depends on content and prompt only."""
+        file1 = Path(self.temp_dir) / "a.txt"
+        file2 = Path(self.temp_dir) / "b.txt"
+        file1.write_text("same content")
+        file2.write_text("same content")
+
+        self.assertEqual(hash_file(file1, chunk_size=4), hash_file(file2))
+        self.assertNotEqual(hash_file(file1, prefix="p1"), hash_file(file1, prefix="p2"))
+
+    def test_hit_and_miss_counters(self):
+        """Test cache lookups and persistence across instances."""
+        cache = ClaudeResultCache(self.db_path)
+        self.assertIsNone(cache.get("key"))
+        cache.put("key", "output")
+        self.assertEqual(cache.get("key"), "output")
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+        cache.close()
+
+        reopened = ClaudeResultCache(self.db_path)
+        self.assertEqual(reopened.get("key"), "output")
+        reopened.close()
+
+    def test_size_and_age_eviction(self):
+        """Test that entries beyond size or age limits are evicted."""
+        cache = ClaudeResultCache(self.db_path, max_bytes=10)
+        cache.put("old", "12345678")
+        cache.put("new", "abcdefgh")
+        self.assertIsNone(cache.get("old"))
+        self.assertEqual(cache.get("new"), "abcdefgh")
+        cache.close()
+
+        cache = ClaudeResultCache(self.db_path, max_age=0.01)
+        cache.put("key", "output")
+        time.sleep(0.05)
+        self.assertIsNone(cache.get("key"))
+        self.assertGreaterEqual(cache.stats()["evictions"], 1)
+        cache.close()
+
+    def test_runner_uses_cached_output(self):
+        """Test that a cache hit skips the claude invocation."""
+        test_file = Path(self.temp_dir) / "test.txt"
+        test_file.write_text("content")
+
+        cache = ClaudeResultCache(self.db_path)
+        cache.put(ClaudeResultCache.make_key(test_file, "Analyze:"), "stored output")
+        runner = ClaudeCodeRunner(prompt_template="Analyze:", cache=cache)
+
+        self.assertEqual(runner.run_claude_code(test_file), "stored output")
+        cache.close()
+
+
+class TestResultStore(unittest.TestCase):
+    """Test the indexed result store and its query CLI."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = str(Path(self.temp_dir) / "results.db")
+        self.store = ResultStore(self.db_path)
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        self.store.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_query_filters(self):
+        """Test lookups by path, time range and status."""
+        self.store.record(Path("/w/a.py"), "p a", "success", "out a", 0, 100.0, 101.0, "h1")
+        self.store.record(Path("/w/b.py"), "p b", "failure", "", 1, 200.0, 202.0)
+        self.store.record(Path("/w/a-latest.py"), "p a2", "success", "out a2", 0, 300.0, 305.0)
+
+        self.assertEqual([r["prompt"] for r in self.store.query(path="/w/a")], ["p a2", "p a"])
+        self.assertEqual([r["path"] for r in self.store.query(status="failure")], ["/w/b.py"])
+        self.assertEqual(len(self.store.query(since=150, until=302)), 1)
+        self.assertEqual(len(self.store.query(limit=2)), 2)
+
+        first = self.store.query(path="/w/a.py")[0]
+        self.assertEqual(first["content_hash"], "h1")
+        self.assertEqual(first["duration"], 1.0)
+
+    def test_path_lookup_uses_index(self):
+        """Test that path lookups search the path index instead of scanning the table."""
+        statements = []
+        self.store._conn.set_trace_callback(statements.append)
+        self.store.query(path="/w/a")
+        self.store._conn.set_trace_callback(None)
+        plan = " ".join(str(row) for row in self.store._conn.execute(f"EXPLAIN QUERY PLAN {statements[-1]}"))
+        self.assertIn("results_path", plan)
+
+    @unittest.skipIf(os.name == "nt", "fake claude executable requires a POSIX shell")
+    def test_runner_records_results(self):
+        """Test that the runner stores output and skips the console when disabled."""
+        file_path = Path(self.temp_dir) / "file.txt"
+        file_path.write_text("content")
+        runner = ClaudeCodeRunner("Analyze", result_store=self.store, console_output=False)
+        with install_fake_claude(self.temp_dir, "printf analysis\n"), \
+                mock.patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            self.assertEqual(runner.run_claude_code(file_path), "analysis")
+
+        self.assertIn("TRIGGERING CLAUDE CLI", stdout.getvalue())
+        self.assertNotIn("analysis", stdout.getvalue())
+        [result] = self.store.query()
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["output"], "analysis")
+        self.assertEqual(result["exit_code"], 0)
+        self.assertEqual(result["prompt"], f"Analyze {file_path}")
+        self.assertEqual(result["content_hash"], hash_file(file_path))
+
+    @unittest.skipIf(os.name == "nt", "fake claude executable requires a POSIX shell")
+    def test_runner_hashes_each_file_once(self):
+        """Test that the stored content hash reuses the digest of the cache lookup."""
+        file_path = Path(self.temp_dir) / "file.txt"
+        file_path.write_text("content")
+        cache = ClaudeResultCache(str(Path(self.temp_dir) / "cache.db"))
+        runner = ClaudeCodeRunner("Analyze", cache=cache, result_store=self.store, console_output=False)
+        with install_fake_claude(self.temp_dir, "printf analysis\n"), \
+                mock.patch("claude_runner.hash_file", wraps=hash_file) as runner_hashed, \
+                mock.patch("claude_cache.hash_file", wraps=hash_file) as cache_hashed, \
+                mock.patch("sys.stdout", new_callable=io.StringIO):
+            runner.run_claude_code(file_path)
+            runner.run_claude_code(file_path)  # Cache hit
+        cache.close()
+
+        self.assertEqual(runner_hashed.call_count + cache_hashed.call_count, 2)
+        self.assertEqual([result["status"] for result in self.store.query()], ["cached", "success"])
+        self.assertEqual({result["content_hash"] for result in self.store.query()}, {hash_file(file_path)})
+
+    def test_cli(self):
+        """Test the query command line."""
+        self.store.record(Path("/w/a.py"), "p", "timeout", None, None, 100.0, 110.0)
+        with mock.patch("builtins.print") as printed:
+            result_store.main([self.db_path, "--status", "timeout", "--json"])
+        results = json.loads(printed.call_args[0][0])
+        self.assertEqual(results[0]["path"], "/w/a.py")
+
+        # --file is a path prefix, relative to the current directory
+        watched = Path(self.temp_dir).resolve() / "102325-10-07-50-AM.txt"
+        self.store.record(watched, "p", "success", "out", 0, 200.0, 201.0)
+        previous_cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+        try:
+            with mock.patch("builtins.print") as printed:
+                result_store.main([self.db_path, "--file", "1023", "--json"])
+        finally:
+            os.chdir(previous_cwd)
+        self.assertEqual([result["path"] for result in json.loads(printed.call_args[0][0])], [str(watched)])
+
+
+class TestWorkJournal(unittest.TestCase):
+    """Test durable work journal."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = str(Path(self.temp_dir) / "journal.db")
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_enqueue_claim_ack(self):
+        """Test the pending -> claimed -> acknowledged lifecycle."""
+        journal = WorkJournal(self.db_path)
+        file_path = Path(self.temp_dir) / "a.txt"
+
+        self.assertTrue(journal.enqueue(file_path))
+        self.assertFalse(journal.enqueue(file_path))  # Already pending
+
+        job_id, stage = journal.claim(file_path)
+        self.assertEqual(stage, WorkJournal.PENDING)
+        journal.ack(job_id)
+        self.assertEqual(journal.pending_count(), 0)
+        self.assertIsNone(journal.claim(file_path))
+        journal.close()
+
+    def test_recover_after_restart(self):
+        """Test that claimed and renamed jobs survive a restart."""
+        journal = WorkJournal(self.db_path)
+        in_flight = Path(self.temp_dir) / "a.txt"
+        renamed_source = Path(self.temp_dir) / "b.txt"
+        renamed_target = Path(self.temp_dir) / "102325-10-00-00-AM-latest.txt"
+        queued = Path(self.temp_dir) / "c.txt"
+
+        for file_path in (in_flight, renamed_source, queued):
+            journal.enqueue(file_path)
+        journal.claim(in_flight)
+        journal.claim(renamed_source)
+        journal.note_renamed(renamed_source, renamed_target)
+        journal.close()
+
+        reopened = WorkJournal(self.db_path)
+        self.assertEqual(reopened.recover(), [in_flight, renamed_target, queued])
+        self.assertEqual(reopened.claim(in_flight)[1], WorkJournal.PENDING)
+        self.assertEqual(reopened.claim(renamed_target)[1], WorkJournal.RENAMED)
+        reopened.close()
+
+    def test_resumed_file_is_not_renamed_again(self):
+        """Test that a file renamed before a crash only gets analyzed."""
+        journal = WorkJournal(self.db_path)
+        renamed = Path(self.temp_dir) / "102325-10-00-00-AM-latest.txt"
+        renamed.write_text("content")
+        journal.enqueue(Path(self.temp_dir) / "original.txt")
+        journal.claim(Path(self.temp_dir) / "original.txt")
+        journal.note_renamed(Path(self.temp_dir) / "original.txt", renamed)
+
+        runner = FakeClaudeRunner()
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=FileHandler(watch_dir=self.temp_dir),
+            file_extensions=[],
+            journal=journal
+        )
+        self.assertEqual(handler.resume_journal(), 1)
+        handler.file_queue.join()
+        handler.shutdown()
+
+        self.assertEqual(runner.calls, [renamed])
+        self.assertTrue(renamed.exists())
+        self.assertEqual(journal.pending_count(), 0)
+        journal.close()
+
+    def test_resumed_file_coalesces_live_events(self):
+        """Test that a live event for a resumed file does not queue it again."""
+        journal = WorkJournal(self.db_path)
+        report = Path(self.temp_dir) / "report.txt"
+        report.write_text("content")
+        journal.enqueue(report)
+        journal.claim(report)
+
+        runner = FakeClaudeRunner()
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=FileHandler(watch_dir=self.temp_dir),
+            file_extensions=[],
+            journal=journal
+        )
+        self.assertEqual(handler.resume_journal(), 1)
+        self.assertFalse(handler.enqueue_file(report))
+        handler.file_queue.join()
+        handler.shutdown()
+
+        self.assertEqual(len(runner.calls), 1)
+        self.assertEqual(journal.pending_count(), 0)
+        journal.close()
+
+class TestMetrics(unittest.TestCase):
+    """Test metrics registry and exporters."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_prometheus_rendering(self):
+        """Test counters, gauges and histograms in Prometheus text format."""
+        registry = MetricsRegistry()
+        registry.counter("claude_invocations_total", "Invocations", labels={"outcome": "success"}).inc(2)
+        registry.gauge("file_queue_depth", "Depth", callback=lambda: 3)
+        registry.histogram("stage_duration_seconds", "Stages", labels={"stage": "rename"}).observe(0.02)
+
+        text = registry.render_prometheus()
+        self.assertIn('claude_invocations_total{outcome="success"} 2.0', text)
+        self.assertIn("file_queue_depth 3.0", text)
+        self.assertIn('stage_duration_seconds_bucket{stage="rename",le="0.025"} 1', text)
+        self.assertIn('stage_duration_seconds_bucket{stage="rename",le="0.01"} 0', text)
+        self.assertIn('stage_duration_seconds_count{stage="rename"} 1', text)
+
+    def test_http_endpoint_and_snapshot(self):
+        """Test the /metrics endpoint and JSON snapshot file."""
+        registry = MetricsRegistry()
+        registry.counter("files_processed_total", labels={"outcome": "analyzed"}).inc()
+
+        server = MetricsServer(registry, port=0)
+        server.start()
+        self.addCleanup(server.stop)
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+            body = response.read().decode("utf-8")
+        self.assertIn('files_processed_total{outcome="analyzed"} 1.0', body)
+
+        snapshot_path = Path(self.temp_dir) / "metrics.json"
+        SnapshotWriter(registry, str(snapshot_path)).write()
+        snapshot = json.loads(snapshot_path.read_text())
+        self.assertEqual(snapshot["files_processed_total"][0]["value"], 1.0)
+
+    def test_startup_timer(self):
+        """Test startup phase accounting and export."""
+        timer = StartupTimer()
+        timer.add_phase("imports", 0.5)
+        time.sleep(0.01)
+        timer.mark("config")
+        timer.mark("observer started")
+
+        self.assertEqual([phase for phase, _ in timer.phases], ["imports", "config", "observer started"])
+        self.assertGreaterEqual(timer.until("config"), 0.51)
+        self.assertAlmostEqual(timer.elapsed(), sum(seconds for _, seconds in timer.phases))
+        self.assertIn("total", timer.report())
+
+        registry = MetricsRegistry()
+        timer.record(registry)
+        self.assertIn('startup_phase_seconds{phase="imports"} 0.5', registry.render_prometheus())
+
+    def test_event_handler_records_stage_latencies(self):
+        """Test that processing a file records stage timings and outcomes."""
+        registry = MetricsRegistry()
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=FakeClaudeRunner(),
+            file_handler=FileHandler(watch_dir=self.temp_dir, stability_check_interval=0.01),
+            file_extensions=[],
+            metrics=registry
+        )
+        self.addCleanup(handler.shutdown)
+
+        file_path = Path(self.temp_dir) / "a.txt"
+        file_path.write_text("content")
+        handler.file_queue.put(file_path)
+        handler.file_queue.join()
+
+        snapshot = registry.snapshot()
+        stages = {entry["labels"]["stage"]: entry["count"] for entry in snapshot["stage_duration_seconds"]}
+        self.assertEqual(stages, {"stability": 1, "rename": 1, "claude": 1})
+        self.assertEqual(snapshot["files_processed_total"][0]["value"], 1.0)
+        self.assertEqual(snapshot["file_queue_depth"][0]["value"], 0.0)
+
+
+class TestScheduler(unittest.TestCase):
+    """Test the priority work queue and rate limiter."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_classifier_rules(self):
+        """Test priority by extension, size and path pattern."""
+        small = Path(self.temp_dir) / "small.py"
+        small.write_text("x")
+        large = Path(self.temp_dir) / "large.py"
+        large.write_text("x" * 200)
+        classifier = PriorityClassifier([
+            PriorityRule(priority=1, extensions=["py"], max_size=100),
+            PriorityRule(priority=5, pattern="*/logs/*"),
+            PriorityRule(priority=7, pattern="*.md"),
+        ], default_priority=10)
+
+        self.assertEqual(classifier.classify(small), 1)
+        self.assertEqual(classifier.classify(large), 10)
+        self.assertEqual(classifier.classify(Path("/w/logs/a.txt")), 5)
+        self.assertEqual(classifier.classify(Path("/w/readme.md")), 7)
+
+    def test_queue_orders_by_priority(self):
+        """Test priority order, FIFO within a priority and shutdown signal first."""
+        priorities = {"low1": 5, "high": 1, "low2": 5}
+        work_queue = PriorityWorkQueue(lambda p: priorities[p.name], aging_seconds=0)
+        for name in ("low1", "high", "low2"):
+            work_queue.put(Path(name))
+        work_queue.put(None)
+
+        self.assertIsNone(work_queue.get())
+        self.assertEqual([work_queue.get().name for _ in range(3)], ["high", "low1", "low2"])
+
+    def test_queue_aging(self):
+        """Test that a long-waiting low-priority file overtakes new urgent ones."""
+        priorities = {"old": 5, "new": 1}
+        work_queue = PriorityWorkQueue(lambda p: priorities[p.name], aging_seconds=10)
+        with mock.patch("scheduler.time.monotonic", return_value=1000.0):
+            work_queue.put(Path("old"))
+        with mock.patch("scheduler.time.monotonic", return_value=1050.0):
+            work_queue.put(Path("new"))
+        self.assertEqual(work_queue.get().name, "old")
+
+    def test_rate_limiter_spaces_calls(self):
+        """Test that calls beyond the burst wait for the token bucket."""
+        limiter = RateLimiter(calls_per_minute=600, burst=2)  # one token per 0.1s
+        start = time.monotonic()
+        for _ in range(4):
+            with limiter.acquire():
+                pass
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_rate_limiter_concurrency(self):
+        """Test that max_concurrent caps overlapping calls."""
+        limiter = RateLimiter(max_concurrent=2)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def call():
+            with limiter.acquire():
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.05)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak[0], 2)
+
+
+class TestFailurePolicy(unittest.TestCase):
+    """Test retries, the circuit breaker and the latency watchdog."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_file = Path(self.temp_dir) / "test.txt"
+        self.test_file.write_text("content")
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_retry_backoff(self):
+        """Test exponential backoff with jitter and the retry limit."""
+        policy = RetryPolicy(max_retries=3, backoff=1.0, backoff_max=3.0, jitter=0.0)
+        self.assertEqual([policy.delay(attempt) for attempt in (1, 2, 3, 4)], [1.0, 2.0, 3.0, 3.0])
+        self.assertTrue(policy.should_retry(3))
+        self.assertFalse(policy.should_retry(4))
+
+        jittered = RetryPolicy(backoff=10.0, jitter=0.5)
+        for _ in range(20):
+            self.assertTrue(5.0 <= jittered.delay(1) <= 10.0)
+
+    def test_circuit_breaker(self):
+        """Test that the circuit opens, lets one trial through and closes again."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+        breaker.record_failure()
+        self.assertTrue(breaker.before_call(timeout=0))
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.before_call(timeout=0.05))
+
+        self.assertTrue(breaker.before_call(timeout=1.0))
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.before_call(timeout=0.05))  # Only one trial call
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        self.assertTrue(breaker.before_call(timeout=1.0))
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.before_call(timeout=0))
+
+    def test_latency_budget(self):
+        """Test that the budget follows recent durations within its bounds."""
+        budget = LatencyBudget(multiplier=3.0, minimum=1.0, min_samples=5)
+        self.assertEqual(budget.limit(300.0), 300.0)
+        for _ in range(5):
+            budget.observe(2.0)
+        self.assertEqual(budget.limit(300.0), 6.0)
+        self.assertEqual(budget.limit(4.0), 4.0)
+        for _ in range(5):
+            budget.observe(0.01)
+        self.assertEqual(budget.limit(300.0), 6.0)
+
+    @unittest.skipIf(os.name == "nt", "fake claude executable requires a POSIX shell")
+    def test_stuck_process_group_is_killed(self):
+        """Test that a call over its budget is killed with its children."""
+        budget = LatencyBudget(multiplier=2.0, minimum=0.2, min_samples=1)
+        budget.observe(0.1)
+        runner = ClaudeCodeRunner("Analyze:", timeout=30, latency_budget=budget, console_output=False)
+        # The child keeps stdout open, so only killing the whole group returns early
+        with install_fake_claude(self.temp_dir, "sleep 30 &\nwait\n"), \
+                mock.patch("sys.stdout", new_callable=io.StringIO):
+            start = time.time()
+            output = runner.run_claude_code(self.test_file)
+
+        self.assertIsNone(output)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(runner.metrics.counter("claude_invocations_total", labels={"outcome": "timeout"}).value, 1)
+
+    @unittest.skipIf(os.name == "nt", "fake claude executable requires a POSIX shell")
+    def test_close_kills_running_processes(self):
+        """Test that closing the runner kills claude processes still running."""
+        runner = ClaudeCodeRunner("Analyze:", timeout=30, console_output=False)
+        outputs = []
+        with install_fake_claude(self.temp_dir, "sleep 30 &\nwait\n"), \
+                mock.patch("sys.stdout", new_callable=io.StringIO):
+            worker = threading.Thread(target=lambda: outputs.append(runner.run_claude_code(self.test_file)))
+            worker.start()
+            deadline = time.time() + 5
+            while not runner._processes and time.time() < deadline:
+                time.sleep(0.05)
+            runner.close()
+            worker.join(timeout=5)
+
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(outputs, [None])
+        self.assertEqual(runner._processes, set())
+
+
+class TestPollingObserver(unittest.TestCase):
+    """Test the scandir polling observer for network mounts."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.event_queue = EventQueue()
+        self.emitter = ScandirPollingEmitter(
+            self.event_queue, ObservedWatch(self.temp_dir, recursive=True), timeout=0.1, max_interval=1.0
+        )
+        self.emitter.on_thread_start()
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def poll_events(self):
+        """Poll once and return (event type, paths) of the queued events."""
+        self.emitter.poll()
+        events = []
+        while not self.event_queue.empty():
+            event, _ = self.event_queue.get()
+            paths = [os.path.relpath(path, self.temp_dir) for path in (event.src_path, event.dest_path) if path]
+            events.append((type(event).__name__, *paths))
+        return events
+
+    def test_filesystem_type(self):
+        """Test mount table lookup and network file system detection."""
+        mounts = Path(self.temp_dir) / "mounts"
+        mounts.write_text(
+            "/dev/sda1 / ext4 rw 0 0\n"
+            "server:/export /mnt/share nfs4 rw 0 0\n"
+            "//host/docs /mnt/my\\040docs cifs rw 0 0\n"
+        )
+        self.assertEqual(filesystem_type("/mnt/share/a/b", str(mounts)), "nfs4")
+        self.assertEqual(filesystem_type("/mnt/sharex", str(mounts)), "ext4")
+        self.assertTrue(is_network_filesystem("/mnt/my docs/report.py", str(mounts)))
+        self.assertFalse(is_network_filesystem("/home", str(mounts)))
+        self.assertIsNone(filesystem_type("/", str(Path(self.temp_dir) / "missing")))
+
+    def test_file_events(self):
+        """Test that creations, renames and deletions are reported."""
+        (Path(self.temp_dir) / "a.tmp").write_text("a")
+        self.assertEqual(self.poll_events(), [("FileCreatedEvent", "a.tmp")])
+        self.assertEqual(self.poll_events(), [])
+
+        os.rename(Path(self.temp_dir) / "a.tmp", Path(self.temp_dir) / "a.py")
+        self.assertEqual(self.poll_events(), [("FileMovedEvent", "a.tmp", "a.py")])
+
+        os.remove(Path(self.temp_dir) / "a.py")
+        self.assertEqual(self.poll_events(), [("FileDeletedEvent", "a.py")])
+
+    def test_directory_events(self):
+        """Test that moving a directory reports the files inside it."""
+        (Path(self.temp_dir) / "sub").mkdir()
+        (Path(self.temp_dir) / "sub" / "b.py").write_text("b")
+        self.assertEqual(
+            sorted(self.poll_events()),
+            [("DirCreatedEvent", "sub"), ("FileCreatedEvent", os.path.join("sub", "b.py"))]
+        )
+
+        os.rename(Path(self.temp_dir) / "sub", Path(self.temp_dir) / "moved")
+        self.assertEqual(self.poll_events(), [
+            ("DirMovedEvent", "sub", "moved"),
+            ("FileMovedEvent", os.path.join("sub", "b.py"), os.path.join("moved", "b.py"))
+        ])
+
+        (Path(self.temp_dir) / "moved" / "c.py").write_text("c")
+        self.assertEqual(self.poll_events(), [("FileCreatedEvent", os.path.join("moved", "c.py"))])
+
+        shutil.rmtree(Path(self.temp_dir) / "moved")
+        self.assertEqual(sorted(self.poll_events()), [
+            ("DirDeletedEvent", "moved"),
+            ("FileDeletedEvent", os.path.join("moved", "b.py")),
+            ("FileDeletedEvent", os.path.join("moved", "c.py"))
+        ])
+
+    def test_unchanged_directories_are_not_reread(self):
+        """Test that only directories with a new mtime are scanned again."""
+        (Path(self.temp_dir) / "sub").mkdir()
+        self.poll_events()
+        for directory in (self.temp_dir, os.path.join(self.temp_dir, "sub")):
+            os.utime(directory, (time.time() - 60, time.time() - 60))
+        self.emitter.full_scan_every = 0
+        self.poll_events()  # Snapshot taken after the mtimes settled
+
+        with mock.patch.object(ScandirPollingEmitter, "_read_directory",
+                               wraps=ScandirPollingEmitter._read_directory) as read_directory:
+            self.assertEqual(self.poll_events(), [])
+            read_directory.assert_not_called()
+
+            (Path(self.temp_dir) / "sub" / "d.py").write_text("d")
+            self.assertEqual(self.poll_events(), [("FileCreatedEvent", os.path.join("sub", "d.py"))])
+            read_directory.assert_called_once_with(os.path.join(self.temp_dir, "sub"))
+
+    def test_adaptive_interval(self):
+        """Test that the poll interval grows while idle and resets on changes."""
+        with mock.patch.object(self.emitter.stopped_event, "wait", return_value=False) as wait:
+            with mock.patch.object(self.emitter, "poll", return_value=False):
+                for _ in range(10):
+                    self.emitter.queue_events(0)
+            self.assertAlmostEqual(wait.call_args_list[1].args[0], 0.15)
+            self.assertEqual(self.emitter.interval, 1.0)
+
+            with mock.patch.object(self.emitter, "poll", return_value=True):
+                self.emitter.queue_events(0)
+            self.assertEqual(self.emitter.interval, 0.1)
+
+    def test_ignored_directories_are_not_polled(self):
+        """Test that ignored directories (e.g. the archive) are not scanned."""
+        archive = Path(self.temp_dir) / ".archive"
+        emitter = ScandirPollingEmitter(
+            self.event_queue, ObservedWatch(self.temp_dir, recursive=True), timeout=0.1, ignore_dirs=(str(archive),)
+        )
+        emitter.on_thread_start()
+        archive.mkdir()
+        (archive / "a.txt").write_text("a")
+        emitter.poll()
+        self.assertNotIn(str(archive), emitter._dirs)
+        event, _ = self.event_queue.get()
+        self.assertEqual(event.src_path, str(archive))
+        self.assertTrue(self.event_queue.empty())
+
+    def test_base_emitter_without_event_filter(self):
+        """Test that the emitter works with watchdog 3.x, whose emitters take no event_filter."""
+        base_init = EventEmitter.__init__
+
+        def watchdog3_init(emitter, event_queue, watch, timeout=1.0):
+            base_init(emitter, event_queue, watch, timeout=timeout)
+
+        with mock.patch.object(EventEmitter, "__init__", watchdog3_init):
+            emitter = ScandirPollingEmitter(self.event_queue, ObservedWatch(self.temp_dir, recursive=True), timeout=0.1)
+        self.assertEqual(emitter.min_interval, 0.1)
+
+    def test_watched_directory_removed(self):
+        """Test that removing the watched directory stops the emitter."""
+        shutil.rmtree(self.temp_dir)
+        self.assertEqual(self.poll_events(), [("DirDeletedEvent", ".")])
+        self.assertTrue(self.emitter.stopped_event.is_set())
+
+
+class TestEventHandler(unittest.TestCase):
+    """Test event handler worker pool."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_handler = FileHandler(
+            watch_dir=self.temp_dir,
+            stability_timeout=1.0,
+            stability_check_interval=0.01
+        )
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _make_handler(self, runner, max_workers):
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=self.file_handler,
+            file_extensions=[],
+            max_workers=max_workers
+        )
+        self.addCleanup(handler.shutdown)
+        return handler
+
+    def test_parallel_workers(self):
+        """Test that claude invocations run concurrently across workers."""
+        runner = FakeClaudeRunner(delay=0.3)
+        handler = self._make_handler(runner, max_workers=4)
+        self.assertEqual(len(handler.worker_threads), 4)
+
+        for i in range(4):
+            file_path = Path(self.temp_dir) / f"file{i}.txt"
+            file_path.write_text(f"content {i}")
+            handler.file_queue.put(file_path)
+
+        handler.file_queue.join()
+        self.assertEqual(len(runner.calls), 4)
+        self.assertGreater(runner.max_active, 1)
+
+    def test_burst_is_batched(self):
+        """Test that files arriving within the window share one claude call."""
+        runner = FakeClaudeRunner()
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=self.file_handler,
+            file_extensions=[],
+            batch_window=0.5,
+            batch_max_files=3
+        )
+        self.addCleanup(handler.shutdown)
+
+        for i in range(4):
+            file_path = Path(self.temp_dir) / f"file{i}.txt"
+            file_path.write_text(f"content {i}")
+            handler.file_queue.put(file_path)
+
+        handler.file_queue.join()
+        self.assertEqual(len(runner.batches), 1)
+        self.assertEqual(len(runner.batches[0]), 3)
+        self.assertEqual(len(runner.calls), 1)
+
+    def test_slow_writer_does_not_block_complete_files(self):
+        """Test that a file still being written does not hold up the pipeline."""
+        runner = FakeClaudeRunner()
+        file_handler = FileHandler(
+            watch_dir=self.temp_dir,
+            stability_timeout=5.0,
+            stability_check_interval=0.2
+        )
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=file_handler,
+            file_extensions=[]
+        )
+        self.addCleanup(handler.shutdown)
+
+        slow_path = Path(self.temp_dir) / "slow.txt"
+        stop_writing = threading.Event()
+
+        def slow_writer():
+            with open(slow_path, "w") as f:
+                while not stop_writing.is_set():
+                    f.write("x")
+                    f.flush()
+                    time.sleep(0.05)
+
+        writer = threading.Thread(target=slow_writer)
+        writer.start()
+        self.addCleanup(writer.join)
+        self.addCleanup(stop_writing.set)
+        time.sleep(0.1)
+        handler.file_queue.put(slow_path)
+
+        fast_path = Path(self.temp_dir) / "fast.txt"
+        fast_path.write_text("complete")
+        handler.file_queue.put(fast_path)
+
+        deadline = time.time() + 3
+        while not runner.calls and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(len(runner.calls), 1)
+        self.assertTrue(writer.is_alive())
+
+        stop_writing.set()
+        handler.file_queue.join()
+        self.assertEqual(len(runner.calls), 2)
+
+    def test_analysis_follows_later_renames(self):
+        """Test that queued files are analyzed under their current name."""
+        seen = []
+
+        class CheckingRunner(FakeClaudeRunner):
+            def run_claude_code(self, file_path):
+                seen.append(file_path.exists())
+                return super().run_claude_code(file_path)
+
+        runner = CheckingRunner(delay=0.1)
+        handler = self._make_handler(runner, max_workers=1)
+        for i in range(4):
+            file_path = Path(self.temp_dir) / f"file{i}.txt"
+            file_path.write_text(f"content {i}")
+            handler.file_queue.put(file_path)
+
+        handler.file_queue.join()
+        self.assertEqual(seen, [True] * 4)
+
+    def test_latest_file_keeps_its_name_while_analyzed(self):
+        """Test that a newer file does not rename a file claude is still reading."""
+        readable = []
+
+        class CheckingRunner(FakeClaudeRunner):
+            def run_claude_code(self, file_path):
+                output = super().run_claude_code(file_path)
+                readable.append(file_path.exists())
+                return output
+
+        runner = CheckingRunner(delay=0.3)
+        handler = self._make_handler(runner, max_workers=2)
+        for i in range(2):
+            file_path = Path(self.temp_dir) / f"file{i}.txt"
+            file_path.write_text(f"content {i}")
+            handler.file_queue.put(file_path)
+            time.sleep(0.1)
+
+        handler.file_queue.join()
+        self.assertEqual(readable, [True, True])
+        self.assertTrue(all("-latest" in path.stem for path in runner.calls))
+        latest = [path for path in Path(self.temp_dir).iterdir() if "-latest" in path.stem]
+        self.assertEqual(latest, [self.file_handler.find_latest_file()])
+        self.assertEqual(latest[0].read_text(), "content 1")
+
+    def test_watch_roots_share_the_pipeline(self):
+        """Test that files are routed to the runner and settings of their root."""
+        other_dir = Path(self.temp_dir) / "nested"
+        other_dir.mkdir()
+        runner, other_runner = FakeClaudeRunner(), FakeClaudeRunner()
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=self.file_handler,
+            file_extensions=[".txt"]
+        )
+        self.addCleanup(handler.shutdown)
+        other_handler = FileHandler(
+            watch_dir=str(other_dir),
+            timestamp_format="mmddyy-HHMMSS-AMPM",
+            stability_check_interval=0.01
+        )
+        handler.add_root(WatchRoot(other_dir, other_runner, other_handler, [".md"]))
+
+        self.assertTrue(handler.should_process_file(Path(self.temp_dir) / "a.txt"))
+        self.assertFalse(handler.should_process_file(other_dir / "a.txt"))
+        self.assertTrue(handler.should_process_file(other_dir / "a.md"))
+
+        first = Path(self.temp_dir) / "a.txt"
+        second = other_dir / "b.md"
+        first.write_text("first")
+        second.write_text("second")
+        handler.enqueue_file(first)
+        handler.enqueue_file(second)
+        handler.file_queue.join()
+
+        self.assertEqual([p.parent for p in runner.calls], [Path(self.temp_dir)])
+        self.assertEqual([p.parent for p in other_runner.calls], [other_dir])
+        self.assertRegex(other_runner.calls[0].name, r"^\d{6}-\d{6}-(AM|PM)-latest\.md$")
+
+    def test_failed_files_are_retried(self):
+        """Test that files claude fails on are requeued with backoff."""
+
+        class FlakyRunner(FakeClaudeRunner):
+            def run_claude_code(self, file_path):
+                super().run_claude_code(file_path)
+                return None if len(self.calls) < 3 else "fake output"
+
+        runner = FlakyRunner()
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=self.file_handler,
+            file_extensions=[],
+            retry_policy=RetryPolicy(max_retries=2, backoff=0.05, jitter=0.0)
+        )
+        self.addCleanup(handler.shutdown)
+
+        file_path = Path(self.temp_dir) / "report.txt"
+        file_path.write_text("content")
+        handler.file_queue.put(file_path)
+        handler.file_queue.join()
+
+        self.assertEqual(len(runner.calls), 3)
+        self.assertEqual(len(set(runner.calls)), 1)
+        self.assertEqual(handler.metrics.counter("claude_retries_total").value, 2)
+        analyzed = handler.metrics.counter("files_processed_total", labels={"outcome": "analyzed"})
+        self.assertEqual(analyzed.value, 1)
+
+    def test_circuit_breaker_pauses_dispatch(self):
+        """Test that consecutive failures stop claude calls until the reset timeout."""
+
+        class FailingRunner(FakeClaudeRunner):
+            def run_claude_code(self, file_path):
+                super().run_claude_code(file_path)
+                return None
+
+        runner = FailingRunner()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=self.file_handler,
+            file_extensions=[],
+            circuit_breaker=breaker
+        )
+        self.addCleanup(handler.shutdown)
+
+        for i in range(4):
+            file_path = Path(self.temp_dir) / f"file{i}.txt"
+            file_path.write_text(f"content {i}")
+            handler.file_queue.put(file_path)
+
+        deadline = time.time() + 3
+        while breaker.state != CircuitBreaker.OPEN and time.time() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.3)
+        self.assertEqual(len(runner.calls), 2)
+        self.assertGreater(handler.pending_count(), 0)
+
+    def test_half_open_circuit_admits_one_call_per_trial(self):
+        """Test that each claude call of a multi-root batch waits for its own circuit trial."""
+        call_times = []
+
+        class FailingRunner(FakeClaudeRunner):
+            def run_claude_code(self, file_path):
+                call_times.append(time.monotonic())
+                return None
+
+        other_dir = Path(self.temp_dir) / "nested"
+        other_dir.mkdir()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.5)
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=FailingRunner(),
+            file_handler=self.file_handler,
+            file_extensions=[],
+            batch_window=0.3,
+            circuit_breaker=breaker
+        )
+        self.addCleanup(handler.shutdown)
+        other_handler = FileHandler(watch_dir=str(other_dir), stability_check_interval=0.01)
+        handler.add_root(WatchRoot(other_dir, FailingRunner(), other_handler, []))
+        breaker.record_failure()  # Open: the next call is a half-open trial
+
+        for file_path in (Path(self.temp_dir) / "a.txt", other_dir / "b.txt"):
+            file_path.write_text("content")
+            handler.enqueue_file(file_path)
+        handler.file_queue.join()
+
+        self.assertEqual(len(call_times), 2)
+        self.assertGreaterEqual(call_times[1] - call_times[0], 0.4)  # The failed trial reopened the circuit
+
+    def test_raising_trial_call_reopens_the_circuit(self):
+        """Test that a claude call raising during a half-open trial does not stall the workers."""
+
+        class RaisingRunner(FakeClaudeRunner):
+            def run_claude_code(self, file_path):
+                super().run_claude_code(file_path)
+                if len(self.calls) == 1:
+                    return None
+                if len(self.calls) == 2:
+                    raise RuntimeError("claude crashed")
+                return "fake output"
+
+        runner = RaisingRunner()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=self.file_handler,
+            file_extensions=[],
+            circuit_breaker=breaker
+        )
+        self.addCleanup(handler.shutdown)
+
+        for i in range(3):
+            file_path = Path(self.temp_dir) / f"file{i}.txt"
+            file_path.write_text(f"content {i}")
+            handler.enqueue_file(file_path)
+            time.sleep(0.05)
+
+        deadline = time.time() + 3
+        while len(runner.calls) < 3 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(len(runner.calls), 3)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def _make_slow_polling_handler(self, runner):
+        file_handler = FileHandler(
+            watch_dir=self.temp_dir,
+            stability_timeout=5.0,
+            stability_check_interval=1.0,
+            stability_mode="poll"
+        )
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=file_handler,
+            file_extensions=[".txt"],
+            file_filter=FileFilter(extensions=[".txt"], temp_file_patterns=["*.part", ".~*"])
+        )
+        self.addCleanup(handler.shutdown)
+        return handler
+
+    def test_atomic_rename_skips_stability_wait(self):
+        """Test that a temp file renamed to its final name is processed at once."""
+        runner = FakeClaudeRunner()
+        handler = self._make_slow_polling_handler(runner)
+
+        temp_path = Path(self.temp_dir) / "report.txt.part"
+        temp_path.write_text("partial")
+        handler.on_created(FileCreatedEvent(str(temp_path)))
+        self.assertEqual(handler.pending_count(), 0)
+
+        final_path = Path(self.temp_dir) / "report.txt"
+        temp_path.rename(final_path)
+        start = time.time()
+        handler.on_moved(FileMovedEvent(str(temp_path), str(final_path)))
+        handler.file_queue.join()
+
+        self.assertLess(time.time() - start, 0.9)
+        self.assertEqual(len(runner.calls), 1)
+        self.assertIn("-latest", runner.calls[0].stem)
+
+    def test_moved_in_file_is_processed(self):
+        """Test that a file moved in from outside the watched tree is processed."""
+        runner = FakeClaudeRunner()
+        handler = self._make_slow_polling_handler(runner)
+
+        final_path = Path(self.temp_dir) / "upload.txt"
+        final_path.write_text("complete")
+        start = time.time()
+        handler.on_moved(FileMovedEvent("", str(final_path)))
+        handler.file_queue.join()
+
+        self.assertLess(time.time() - start, 0.9)
+        self.assertEqual(len(runner.calls), 1)
+
+    def test_rename_during_stability_wait_is_processed(self):
+        """Test that a file renamed while waiting for stability is processed under its new name."""
+        runner = FakeClaudeRunner()
+        handler = self._make_slow_polling_handler(runner)
+
+        upload_path = Path(self.temp_dir) / "upload.txt"
+        upload_path.write_text("complete")
+        self.assertTrue(handler.enqueue_file(upload_path))
+        time.sleep(0.2)  # The stability worker is now polling upload.txt
+
+        final_path = Path(self.temp_dir) / "final.txt"
+        upload_path.rename(final_path)
+        handler.on_moved(FileMovedEvent(str(upload_path), str(final_path)))
+        handler.file_queue.join()
+
+        self.assertEqual(len(runner.calls), 1)
+        self.assertIn("-latest", runner.calls[0].stem)
+        self.assertFalse(final_path.exists())
+        self.assertEqual(handler._pending_inodes, set())
+
+    def test_own_renames_are_not_requeued(self):
+        """Test that renames to the timestamped form (our own) are not queued."""
+        runner = FakeClaudeRunner()
+        handler = self._make_slow_polling_handler(runner)
+
+        old_path = Path(self.temp_dir) / "102325-10-07-50-AM-latest.txt"
+        new_path = Path(self.temp_dir) / "102325-10-07-50-AM.txt"
+        old_path.write_text("done")
+        old_path.rename(new_path)
+        handler.on_moved(FileMovedEvent(str(old_path), str(new_path)))
+
+        self.assertEqual(handler.pending_count(), 0)
+        self.assertTrue(handler.is_temp_file(Path(".~lock.txt")))
+        self.assertFalse(handler.is_temp_file(new_path))
+
+    def test_atomic_writes_from_filtered_names_are_processed(self):
+        """Test that moves from hidden or non-watched names to accepted ones are queued."""
+        runner = FakeClaudeRunner()
+        handler = self._make_slow_polling_handler(runner)
+
+        for temp_name, final_name in ((".a.txt.Xy12", "a.txt"), ("b.download", "b.txt")):
+            temp_path = Path(self.temp_dir) / temp_name
+            final_path = Path(self.temp_dir) / final_name
+            temp_path.write_text("complete")
+            handler.on_created(FileCreatedEvent(str(temp_path)))
+            temp_path.rename(final_path)
+            handler.on_moved(FileMovedEvent(str(temp_path), str(final_path)))
+        handler.file_queue.join()
+
+        self.assertEqual(len(runner.calls), 2)
+
+    def test_filtered_events_are_not_queued(self):
+        """Test that filtered events never reach the queue and are counted."""
+        runner = FakeClaudeRunner()
+        metrics = MetricsRegistry()
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=self.file_handler,
+            file_extensions=[".txt"],
+            metrics=metrics,
+            file_filter=FileFilter(
+                extensions=[".txt"], exclude_patterns=["skip_*"], ignore_hidden=True, min_size=2, max_size=100
+            )
+        )
+        self.addCleanup(handler.shutdown)
+
+        names = {
+            ".hidden.txt": "x" * 10,
+            "skip_me.txt": "x" * 10,
+            "102325-10-07-50-AM-latest.txt": "x" * 10,
+            "huge.txt": "x" * 200,
+            "tiny.txt": "x",
+            "good.txt": "x" * 10,
+        }
+        for name, content in names.items():
+            file_path = Path(self.temp_dir) / name
+            file_path.write_text(content)
+            handler.on_created(FileCreatedEvent(str(file_path)))
+        handler.file_queue.join()
+
+        self.assertEqual(len(runner.calls), 1)
+        self.assertIn("-latest", runner.calls[0].stem)
+        self.assertTrue((Path(self.temp_dir) / "tiny.txt").exists())  # Skipped after the stability stage
+        for reason, count in (("hidden", 1), ("excluded", 1), ("renamed_output", 1), ("size", 2)):
+            self.assertEqual(metrics.counter("filtered_events_total", labels={"reason": reason}).value, count)
+
+    def test_rejected_files_leave_no_stability_registration(self):
+        """Test that files rejected when queued, or finished, are not remembered for stability."""
+        file_handler = FileHandler(watch_dir=self.temp_dir, stability_mode="close_write")
+        runner = FakeClaudeRunner()
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=file_handler,
+            file_extensions=[".txt"],
+            file_filter=FileFilter(extensions=[".txt"], max_size=5)
+        )
+        self.addCleanup(handler.shutdown)
+
+        big_path = Path(self.temp_dir) / "big.txt"
+        big_path.write_text("x" * 10)
+        handler.on_created(FileCreatedEvent(str(big_path)))  # Too large
+
+        file_path = Path(self.temp_dir) / "a.txt"
+        file_path.write_text("x")
+        link_path = Path(self.temp_dir) / "b.txt"
+        os.link(file_path, link_path)
+        handler.on_created(FileCreatedEvent(str(file_path)))
+        handler.on_created(FileCreatedEvent(str(link_path)))  # Same inode, already pending
+        file_handler.notify_closed(file_path)
+        handler.file_queue.join()
+
+        self.assertEqual(len(runner.calls), 1)
+        self.assertEqual(file_handler._close_events, {})
+        self.assertEqual(file_handler._complete_files, set())
+
+    def test_duplicate_events_are_coalesced(self):
+        """Test that repeated events for a pending file queue it only once."""
+        runner = FakeClaudeRunner()
+        metrics = MetricsRegistry()
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=self.file_handler,
+            file_extensions=[],
+            metrics=metrics
+        )
+        self.addCleanup(handler.shutdown)
+
+        file_path = Path(self.temp_dir) / "report.txt"
+        file_path.write_text("content")
+        link_path = Path(self.temp_dir) / "report-link.txt"
+        os.link(file_path, link_path)
+
+        self.assertTrue(handler.enqueue_file(file_path))
+        self.assertFalse(handler.enqueue_file(file_path))
+        self.assertFalse(handler.enqueue_file(link_path))
+        handler.file_queue.join()
+
+        # A late event for the original name finds the file already renamed
+        self.assertFalse(handler.enqueue_file(file_path))
+        self.assertEqual(len(runner.calls), 1)
+        pending = metrics.counter("duplicate_events_total", labels={"reason": "pending"})
+        gone = metrics.counter("duplicate_events_total", labels={"reason": "gone"})
+        self.assertEqual(pending.value, 2)
+        self.assertEqual(gone.value, 1)
+
+    def test_debounce_window(self):
+        """Test that a burst of create events is queued once after the window."""
+        runner = FakeClaudeRunner()
+        handler = TestAssistantEventHandler(
+            watch_dir=self.temp_dir,
+            claude_runner=runner,
+            file_handler=self.file_handler,
+            file_extensions=[],
+            debounce_window=0.2
+        )
+        self.addCleanup(handler.shutdown)
+
+        file_path = Path(self.temp_dir) / "report.txt"
+        file_path.write_text("content")
+        for _ in range(3):
+            handler.on_created(FileCreatedEvent(str(file_path)))
+            time.sleep(0.05)
+        self.assertEqual(handler.pending_count(), 0)
+
+        deadline = time.time() + 3
+        while not runner.calls and time.time() < deadline:
+            time.sleep(0.05)
+        handler.file_queue.join()
+        self.assertEqual(len(runner.calls), 1)
+        debounced = handler.metrics.counter("duplicate_events_total", labels={"reason": "debounced"})
+        self.assertEqual(debounced.value, 2)
+
+    def test_single_latest_after_parallel_processing(self):
+        """Test that only one file keeps the -latest suffix."""
+        runner = FakeClaudeRunner()
+        handler = self._make_handler(runner, max_workers=4)
+
+        for i in range(6):
+            file_path = Path(self.temp_dir) / f"file{i}.txt"
+            file_path.write_text(f"content {i}")
+            handler.file_queue.put(file_path)
+
+        handler.file_queue.join()
+        latest = [p for p in Path(self.temp_dir).iterdir() if "-latest" in p.stem]
+        self.assertEqual(len(latest), 1)
+
+
+class TestConsole(unittest.TestCase):
+    """Test background console output and quiet mode."""
+
+    def test_background_writer(self):
+        """Test that queued output is written in order once stopped."""
+        stream = io.StringIO()
+        console = Console(stream)
+        console.start()
+        for i in range(100):
+            console.print(f"line {i}")
+        console.stop()
+        self.assertEqual(stream.getvalue().splitlines(), [f"line {i}" for i in range(100)])
+
+    def test_quiet_mode(self):
+        """Test that quiet mode drops status lines but keeps claude output."""
+        stream = io.StringIO()
+        console = Console(stream)
+        console.configure(quiet=True)
+        console.print("🚀 banner")
+        console.output("CLAUDE OUTPUT:", "result", sep="\n")
+        self.assertEqual(stream.getvalue(), "CLAUDE OUTPUT:\nresult\n")
+
+
+class TestBacklogFeeder(unittest.TestCase):
+    """Test streaming the startup backlog into the queue."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.queued = []
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _feeder(self, **kwargs):
+        kwargs.setdefault("queue_depth", lambda: 0)
+        return BacklogFeeder(
+            root=Path(self.temp_dir),
+            enqueue=lambda path: self.queued.append(path) or True,
+            accept=lambda entry: "-latest" not in entry.name,
+            **kwargs
+        )
+
+    def test_feeds_accepted_files(self):
+        """Test that accepted files are queued and subdirectories follow recursive."""
+        (Path(self.temp_dir) / "a.txt").write_text("a")
+        (Path(self.temp_dir) / "old-latest.txt").write_text("old")
+        (Path(self.temp_dir) / "sub").mkdir()
+        (Path(self.temp_dir) / "sub" / "b.txt").write_text("b")
+
+        self.assertEqual(self._feeder().run(), 1)
+        self.assertEqual([p.name for p in self.queued], ["a.txt"])
+
+        self.queued.clear()
+        feeder = self._feeder(recursive=True)
+        self.assertEqual(feeder.run(), 2)
+        self.assertEqual(sorted(p.name for p in self.queued), ["a.txt", "b.txt"])
+        self.assertEqual(feeder.scanned, 3)
+
+    def test_waits_while_queue_is_full(self):
+        """Test that feeding pauses while max_pending files are queued."""
+        for i in range(3):
+            (Path(self.temp_dir) / f"file{i}.txt").write_text(str(i))
+
+        depth = {"value": 5}
+        feeder = self._feeder(queue_depth=lambda: depth["value"], max_pending=5)
+        feeder.start()
+        time.sleep(0.2)
+        self.assertEqual(self.queued, [])
+
+        depth["value"] = 0
+        feeder._thread.join(timeout=5)
+        self.assertEqual(len(self.queued), 3)
+
+    def test_stop_interrupts_wait(self):
+        """Test that stop() ends a feeder blocked on a full queue."""
+        (Path(self.temp_dir) / "a.txt").write_text("a")
+        feeder = self._feeder(queue_depth=lambda: 1, max_pending=1)
+        feeder.start()
+        feeder.stop()
+        self.assertFalse(feeder.is_running())
+        self.assertEqual(self.queued, [])
+
+    def test_on_complete_only_after_a_full_scan(self):
+        """Test that stopped scans and unreadable directories do not count as complete."""
+        (Path(self.temp_dir) / "a.txt").write_text("a")
+        completed = []
+        feeder = self._feeder(on_complete=lambda: completed.append(True))
+        feeder.run()
+        self.assertEqual(completed, [True])
+        self.assertTrue(feeder.completed)
+
+        feeder = self._feeder(queue_depth=lambda: 1, max_pending=1, on_complete=lambda: completed.append(True))
+        feeder.start()
+        feeder.stop()
+        self.assertFalse(feeder.completed)
+
+        feeder = BacklogFeeder(
+            root=Path(self.temp_dir) / "missing", enqueue=self.queued.append, accept=lambda entry: True,
+            queue_depth=lambda: 0, on_complete=lambda: completed.append(True)
+        )
+        feeder.run()
+        self.assertFalse(feeder.completed)
+        self.assertEqual(completed, [True])
+
+    def test_rejected_directories_are_not_scanned(self):
+        """Test that accept_dir prunes subdirectories from the scan."""
+        (Path(self.temp_dir) / ".git").mkdir()
+        (Path(self.temp_dir) / ".git" / "a.txt").write_text("a")
+        (Path(self.temp_dir) / "sub").mkdir()
+        (Path(self.temp_dir) / "sub" / "b.txt").write_text("b")
+
+        feeder = self._feeder(recursive=True, accept_dir=lambda entry: not entry.name.startswith("."))
+        self.assertEqual(feeder.run(), 1)
+        self.assertEqual([p.name for p in self.queued], ["b.txt"])
+        self.assertEqual(feeder.scanned, 1)
+
+
+class TestArchiver(unittest.TestCase):
+    """Test archiving of processed files."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = Path(self.temp_dir)
+        self.archive_dir = self.root / ".archive"
+        self.file_handler = FileHandler(watch_dir=self.temp_dir)
+        self.now = time.time()
+
+        # Renamed files modified 0 to 5 days ago, the -latest file and an unprocessed file
+        self.outputs = []
+        for days in range(6):
+            file_path = self.root / f"10{days}025-10-07-50-AM.txt"
+            file_path.write_text(f"day {days}")
+            os.utime(file_path, (self.now - days * 86400, self.now - days * 86400))
+            self.outputs.append(file_path)
+        (self.root / "102325-10-07-51-AM-latest.txt").write_text("latest")
+        (self.root / "notes.txt").write_text("not processed")
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _archiver(self, **kwargs):
+        kwargs.setdefault("keep_recent", 2)
+        kwargs.setdefault("min_age", 3600)
+        return Archiver(self.file_handler, self.archive_dir, **kwargs)
+
+    def _index(self):
+        with open(self.archive_dir / INDEX_NAME) as f:
+            return [json.loads(line) for line in f]
+
+    def test_directory_mode(self):
+        """Test that old renamed files move into dated directories."""
+        archiver = self._archiver()
+        self.assertEqual(archiver.run_once(), 4)
+
+        remaining = sorted(path.name for path in self.root.iterdir() if path.is_file())
+        self.assertEqual(remaining, [
+            "100025-10-07-50-AM.txt", "101025-10-07-50-AM.txt", "102325-10-07-51-AM-latest.txt", "notes.txt"
+        ])
+        oldest = self.outputs[5]
+        dated = datetime.fromtimestamp(self.now - 5 * 86400).strftime("%Y/%m/%d")
+        self.assertEqual((self.archive_dir / dated / oldest.name).read_text(), "day 5")
+
+        index = self._index()
+        self.assertEqual(len(index), 4)
+        self.assertIn({"path": str(oldest), "archive": str(Path(dated) / oldest.name)},
+                      [{"path": record["path"], "archive": record["archive"]} for record in index])
+        self.assertEqual(archiver.run_once(), 0)
+        self.assertEqual(archiver.hot_files, 2)
+
+    def test_zip_mode(self):
+        """Test that old renamed files are bundled per day and then removed."""
+        archiver = self._archiver(mode="zip")
+        self.assertEqual(archiver.run_once(), 4)
+
+        bundles = sorted(path.name for path in self.archive_dir.glob("*.zip"))
+        self.assertEqual(len(bundles), 4)
+        oldest = self.outputs[5]
+        bundle = self.archive_dir / f"{datetime.fromtimestamp(self.now - 5 * 86400):%Y-%m-%d}.zip"
+        with zipfile.ZipFile(bundle) as zf:
+            self.assertEqual(zf.read(oldest.name), b"day 5")
+        self.assertFalse(oldest.exists())
+        self.assertEqual({record["member"] for record in self._index()},
+                         {path.name for path in self.outputs[2:]})
+
+    def test_zip_mode_keeps_different_content_of_same_size(self):
+        """Test that a member counts as bundled only if its content matches."""
+        oldest = self.outputs[5]
+        bundle = self.archive_dir / f"{datetime.fromtimestamp(self.now - 5 * 86400):%Y-%m-%d}.zip"
+        self.archive_dir.mkdir()
+        with zipfile.ZipFile(bundle, "w") as zf:
+            zf.writestr(oldest.name, b"DAY 5")  # Same name and size, other content
+            zf.writestr(self.outputs[4].name, self.outputs[4].read_bytes())  # Bundled before an interruption
+
+        self.assertEqual(self._archiver(mode="zip").run_once(), 4)
+        with zipfile.ZipFile(bundle) as zf:
+            self.assertEqual(zf.read(oldest.name), b"DAY 5")
+            self.assertEqual(zf.read(f"{oldest.stem}-1{oldest.suffix}"), b"day 5")
+        bundle_4 = self.archive_dir / f"{datetime.fromtimestamp(self.now - 4 * 86400):%Y-%m-%d}.zip"
+        with zipfile.ZipFile(bundle_4) as zf:
+            self.assertEqual(len(zf.namelist()), 1)
+
+    def test_size_threshold_ignores_age(self):
+        """Test that exceeding max_hot_files archives all but the newest files."""
+        archiver = self._archiver(keep_recent=1, min_age=30 * 86400, max_hot_files=3)
+        self.assertEqual(archiver.run_once(), 5)
+        self.assertTrue(self.outputs[0].exists())
+
+        # New renames are counted and wake the archiver once over the threshold
+        for index in range(3):
+            new_file = self.root / f"new{index}.txt"
+            new_file.write_text("new")
+            self.file_handler.process_new_file(new_file)
+        self.assertEqual(archiver.hot_files, 4)
+        self.assertTrue(archiver._wake.is_set())
+
+    def test_busy_files_are_kept(self):
+        """Test that files still in the pipeline are not archived."""
+        busy = self.outputs[5]
+        archiver = self._archiver(is_busy=lambda file_path: file_path == busy)
+        self.assertEqual(archiver.run_once(), 3)
+        self.assertTrue(busy.exists())
+
+    def test_archive_path(self):
+        """Test where the archive of each watch root is placed."""
+        config = TestAssistantConfig(watch_path=self.temp_dir, claude_prompt="Test", archive_dir=".archive")
+        self.assertEqual(config.archive_path(config.watch_path), Path(config.watch_path) / ".archive")
+        self.assertIsNone(TestAssistantConfig(watch_path=self.temp_dir, claude_prompt="Test").archive_path("/x"))
+
+        # Roots with the same name get separate subdirectories of an absolute archive_dir
+        first, second = self.root / "a" / "logs", self.root / "b" / "logs"
+        first.mkdir(parents=True)
+        second.mkdir(parents=True)
+        config = TestAssistantConfig(
+            claude_prompt="Test", archive_dir=str(self.archive_dir),
+            watch_roots=[{"path": str(first)}, {"path": str(second)}]
+        )
+        first_archive, second_archive = config.archive_path(str(first)), config.archive_path(str(second))
+        self.assertNotEqual(first_archive, second_archive)
+        self.assertEqual(first_archive.parent, self.archive_dir.resolve())
+        self.assertTrue(first_archive.name.startswith("logs-"))
+        self.assertEqual(config.archive_path(str(first)), first_archive)
+        with self.assertRaises(ValueError):
+            TestAssistantConfig(
+                watch_path=self.temp_dir, claude_prompt="Test", archive_keep_recent=10, archive_max_hot_files=5
+            )
+
+
+class TestProcessedManifest(unittest.TestCase):
+    """Test the persistent manifest of processed files."""
+
+    def setUp(self):
+        """Setup test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.manifest_path = Path(self.temp_dir) / "manifest.bin"
+        self.watch_dir = Path(self.temp_dir) / "watch"
+        self.watch_dir.mkdir()
+
+    def tearDown(self):
+        """Cleanup test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _entry(self, name):
+        with os.scandir(self.watch_dir) as entries:
+            return next(entry for entry in entries if entry.name == name)
+
+    def test_survives_restart_and_renames(self):
+        """Test that a recorded file is recognized after reload and renaming."""
+        (self.watch_dir / "123456-notes.txt").write_text("user file")
+        (self.watch_dir / "done.txt").write_text("processed")
+
+        manifest = ProcessedManifest(str(self.manifest_path))
+        self.assertFalse(manifest.is_seeded)
+        manifest.note_renamed(self.watch_dir / "old.txt", self.watch_dir / "done.txt")
+        manifest.record(self.watch_dir / "done.txt")
+        manifest.close()
+
+        os.rename(self.watch_dir / "done.txt", self.watch_dir / "done-latest.txt")
+        manifest = ProcessedManifest(str(self.manifest_path))
+        self.assertEqual(len(manifest), 1)
+        self.assertTrue(manifest.contains(self._entry("done-latest.txt")))
+        self.assertFalse(manifest.contains(self._entry("123456-notes.txt")))
+        manifest.close()
+
+    def test_seeded_only_when_marked(self):
+        """Test that records alone do not make the manifest seeded."""
+        manifest = ProcessedManifest(str(self.manifest_path))
+        (self.watch_dir / "done.txt").write_text("processed")
+        manifest.record(self.watch_dir / "done.txt")
+        manifest.close()
+
+        manifest = ProcessedManifest(str(self.manifest_path))
+        self.assertFalse(manifest.is_seeded)
+        manifest.mark_seeded()
+        manifest.close()
+        manifest = ProcessedManifest(str(self.manifest_path))
+        self.assertTrue(manifest.is_seeded)
+        manifest.close()
+
+    def test_modified_file_is_not_processed(self):
+        """Test that changing a recorded file changes its key."""
+        file_path = self.watch_dir / "file.txt"
+        file_path.write_text("v1")
+        manifest = ProcessedManifest(str(self.manifest_path))
+        manifest.record(file_path)
+
+        file_path.write_text("version 2")
+        self.assertFalse(manifest.contains(self._entry("file.txt")))
+        manifest.close()
+
+    def test_torn_record_is_dropped(self):
+        """Test that a partial trailing record from a crash is discarded."""
+        self.manifest_path.write_bytes(RECORD.pack(1, 2, 3) + b"\x01\x02")
+        manifest = ProcessedManifest(str(self.manifest_path))
+        self.assertEqual(len(manifest), 1)
+        manifest.close()
+        self.assertEqual(self.manifest_path.stat().st_size, RECORD.size)
+
+
+class TestBenchmark(unittest.TestCase):
+    """Test the end-to-end benchmark harness."""
+
+    def test_percentile(self):
+        """Test percentile interpolation."""
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.assertEqual(benchmark.percentile(values, 50), 3.0)
+        self.assertEqual(benchmark.percentile(values, 100), 5.0)
+        self.assertAlmostEqual(benchmark.percentile(values, 95), 4.8)
+        self.assertEqual(benchmark.percentile([], 99), 0.0)
+
+    @unittest.skipIf(os.name == "nt", "fake claude executable requires a POSIX shell")
+    def test_small_run_completes(self):
+        """Test that a small steady run reports every file."""
+        args = benchmark.parse_args([
+            "--pattern", "steady", "--files", "3", "--rate", "20",
+            "--claude-latency", "0.01", "--timeout", "20"
+        ])
+        report = benchmark.run_benchmark(args)
+        self.assertEqual(report["completed"], 3)
+        self.assertGreater(report["files_per_second"], 0)
+        self.assertLessEqual(report["latency_p50"], report["latency_p99"])
+        self.assertIn("claude", report["mean_stage_seconds"])
+
+
 class TestIntegration(unittest.TestCase):
     """Integration tests."""
 
@@ -299,6 +2453,132 @@ class TestIntegration(unittest.TestCase):
         self.assertEqual(handler.timestamp_format, "mmddyy-HHMMSS-AMPM")
         self.assertEqual(handler.stability_timeout, 3.0)
 
+    def _make_service(self, **settings):
+        """Create a dry-run service watching temp_dir/watch; stopped and logging restored on cleanup."""
+        from main import TestAssistantService
+
+        watch_dir = Path(self.temp_dir) / "watch"
+        watch_dir.mkdir(exist_ok=True)
+        config_path = Path(self.temp_dir) / "config.yaml"
+        with open(config_path, 'w') as f:
+            yaml.dump({"watch_path": str(watch_dir), "claude_prompt": "Test", "dry_run": True, "quiet": True, **settings}, f)
+
+        root_logger = logging.getLogger()
+        previous_handlers, previous_level = root_logger.handlers[:], root_logger.level
+        previous_cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+
+        def restore():
+            os.chdir(previous_cwd)
+            for handler in root_logger.handlers:
+                if handler not in previous_handlers:
+                    handler.close()
+            root_logger.handlers = previous_handlers
+            root_logger.setLevel(previous_level)
+
+        self.addCleanup(restore)
+        with mock.patch("sys.stdout", new_callable=io.StringIO):
+            service = TestAssistantService(str(config_path))
+
+        def stop():
+            with mock.patch("sys.stdout", new_callable=io.StringIO):
+                service.stop()
+
+        self.addCleanup(stop)
+        return service, watch_dir
+
+    def test_startup_scan_skips_what_live_events_skip(self):
+        """Test that existing files are judged by the same renamed-name rule as new ones."""
+        service, watch_dir = self._make_service(file_extensions=[".txt"])
+        expected = {
+            "123456-notes.txt": True,
+            "notes-latest.txt": True,
+            "102325-10-07-50-AM.txt": False,
+            "102325-10-07-50-AM-latest.txt": False,
+        }
+        for name in expected:
+            (watch_dir / name).write_text("content")
+
+        with os.scandir(watch_dir) as entries:
+            accepted = {entry.name: service._accept_existing_entry(entry) for entry in entries}
+        self.assertEqual(accepted, expected)
+
+    def test_new_manifest_adopts_only_renamed_files(self):
+        """Test that the first run seeds the manifest with renamed files only."""
+        service, watch_dir = self._make_service(manifest_path=str(Path(self.temp_dir) / "manifest.bin"))
+        self.assertFalse(service.manifest.is_seeded)
+        for name in ("123456-notes.txt", "102325-10-07-50-AM.txt"):
+            (watch_dir / name).write_text("content")
+
+        with os.scandir(watch_dir) as entries:
+            for entry in entries:
+                queued = service._accept_existing_entry(entry)
+                self.assertEqual(queued, entry.name == "123456-notes.txt")
+                self.assertEqual(service.manifest.contains(entry), not queued)
+
+    def test_manifest_is_seeded_by_a_complete_scan_only(self):
+        """Test that renames recorded without a startup scan do not count as seeding."""
+        manifest_path = Path(self.temp_dir) / "manifest.bin"
+        service, watch_dir = self._make_service(manifest_path=str(manifest_path))
+        for name in ("102325-10-07-50-AM.txt", "102325-10-08-00-AM.txt"):
+            (watch_dir / name).write_text(name)
+        service.manifest.record(watch_dir / "102325-10-08-00-AM.txt")  # Renamed by a live run
+
+        with os.scandir(watch_dir) as entries:
+            self.assertEqual([service._accept_existing_entry(entry) for entry in entries], [False, False])
+        self.assertFalse(service.manifest.is_seeded)
+
+        with mock.patch("sys.stdout", new_callable=io.StringIO):
+            service._process_existing_files()
+        for backlog_feeder in service.backlog_feeders:
+            backlog_feeder._thread.join(timeout=5)
+        self.assertTrue(service.manifest.is_seeded)
+        self.assertTrue(Path(f"{manifest_path}.seeded").exists())
+        self.assertEqual(len(service.manifest), 2)
+
+    def test_service_logging_is_queued_and_rotated(self):
+        """Test that the service logs through a queue listener into a rotating file."""
+        from main import TestAssistantService
+
+        watch_dir = Path(self.temp_dir) / "watch"
+        watch_dir.mkdir()
+        config_path = Path(self.temp_dir) / "config.yaml"
+        with open(config_path, 'w') as f:
+            yaml.dump({
+                "watch_path": str(watch_dir),
+                "claude_prompt": "Test",
+                "dry_run": True,
+                "quiet": True,
+                "log_max_bytes": 2000,
+                "log_backup_count": 2
+            }, f)
+
+        root_logger = logging.getLogger()
+        previous_handlers, previous_level = root_logger.handlers[:], root_logger.level
+        previous_cwd = os.getcwd()
+        os.chdir(self.temp_dir)
+        try:
+            with mock.patch("sys.stdout", new_callable=io.StringIO):
+                service = TestAssistantService(str(config_path))
+                self.assertIsInstance(root_logger.handlers[0], logging.handlers.QueueHandler)
+                for i in range(50):
+                    logging.getLogger("test").info(f"message {i} " + "x" * 50)
+                service.stop()
+            self.assertNotIn(service.log_queue_handler, root_logger.handlers)
+        finally:
+            os.chdir(previous_cwd)
+            for handler in root_logger.handlers:
+                if handler not in previous_handlers:
+                    handler.close()
+            root_logger.handlers = previous_handlers
+            root_logger.setLevel(previous_level)
+
+        log_path = Path(self.temp_dir) / "test-assistant.log"
+        self.assertTrue((Path(self.temp_dir) / "test-assistant.log.1").exists())
+        self.assertFalse((Path(self.temp_dir) / "test-assistant.log.3").exists())
+        last_line = log_path.read_text().splitlines()[-1]
+        self.assertEqual(last_line.count(" - INFO - "), 1)
+
 
 def run_tests():
     """Run all tests."""
@@ -308,7 +2588,24 @@ def run_tests():
     # Add all test classes
     suite.addTests(loader.loadTestsFromTestCase(TestConfigModel))
     suite.addTests(loader.loadTestsFromTestCase(TestFileHandler))
+    suite.addTests(loader.loadTestsFromTestCase(TestFileFilter))
     suite.addTests(loader.loadTestsFromTestCase(TestClaudeRunner))
+    suite.addTests(loader.loadTestsFromTestCase(TestClaudeProbe))
+    suite.addTests(loader.loadTestsFromTestCase(TestBatchRunner))
+    suite.addTests(loader.loadTestsFromTestCase(TestAsyncClaudeRunner))
+    suite.addTests(loader.loadTestsFromTestCase(TestResultCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestResultStore))
+    suite.addTests(loader.loadTestsFromTestCase(TestWorkJournal))
+    suite.addTests(loader.loadTestsFromTestCase(TestMetrics))
+    suite.addTests(loader.loadTestsFromTestCase(TestScheduler))
+    suite.addTests(loader.loadTestsFromTestCase(TestFailurePolicy))
+    suite.addTests(loader.loadTestsFromTestCase(TestPollingObserver))
+    suite.addTests(loader.loadTestsFromTestCase(TestEventHandler))
+    suite.addTests(loader.loadTestsFromTestCase(TestConsole))
+    suite.addTests(loader.loadTestsFromTestCase(TestBacklogFeeder))
+    suite.addTests(loader.loadTestsFromTestCase(TestArchiver))
+    suite.addTests(loader.loadTestsFromTestCase(TestProcessedManifest))
+    suite.addTests(loader.loadTestsFromTestCase(TestBenchmark))
     suite.addTests(loader.loadTestsFromTestCase(TestIntegration))
 
     runner = unittest.TextTestRunner(verbosity=2)
@@ -25,12 +25,12 @@ def main():
     try:
         config = TestAssistantConfig.from_yaml("config.yaml")
         print(f"✅ Configuration loaded")
-        print(f"📂 Watch directory: {config.watch_path}")
+        watch_dir = Path(config.resolved_roots()[0].path)
+        print(f"📂 Watch directory: {watch_dir}")
     except Exception as e:
         print(f"❌ Failed to load config: {e}")
         return
-    
-    watch_dir = Path(config.watch_path)
+
     
     # Check if watch directory exists
     if not watch_dir.exists():
@@ -0,0 +1,158 @@
+"""Durable work journal for test-assistant."""
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WorkJournal:
+    """SQLite (WAL mode) journal of queued and in-flight files.
+
+    Each file goes through the stages pending -> claimed -> renamed and is
+    removed from the journal when acknowledged. After a crash or restart,
+    recover() returns the files that still need work: claimed files go back
+    to pending, and renamed files are resumed without being renamed again.
+    """
+
+    PENDING = "pending"
+    CLAIMED = "claimed"
+    RENAMED = "renamed"
+
+    def __init__(self, db_path: str):
+        """Initialize the journal.
+
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " path TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " enqueued_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_path ON jobs (path)")
+        self._conn.commit()
+
+    def enqueue(self, file_path: Path) -> bool:
+        """Record a file as pending.
+
+        Args:
+            file_path: Path to the file to process
+
+        Returns:
+            True if the file was added, False if it is already pending
+        """
+        now = time.time()
+        with self._lock:
+            existing = self._conn.execute(
+                "SELECT id FROM jobs WHERE path = ? AND stage = ?",
+                (str(file_path), self.PENDING)
+            ).fetchone()
+            if existing is not None:
+                return False
+
+            self._conn.execute(
+                "INSERT INTO jobs (path, stage, enqueued_at, updated_at) VALUES (?, ?, ?, ?)",
+                (str(file_path), self.PENDING, now, now)
+            )
+            self._conn.commit()
+            return True
+
+    def claim(self, file_path: Path) -> Optional[Tuple[int, str]]:
+        """Mark a file as being processed.
+
+        Args:
+            file_path: Path taken from the in-memory queue
+
+        Returns:
+            Tuple of (job id, stage before claiming), or None if the file is
+            not journaled. A stage of RENAMED means the file was already
+            renamed before a restart and only needs analysis.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, stage FROM jobs WHERE path = ? AND stage IN (?, ?) ORDER BY id LIMIT 1",
+                (str(file_path), self.PENDING, self.RENAMED)
+            ).fetchone()
+            if row is None:
+                return None
+
+            job_id, stage = row
+            if stage == self.PENDING:
+                self._conn.execute(
+                    "UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?",
+                    (self.CLAIMED, time.time(), job_id)
+                )
+                self._conn.commit()
+            return job_id, stage
+
+    def note_renamed(self, old_path: Path, new_path: Path):
+        """Follow a rename of an in-flight file.
+
+        Used as a FileHandler rename listener, so both the timestamp rename
+        and later -latest suffix removals keep the journal path current.
+
+        Args:
+            old_path: Path before renaming
+            new_path: Path after renaming
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET path = ?, stage = ?, updated_at = ?"
+                " WHERE path = ? AND stage IN (?, ?)",
+                (str(new_path), self.RENAMED, time.time(), str(old_path), self.CLAIMED, self.RENAMED)
+            )
+            self._conn.commit()
+
+    def ack(self, job_id: int):
+        """Remove a finished job from the journal.
+
+        Args:
+            job_id: Job id returned by claim
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._conn.commit()
+
+    def recover(self) -> List[Path]:
+        """Return unfinished files after a restart, oldest first.
+
+        Claimed (in-flight) files are returned to pending; renamed files
+        keep their stage so they are not renamed twice.
+
+        Returns:
+            Paths to put back on the in-memory queue
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, updated_at = ? WHERE stage = ?",
+                (self.PENDING, time.time(), self.CLAIMED)
+            )
+            self._conn.commit()
+            rows = self._conn.execute("SELECT path FROM jobs ORDER BY id").fetchall()
+        return [Path(row[0]) for row in rows]
+
+    def pending_count(self) -> int:
+        """Return the number of unfinished jobs.
+
+        Returns:
+            Number of jobs in the journal
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def close(self):
+        """Close the underlying database."""
+        with self._lock:
+            self._conn.close()